@@ -1,7 +1,36 @@
 # app.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.responses import RedirectResponse, JSONResponse
+import asyncio
 import config
+from src.core import warmup
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Per-process resources are created here rather than in create_app, so that with gunicorn's preload
+    # the master (which imports the app before forking) holds no connections the workers would share
+    watchlist_flusher = None
+    if config.REDIS_ENABLED:
+        from src.core.redis_service import init_redis
+        from src.apis.clash_of_clans.services import watchlist
+        init_redis(app)
+        print("Redis caching enabled")
+        # Requests are counted for the cache warmer in memory and added to Redis in batches
+        watchlist_flusher = asyncio.create_task(watchlist.run_flusher())
+
+    # Heavy modules (matplotlib for charts) load in the background, /ready reports when they are done.
+    # Under gunicorn with preload_app this already ran in the master and is skipped.
+    warmup.start()
+    yield
+
+    if watchlist_flusher is not None:
+        watchlist_flusher.cancel()
+        await asyncio.gather(watchlist_flusher, return_exceptions=True)
+    from src.core.redis_service import close_redis
+    await close_redis()
+
 
 def create_app():
     app = FastAPI(
@@ -29,14 +58,25 @@ def create_app():
         """,
         version="2.0.0",
         docs_url="/",
-        redoc_url="/redoc"
+        redoc_url="/redoc",
+        lifespan=lifespan
     )
 
-    # Initialize Redis if it's enabled
-    if config.REDIS_ENABLED:
-        from src.core.redis_service import init_redis
-        init_redis(app)
-        print("Redis caching enabled")
+    # Request latency per route, exposed with everything else on /metrics
+    from src.core.metrics import MetricsMiddleware, metrics_response
+    app.add_middleware(MetricsMiddleware)
+
+    # Per-phase breakdown (cache, upstream, render, ...) in a Server-Timing header on every response
+    from src.core.timing import ServerTimingMiddleware
+    app.add_middleware(ServerTimingMiddleware)
+
+    # Sampling profiler and allocation snapshots for selected requests, started from /debug/profile
+    from src.core.profiling import ProfilingMiddleware
+    app.add_middleware(ProfilingMiddleware)
+
+    # A trace per request (spans for cache, upstream calls, formatting, charts), see /debug/traces
+    from src.core.tracing import TracingMiddleware
+    app.add_middleware(TracingMiddleware)
 
     # Register API routes
     register_routes(app)
@@ -47,6 +87,19 @@ def create_app():
         """Health check endpoint"""
         return {"status": "healthy", "service": "ChefToan's API"}
 
+    # Readiness: 503 until the startup warmup has finished, for load balancers and deploy scripts
+    @app.get("/ready", tags=["System"])
+    async def readiness_check():
+        """Readiness check endpoint"""
+        if not warmup.is_ready():
+            return JSONResponse(status_code=503, content={"status": "warming_up"})
+        return {"status": "ready", "warmup_ms": warmup.durations()}
+
+    # Prometheus scrape endpoint (aggregated across gunicorn workers in multiprocess mode)
+    @app.get("/metrics", tags=["System"], include_in_schema=False)
+    async def metrics():
+        return metrics_response()
+
     print("ChefToan's API server initialized successfully")
     return app
 
@@ -60,6 +113,10 @@ def register_routes(app):
     # Import and register Test API routes
     from src.apis.test.routes import test_router
     app.include_router(test_router)
+
+    # Import and register admin diagnostics (/debug, needs ADMIN_API_TOKEN)
+    from src.apis.debug.routes import debug_router
+    app.include_router(debug_router)
     
     # Future API modules can be added here
     # from src.apis.other_api.routes import other_router
@@ -0,0 +1,90 @@
+# benchmarks/bench_cache_hit.py
+"""
+Cache-hit path benchmark for /player and /player/essentials.
+
+Compares the previous hit path (json.loads with the date_deserializer object_hook,
+an unused indent=2 dump and JSONResponse re-encoding) against serving the stored
+response bytes directly. Redis round-trip time is identical for both paths and is
+not included.
+
+Usage:
+    python -m benchmarks.bench_cache_hit [--iterations 2000]
+"""
+import argparse
+import json
+import os
+import time
+from fastapi.responses import JSONResponse
+from src.core.redis_service import DateTimeEncoder, date_deserializer
+from src.core.response_cache import CachedResponse
+from src.apis.clash_of_clans.services.player_essentials_service import PlayerEssentialsService
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'player_th16_maxed.json')
+HEADERS = {'X-Cache': 'HIT', 'X-Response-Time': '0.001s'}
+
+
+def legacy_hit(raw):
+    """Hit path before pre-serialized responses"""
+    data = json.loads(raw, object_hook=date_deserializer)
+    json.dumps(data, indent=2)
+    return JSONResponse(content=data, headers=HEADERS, media_type='application/json')
+
+
+def legacy_player_hit(raw):
+    """/player hit path before pre-serialized responses"""
+    data = json.loads(raw, object_hook=date_deserializer)
+    return JSONResponse(content=data, headers=HEADERS)
+
+
+def bytes_hit(raw):
+    """Hit path serving the stored response bytes"""
+    return CachedResponse.from_bytes(raw).to_response(None, HEADERS)
+
+
+def measure(func, raw, iterations):
+    """Return (wall microseconds, CPU microseconds) per call"""
+    for _ in range(min(100, iterations)):
+        func(raw)
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for _ in range(iterations):
+        func(raw)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    return wall / iterations * 1e6, cpu / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(FIXTURE) as f:
+        player_data = json.load(f)
+
+    # The essentials service would call ClashKing for legends data, keep it offline
+    service = PlayerEssentialsService()
+    service._get_legends_ranking = lambda tag, data: {'global_rank': 1532, 'local_rank': 12}
+    essentials = service.format_player_essentials(player_data)
+
+    cases = [
+        ('/player/essentials', essentials, legacy_hit),
+        ('/player', player_data, legacy_player_hit),
+    ]
+
+    print(f"{'endpoint':<20} {'path':<8} {'bytes':>7} {'wall us/req':>12} {'cpu us/req':>11}")
+    for name, value, legacy in cases:
+        legacy_raw = json.dumps(value, cls=DateTimeEncoder)
+        framed_raw = CachedResponse.from_value(value).to_bytes()
+
+        before = measure(legacy, legacy_raw, args.iterations)
+        after = measure(bytes_hit, framed_raw, args.iterations)
+
+        print(f"{name:<20} {'before':<8} {len(legacy_raw):>7} {before[0]:>12.1f} {before[1]:>11.1f}")
+        print(f"{name:<20} {'after':<8} {len(framed_raw):>7} {after[0]:>12.1f} {after[1]:>11.1f}")
+        print(f"{name:<20} {'speedup':<8} {'':>7} {before[0] / after[0]:>11.1f}x {before[1] / after[1]:>10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
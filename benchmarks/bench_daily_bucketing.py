@@ -0,0 +1,131 @@
+# benchmarks/bench_daily_bucketing.py
+"""
+Legend log daily bucketing benchmark.
+
+Runs the previous O(days x logs) loop (kept below as legacy_daily_data) and
+data_fetcher.compute_daily_data over synthetic seasons with increasing log
+counts, checks that both produce identical output (the TrophySeries expanded
+back to the list-of-dicts form) and reports the timings.
+
+Usage:
+    python -m benchmarks.bench_daily_bucketing [--iterations 20]
+"""
+import argparse
+import datetime
+import random
+import time
+from datetime import timezone, timedelta
+from src.apis.clash_of_clans.services.data_fetcher import compute_daily_data
+
+SEASON_START = datetime.datetime(2025, 2, 24, 5, 0, 0, tzinfo=timezone.utc)
+SEASON_END = datetime.datetime(2025, 3, 31, 5, 0, 0, tzinfo=timezone.utc)
+NOW = datetime.datetime(2025, 3, 25, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def synthetic_season(log_count, seed=0):
+    """Legend logs spread over the elapsed part of the season, newest last"""
+    rng = random.Random(seed)
+    start_ms = int(SEASON_START.timestamp() * 1000)
+    span_ms = int((NOW - SEASON_START).total_seconds() * 1000)
+    trophies = 5000
+    logs = []
+    for ts in sorted(rng.randrange(start_ms, start_ms + span_ms) for _ in range(log_count)):
+        if rng.random() < 0.5:
+            inc = rng.randint(5, 40)
+            log = {'type': 'attack', 'inc': inc, 'timestamp': ts}
+        else:
+            inc = -rng.randint(0, 40)
+            log = {'type': 'defense', 'inc': inc, 'timestamp': ts}
+        trophies += inc
+        log['start'] = trophies - inc
+        log['end'] = trophies
+        logs.append(log)
+    rng.shuffle(logs)
+    return logs, 5000, trophies
+
+
+def legacy_daily_data(logs, start_date, end_date, initial_trophies, final_trophies, now):
+    """The per-day rescanning loop data_fetcher used before vectorization"""
+    sorted_logs = sorted(logs, key=lambda x: x.get('timestamp', 0))
+    day_data_dict = {}
+    current_trophies = initial_trophies
+    sum_offense = 0
+    sum_defense = 0
+    day_count = 0
+
+    current_day = start_date
+    while current_day <= end_date:
+        current_date = current_day.date()
+        next_day = current_day + timedelta(days=1)
+        day_offense = 0
+        day_defense = 0
+        day_has_logs = False
+        day_trophy_end = None
+
+        for log_item in sorted_logs:
+            ts = log_item.get('timestamp', 0)
+            action_type = log_item.get('type', '')
+            inc = log_item.get('inc', 0)
+            log_end = log_item.get('end', current_trophies)
+            log_time = datetime.datetime.fromtimestamp(ts / 1000, timezone.utc)
+            if current_day <= log_time < next_day:
+                day_has_logs = True
+                if action_type == 'attack':
+                    day_offense += inc
+                elif action_type == 'defense':
+                    day_defense += abs(inc)
+                day_trophy_end = log_end
+
+        date_str = current_date.isoformat()
+        if day_has_logs:
+            current_trophies = day_trophy_end
+            day_data_dict[date_str] = {'date': current_date, 'offense': day_offense,
+                                       'defense': day_defense, 'trophies': current_trophies}
+            sum_offense += day_offense
+            sum_defense += day_defense
+            day_count += 1
+        elif date_str not in day_data_dict and current_day <= now:
+            day_data_dict[date_str] = {'date': current_date, 'offense': None, 'defense': None, 'trophies': None}
+        current_day = next_day
+
+    if sorted_logs and final_trophies != current_trophies:
+        for date_str in reversed(sorted(day_data_dict.keys())):
+            if day_data_dict[date_str]['trophies'] is not None:
+                day_data_dict[date_str]['trophies'] = final_trophies
+                break
+
+    daily_data = [day_data_dict[date] for date in sorted(day_data_dict.keys())]
+    if day_count > 0:
+        return daily_data, sum_offense / day_count, sum_defense / day_count
+    return daily_data, 0, 0
+
+
+def measure(func, args, iterations):
+    """Milliseconds per call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(*args)
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'logs':>6} {'legacy ms':>10} {'vectorized ms':>14} {'speedup':>8}  identical")
+    for log_count in (0, 50, 200, 500, 1000, 2000, 5000):
+        logs, initial, final = synthetic_season(log_count, seed=log_count)
+        call_args = (logs, SEASON_START, SEASON_END, initial, final, NOW)
+
+        series, average_offense, average_defense = compute_daily_data(*call_args)
+        identical = legacy_daily_data(*call_args) == (series.to_daily_data(), average_offense, average_defense)
+        legacy_ms = measure(legacy_daily_data, call_args, args.iterations)
+        vectorized_ms = measure(compute_daily_data, call_args, args.iterations)
+        print(f"{log_count:>6} {legacy_ms:>10.2f} {vectorized_ms:>14.3f} {legacy_ms / vectorized_ms:>7.1f}x  {identical}")
+        if not identical:
+            raise SystemExit(f"Output mismatch for {log_count} logs")
+
+
+if __name__ == '__main__':
+    main()
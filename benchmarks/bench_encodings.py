@@ -0,0 +1,90 @@
+# benchmarks/bench_encodings.py
+"""
+Payload size and client decode benchmark for the negotiated response encodings.
+
+Encodes /player and /player/essentials documents as JSON, MessagePack and CBOR,
+each in the default and the 'packed' columnar layout, and reports the body size,
+gzip size (what nginx sends for JSON) and decode time with the Python decoders.
+
+Usage:
+    python -m benchmarks.bench_encodings [--payloads DIR] [--iterations 500]
+
+DIR may contain recorded Clash of Clans player payloads (*.json); the bundled
+fixture is used when it is not given.
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import time
+from src.core.encodings import pack_columns, msgpack, cbor2
+from src.core.response_cache import dumps
+from src.apis.clash_of_clans.services.player_essentials_service import PlayerEssentialsService
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_payloads(directory):
+    """Load recorded player payloads from a directory"""
+    payloads = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, dict) and 'tag' in data and 'troops' in data:
+            payloads.append((os.path.basename(path), data))
+    return payloads
+
+
+def decoders():
+    """(encoding name, encode, decode) for every available encoding"""
+    available = [
+        ('json', dumps, json.loads),
+    ]
+    try:
+        import orjson
+        available.append(('json/orjson', orjson.dumps, orjson.loads))
+    except ImportError:
+        pass
+    if msgpack is not None:
+        available.append(('msgpack', lambda v: msgpack.packb(v, use_bin_type=True), msgpack.unpackb))
+    if cbor2 is not None:
+        available.append(('cbor', cbor2.dumps, cbor2.loads))
+    return available
+
+
+def time_decode(decode, body, iterations):
+    """Microseconds per decode"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode(body)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--payloads', default=FIXTURE_DIR)
+    parser.add_argument('--iterations', type=int, default=500)
+    args = parser.parse_args()
+
+    service = PlayerEssentialsService()
+    # Keep the benchmark offline, legends data comes from ClashKing
+    service._get_legends_ranking = lambda tag, data: {'global_rank': 1532, 'local_rank': 12}
+
+    print(f"{'payload':<34} {'encoding':<12} {'layout':<8} {'bytes':>7} {'gzip':>7} {'decode us':>10}")
+    for name, player_data in load_payloads(args.payloads):
+        documents = [
+            (f"{name} /player", player_data),
+            (f"{name} /essentials", service.format_player_essentials(player_data)),
+        ]
+        for label, document in documents:
+            for layout, value in (('default', document), ('packed', pack_columns(document))):
+                for encoding, encode, decode in decoders():
+                    body = encode(value)
+                    decode_us = time_decode(decode, body, args.iterations)
+                    print(f"{label:<34} {encoding:<12} {layout:<8} {len(body):>7} "
+                          f"{len(gzip.compress(body)):>7} {decode_us:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
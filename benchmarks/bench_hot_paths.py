@@ -0,0 +1,273 @@
+# benchmarks/bench_hot_paths.py
+"""
+CPU hot path micro-benchmarks with regression thresholds.
+
+Times the per-request CPU work on fixed fixtures (maxed TH16 account, fresh
+account, heavy Legend League season) with no network or Redis involved:
+essentials formatting and fingerprinting, daily bucketing, chart rendering
+(league and clan images stubbed), the @cached encode/decode and key building,
+and the error image.
+
+Each case is calibrated to run at least --min-time per repeat. The best of
+--repeats repeats (noise only ever adds time) is compared against
+benchmarks/baselines.json and the run fails (exit 1) when a case is slower than
+its baseline times the threshold (per case in baselines.json, or the global
+one). Baselines are machine-specific: record them with --update on the machine
+that does the gating, and keep the threshold above that machine's run-to-run
+noise. --recordings adds essentials and daily bucketing cases for every player
+and legend log in an upstream recording (UPSTREAM_RECORD_DIR).
+
+Usage:
+    python -m benchmarks.bench_hot_paths [--filter chart] [--repeats 5] [--min-time 0.2]
+                                         [--update] [--threshold 1.5] [--output results.json]
+                                         [--recordings DIR]
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+from PIL import Image
+from src.core.redis_service import DateTimeEncoder, date_deserializer, make_cache_key
+from src.apis.clash_of_clans import chart_generator
+from src.apis.clash_of_clans.routes import generate_error_image
+from src.apis.clash_of_clans.services import season_calendar
+from src.apis.clash_of_clans.services.data_fetcher import compute_daily_data
+from src.apis.clash_of_clans.services.player_essentials_service import PlayerEssentialsService
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+BASELINES = os.path.join(os.path.dirname(__file__), 'baselines.json')
+DEFAULT_THRESHOLD = 1.5
+
+# name -> setup function returning the zero-argument callable to time
+CASES = {}
+
+
+def case(name):
+    def decorator(setup):
+        CASES[name] = setup
+        return setup
+    return decorator
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name)) as f:
+        return json.load(f)
+
+
+def essentials_service():
+    """Essentials service with the ClashKing legends lookup kept offline"""
+    service = PlayerEssentialsService()
+    service._get_legends_ranking = lambda tag, data: {'global_rank': 1532, 'local_rank': 12}
+    return service
+
+
+def heavy_season_chart_data():
+    """The cached get_player_data_with_keys tuple for the heavy season fixture"""
+    player = load_fixture('player_th16_maxed.json')
+    perk = load_fixture('legend_season_heavy.json')
+    season = season_calendar.get_season(perk['seasonId'])
+    daily_data, average_offense, average_defense = compute_daily_data(
+        perk['logs'], season.start, season.end, perk['initial'], perk['trophies'], now=season.end
+    )
+    player_info = {
+        'name': player['name'],
+        'tag': player['tag'],
+        'clanName': player['clan']['name'],
+        'clanTag': player['clan']['tag'],
+        'clanBadgeUrl': player['clan']['badgeUrls']['small'],
+        'leagueIconUrl': player['league']['iconUrls']['small'],
+        'seasonStr': season.display
+    }
+    return (player_info, daily_data, perk['trophies'], average_offense, average_defense,
+            average_offense - average_defense)
+
+
+@case('essentials.format/th16_maxed')
+def essentials_th16():
+    service, player = essentials_service(), load_fixture('player_th16_maxed.json')
+    return lambda: service.format_player_essentials(player)
+
+
+@case('essentials.format/fresh_account')
+def essentials_fresh():
+    service, player = essentials_service(), load_fixture('player_fresh_account.json')
+    return lambda: service.format_player_essentials(player)
+
+
+@case('essentials.fingerprint/th16_maxed')
+def essentials_fingerprint():
+    service, player = essentials_service(), load_fixture('player_th16_maxed.json')
+    return lambda: service.fingerprint(player)
+
+
+@case('daily_data.compute/heavy_season')
+def daily_data_heavy():
+    perk = load_fixture('legend_season_heavy.json')
+    season = season_calendar.get_season(perk['seasonId'])
+    return lambda: compute_daily_data(perk['logs'], season.start, season.end, perk['initial'], perk['trophies'],
+                                      now=season.end)
+
+
+@case('chart.generate/heavy_season')
+def chart_heavy():
+    # No network: the league icon and clan badge come back as blank images
+    chart_generator.fetch_and_resize_image = lambda url, size: Image.new('RGBA', size, (255, 255, 255, 0))
+    chart_data = heavy_season_chart_data()
+    return lambda: chart_generator.generate_chart(*chart_data)
+
+
+@case('chart.error_image')
+def error_image():
+    return lambda: generate_error_image("Player Not Found", "No player with tag #2PP", 404)
+
+
+@case('cache.encode/chart_data')
+def cache_encode():
+    chart_data = heavy_season_chart_data()
+    return lambda: json.dumps(chart_data, cls=DateTimeEncoder)
+
+
+@case('cache.decode/chart_data')
+def cache_decode():
+    raw = json.dumps(heavy_season_chart_data(), cls=DateTimeEncoder)
+    return lambda: json.loads(raw, object_hook=date_deserializer)
+
+
+@case('cache.encode/player_th16')
+def cache_encode_player():
+    player = load_fixture('player_th16_maxed.json')
+    return lambda: json.dumps(player, cls=DateTimeEncoder)
+
+
+@case('cache.decode/player_th16')
+def cache_decode_player():
+    raw = json.dumps(load_fixture('player_th16_maxed.json'), cls=DateTimeEncoder)
+    return lambda: json.loads(raw, object_hook=date_deserializer)
+
+
+@case('cache.key/player_tag')
+def cache_key():
+    return lambda: make_cache_key('ClashApiClient._fetch_player:v2', ('#2PP0JQ8LJ', ('heroes', 'troops')), {})
+
+
+def add_recorded_cases(directory):
+    """Register cases for the successful players and legend_attacks responses of a recording"""
+    for endpoint in ('players', 'legend_attacks'):
+        for meta_path in sorted(glob.glob(os.path.join(directory, endpoint, '*.meta.json'))):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta['status'] != 200:
+                continue
+            with open(os.path.join(os.path.dirname(meta_path), meta['body_file'])) as f:
+                data = json.load(f)
+            name = meta['body_file'].rsplit('.', 1)[0]
+
+            if endpoint == 'players':
+                def setup(player=data):
+                    service = essentials_service()
+                    return lambda: service.format_player_essentials(player)
+                CASES[f'essentials.format/recorded:{name}'] = setup
+            elif data.get('seasonId'):
+                def setup(perk=data):
+                    season = season_calendar.get_season(perk['seasonId'])
+                    return lambda: compute_daily_data(perk['logs'], season.start, season.end, perk['initial'],
+                                                      perk['trophies'], now=season.end)
+                CASES[f'daily_data.compute/recorded:{name}'] = setup
+
+
+def measure(func, repeats, min_time):
+    """Per-call times in microseconds, one per repeat"""
+    func()  # Warm-up (imports, caches, font loading)
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.1))
+
+    times = [elapsed / number * 1e6]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number * 1e6)
+    return times, number
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES):
+        return {'threshold': DEFAULT_THRESHOLD, 'cases': {}}
+    with open(BASELINES) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filter', help='Only cases whose name contains this')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per repeat')
+    parser.add_argument('--threshold', type=float, help='Allowed slowdown factor (default: from baselines.json)')
+    parser.add_argument('--update', action='store_true', help='Store the measured times as the new baselines')
+    parser.add_argument('--output', help='Also write the results as JSON here')
+    parser.add_argument('--recordings', help='Upstream recording directory to add cases from')
+    args = parser.parse_args()
+
+    if args.recordings:
+        add_recorded_cases(args.recordings)
+
+    baselines = load_baselines()
+    default_threshold = args.threshold or baselines.get('threshold', DEFAULT_THRESHOLD)
+    names = [name for name in CASES if not args.filter or args.filter in name]
+
+    results = {}
+    failures = []
+    width = max([36] + [len(name) + 1 for name in names])
+    print(f"{'case':<{width}} {'best us':>11} {'median us':>11} {'baseline':>11} {'ratio':>7}")
+    for name in names:
+        times, number = measure(CASES[name](), args.repeats, args.min_time)
+        best, median = min(times), statistics.median(times)
+        baseline = baselines['cases'].get(name, {})
+        threshold = args.threshold or baseline.get('threshold', default_threshold)
+        ratio = best / baseline['best_us'] if baseline.get('best_us') else None
+        regressed = ratio is not None and ratio > threshold and not args.update
+
+        results[name] = {'best_us': round(best, 2), 'median_us': round(median, 2), 'calls_per_repeat': number,
+                         'baseline_us': baseline.get('best_us'), 'ratio': round(ratio, 3) if ratio else None,
+                         'threshold': threshold, 'regressed': regressed}
+        if regressed:
+            failures.append(name)
+
+        ratio_str = f"{ratio:.2f}x" if ratio else '-'
+        baseline_str = f"{baseline['best_us']:.1f}" if baseline.get('best_us') else '-'
+        print(f"{name:<{width}} {best:>11.1f} {median:>11.1f} {baseline_str:>11} {ratio_str:>7}"
+              f"{'  REGRESSION' if regressed else ''}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+
+    if args.update:
+        for name in names:
+            entry = baselines['cases'].setdefault(name, {})
+            entry['best_us'] = results[name]['best_us']
+        baselines.setdefault('threshold', DEFAULT_THRESHOLD)
+        baselines['cases'] = dict(sorted(baselines['cases'].items()))
+        with open(BASELINES, 'w') as f:
+            json.dump(baselines, f, indent=2)
+            f.write('\n')
+        print(f"Baselines updated for {len(names)} cases")
+    elif failures:
+        print(f"{len(failures)} case(s) slower than baseline x threshold: {', '.join(failures)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
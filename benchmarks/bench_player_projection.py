@@ -0,0 +1,63 @@
+# benchmarks/bench_player_projection.py
+"""
+Bytes-per-tag and cache-hit decode time of the slim player projection.
+
+Compares what @cached stores in Redis for a player - the full Clash of Clans
+payload (ClashApiClient.get_player) versus the projection
+(ClashApiClient.get_player_summary) - and the time cache_get takes to decode
+each. Also checks that the essentials document built from the projection is
+identical to the one built from the full payload.
+
+Usage:
+    python -m benchmarks.bench_player_projection [--payloads DIR] [--iterations 500]
+"""
+import argparse
+import json
+import time
+from benchmarks.bench_encodings import FIXTURE_DIR, load_payloads
+from src.core.redis_service import DateTimeEncoder, date_deserializer
+from src.apis.clash_of_clans.services.clash_service import project_player
+from src.apis.clash_of_clans.services.player_essentials_service import PlayerEssentialsService
+
+
+def cached_bytes(value):
+    """The value serialized exactly as cache_set stores it"""
+    return json.dumps(value, cls=DateTimeEncoder).encode('utf-8')
+
+
+def time_cache_decode(body, iterations):
+    """Microseconds per cache_get decode"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        json.loads(body, object_hook=date_deserializer)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--payloads', default=FIXTURE_DIR)
+    parser.add_argument('--iterations', type=int, default=500)
+    args = parser.parse_args()
+
+    service = PlayerEssentialsService()
+    # Keep the benchmark offline, legends data comes from ClashKing
+    service._get_legends_ranking = lambda tag, data: {'global_rank': 1532, 'local_rank': 12}
+
+    print(f"{'payload':<26} {'full bytes':>10} {'slim bytes':>10} {'saved':>7} "
+          f"{'full us':>8} {'slim us':>8} {'identical':>9}")
+    for name, player_data in load_payloads(args.payloads):
+        summary = project_player(player_data)
+        full_body = cached_bytes(player_data)
+        slim_body = cached_bytes(summary)
+
+        identical = (service.format_player_essentials(player_data) ==
+                     service.format_player_essentials(summary))
+
+        print(f"{name:<26} {len(full_body):>10} {len(slim_body):>10} "
+              f"{1 - len(slim_body) / len(full_body):>7.0%} "
+              f"{time_cache_decode(full_body, args.iterations):>8.1f} "
+              f"{time_cache_decode(slim_body, args.iterations):>8.1f} {str(identical):>9}")
+
+
+if __name__ == '__main__':
+    main()
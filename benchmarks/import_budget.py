@@ -0,0 +1,127 @@
+# benchmarks/import_budget.py
+"""
+Import-time budget for app boot.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter with Redis
+disabled, parses the report and checks it against a budget: the cumulative
+import time of app (best of --runs, since -X importtime itself adds overhead
+and the disk cache matters) and a list of modules that must not be imported at
+boot at all, such as the chart stack, which is loaded lazily or by the startup
+warmup. Also reports the boot peak RSS and the slowest imports. Exits 1 when
+over budget.
+
+Usage:
+    python -m benchmarks.import_budget [--budget-ms 750] [--forbid matplotlib,numpy,PIL] [--runs 3]
+                                       [--top 15] [--output report.json]
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_MS = 750
+DEFAULT_FORBIDDEN = ('matplotlib', 'numpy', 'PIL')
+
+LINE_PATTERN = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] in report order"""
+    imports = []
+    for line in stderr.splitlines():
+        match = LINE_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return imports
+
+
+def direct_imports(imports, module):
+    """The entries imported directly by module, which the report lists right before it"""
+    position, depth = next((i, entry[3]) for i, entry in enumerate(imports) if entry[0] == module)
+    children = []
+    for entry in reversed(imports[:position]):
+        if entry[3] <= depth:
+            break
+        if entry[3] == depth + 1:
+            children.append(entry)
+    return children
+
+
+def measure_boot():
+    """Import app once in a fresh interpreter, returning (imports, peak RSS in MB)"""
+    environment = {**os.environ, 'REDIS_ENABLED': 'false', 'PYTHONDONTWRITEBYTECODE': '1'}
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT, env=environment,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import app failed:\n{result.stderr[-2000:]}")
+    # Largest child so far (KB on Linux); every child here does the same import, so close enough
+    peak_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return parse_importtime(result.stderr), round(peak_rss / 1024, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument('--forbid', default=','.join(DEFAULT_FORBIDDEN),
+                        help='Comma separated top-level packages that must not be imported at boot')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--output', help='Also write the report as JSON here')
+    args = parser.parse_args()
+
+    runs = [measure_boot() for _ in range(args.runs)]
+    totals = [next(cumulative for module, _, cumulative, _ in imports if module == 'app') for imports, _ in runs]
+    best = min(range(len(runs)), key=lambda i: totals[i])
+    imports, peak_rss_mb = runs[best]
+    total_ms = totals[best] / 1000
+
+    forbidden = [package.strip() for package in args.forbid.split(',') if package.strip()]
+    loaded_forbidden = sorted({module for module, _, _, _ in imports
+                               if module.split('.')[0] in forbidden})
+    top = sorted(imports, key=lambda entry: entry[1], reverse=True)[:args.top]
+    breakdown = sorted(direct_imports(imports, 'app'), key=lambda entry: entry[2], reverse=True)[:args.top]
+
+    print(f"import app: {total_ms:.1f}ms (best of {args.runs}: {', '.join(f'{t / 1000:.0f}' for t in totals)}), "
+          f"budget {args.budget_ms:.0f}ms, {len(imports)} modules, peak RSS {peak_rss_mb}MB")
+    print(f"\n{'direct import of app':<52} {'cumulative ms':>14}")
+    for module, _, cumulative, _ in breakdown:
+        print(f"{module:<52} {cumulative / 1000:>14.1f}")
+    print(f"\n{'slowest module (self)':<52} {'self ms':>14}")
+    for module, self_us, _, _ in top:
+        print(f"{module:<52} {self_us / 1000:>14.1f}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import app took {total_ms:.1f}ms, budget {args.budget_ms:.0f}ms")
+    if loaded_forbidden:
+        failures.append(f"imported at boot: {', '.join(loaded_forbidden[:10])}"
+                        f"{' ...' if len(loaded_forbidden) > 10 else ''}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'total_ms': round(total_ms, 1),
+                'runs_ms': [round(t / 1000, 1) for t in totals],
+                'budget_ms': args.budget_ms,
+                'modules': len(imports),
+                'peak_rss_mb': peak_rss_mb,
+                'forbidden_loaded': loaded_forbidden,
+                'direct': {module: round(cumulative / 1000, 1) for module, _, cumulative, _ in breakdown},
+                'slowest': {module: round(self_us / 1000, 1) for module, self_us, _, _ in top},
+                'failures': failures
+            }, f, indent=2)
+            f.write('\n')
+
+    for failure in failures:
+        print(f"OVER BUDGET {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
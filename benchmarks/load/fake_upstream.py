@@ -0,0 +1,300 @@
+# benchmarks/load/fake_upstream.py
+"""
+Local stand-in for the Clash of Clans, ClashPerk and ClashKing APIs.
+
+Serves production-shaped payloads for any tag: the player fixture (with the
+tag, name and trophies varied per tag), a Legend League log for the current
+season, ClashKing ranking and stats, and a PNG for every asset URL (asset URLs
+in the payloads are rewritten to point here). With --payloads, responses come
+from a recording made with UPSTREAM_RECORD_DIR instead, each tag consistently
+mapped to one recorded response per endpoint, optionally with the recorded
+latencies. Latency, errors, 429s and full outages are configurable, live
+through POST /_control, and every call is counted per endpoint on GET /_stats.
+
+Usage:
+    python -m benchmarks.load.fake_upstream [--port 8900] [--latency-ms 80] [--payloads DIR [--recorded-latency]]
+
+Point the API at it with the environment printed on startup.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from datetime import timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import unquote, urlsplit
+from PIL import Image
+from src.apis.clash_of_clans.services import season_calendar
+from src.core.upstream_capture import UpstreamReplayer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'fixtures')
+ASSET_HOST = 'https://api-assets.clashofclans.com'
+
+
+def _tag_seed(tag):
+    return int.from_bytes(hashlib.blake2b(tag.encode(), digest_size=4).digest(), 'big')
+
+
+def _png(size=(72, 72)):
+    buf = BytesIO()
+    Image.new('RGBA', size, (200, 160, 40, 255)).save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def legend_log(tag, now=None):
+    """A ClashPerk legend-attacks response for the elapsed part of the current season"""
+    now = now or datetime.datetime.now(timezone.utc)
+    season = season_calendar.current_season(now)
+    rng = random.Random(_tag_seed(tag))
+    initial = 5000 + rng.randrange(500)
+    trophies = initial
+    logs = []
+    timestamp = season.start_ms
+    now_ms = int(now.timestamp() * 1000)
+    while True:
+        timestamp += rng.randrange(600_000, 5_400_000)  # 8 attacks and 8 defenses a day, give or take
+        if timestamp >= now_ms:
+            break
+        if rng.random() < 0.5:
+            inc = rng.randint(5, 40)
+            log = {'type': 'attack', 'inc': inc, 'timestamp': timestamp}
+        else:
+            inc = -rng.randint(0, 40)
+            log = {'type': 'defense', 'inc': inc, 'timestamp': timestamp}
+        log['start'] = trophies
+        trophies += inc
+        log['end'] = trophies
+        logs.append(log)
+    return {'name': 'Bench', 'tag': tag, 'logs': logs, 'initial': initial, 'trophies': trophies,
+            'seasonId': season.season_id}
+
+
+class FakeUpstream(ThreadingHTTPServer):
+    """Threaded HTTP server faking the three upstream APIs"""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, payloads=None, latency_ms=50.0, jitter_ms=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 recorded_latency=False, seed=0):
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.settings = {
+            'latency_ms': latency_ms,
+            'jitter_ms': jitter_ms,
+            'error_rate': error_rate,
+            'rate_limit_rate': rate_limit_rate,
+            'recorded_latency': recorded_latency,
+            'outage': False
+        }
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._bodies = {}
+        self._thread = None
+
+        with open(os.path.join(FIXTURES_DIR, 'player_th16_maxed.json'), 'rb') as f:
+            self.player_template = self._rewrite_assets(f.read())
+        self.replayer = UpstreamReplayer(payloads, speed=0) if payloads else None
+        if self.replayer is not None and not self.replayer.endpoints():
+            raise ValueError(f"No recordings found in {payloads}")
+        self.png = _png()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def api_environment(self):
+        """Environment variables pointing the API at this server"""
+        return {
+            'COC_API_BASE_URL': f'{self.url}/v1',
+            'CLASHPERK_BASE_URL': self.url,
+            'CLASHKING_BASE_URL': self.url
+        }
+
+    def _rewrite_assets(self, raw):
+        return raw.replace(ASSET_HOST.encode(), f'{self.url}/assets'.encode())
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-upstream', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def configure(self, **settings):
+        with self._lock:
+            self.settings.update(settings)
+
+    def stats(self, reset=False):
+        with self._lock:
+            calls = dict(self.calls)
+            if reset:
+                self.calls.clear()
+        return calls
+
+    def outcome(self, endpoint, tag):
+        """(status, delay seconds) for the next call, counting it"""
+        with self._lock:
+            self.calls[endpoint] += 1
+            settings = dict(self.settings)
+            roll = self._rng.random()
+            jitter = self._rng.uniform(-1, 1) * settings['jitter_ms']
+
+        latency_ms = settings['latency_ms']
+        recording = self.recording(endpoint, tag)
+        if settings['recorded_latency'] and recording is not None:
+            latency_ms = recording['elapsed_ms']
+        delay = max(0.0, latency_ms + jitter) / 1000
+        if endpoint == 'assets':
+            return 200, delay
+        if settings['outage']:
+            return 503, delay
+        if roll < settings['rate_limit_rate']:
+            return 429, delay
+        if roll < settings['rate_limit_rate'] + settings['error_rate']:
+            return 500, delay
+        if recording is not None and recording['status'] != 200:
+            return recording['status'], delay
+        return 200, delay
+
+    def recording(self, endpoint, tag):
+        """The recorded response served for an endpoint and tag, None without --payloads"""
+        if self.replayer is None:
+            return None
+        return self.replayer.find('image' if endpoint == 'assets' else endpoint, tag or '')
+
+    def body(self, endpoint, tag):
+        """Response body for an endpoint and tag, built once per tag"""
+        key = (endpoint, tag)
+        body = self._bodies.get(key)
+        if body is None:
+            body = self._build_body(endpoint, tag)
+            self._bodies[key] = body
+        return body
+
+    def _build_body(self, endpoint, tag):
+        recording = self.recording(endpoint, tag)
+        if recording is not None:
+            return self._rewrite_assets(self.replayer.body(recording))
+        if endpoint == 'assets':
+            return self.png
+
+        seed = _tag_seed(tag)
+        if endpoint == 'players':
+            player = json.loads(self.player_template)
+            player.update({'tag': tag, 'name': f'Bench {tag[1:]}', 'trophies': 5000 + seed % 1000})
+            return json.dumps(player).encode()
+        if endpoint == 'legend_attacks':
+            return json.dumps(legend_log(tag)).encode()
+        if endpoint == 'legends_ranking':
+            return json.dumps({'tag': tag, 'name': f'Bench {tag[1:]}', 'rank': 1 + seed % 50000,
+                               'trophies': 5000 + seed % 1000, 'townhall': 16}).encode()
+        if endpoint == 'player_stats':
+            return json.dumps({'tag': tag, 'legends': {
+                'local_rank': 1 + seed % 2000,
+                'previousSeason': {'id': '2025-02', 'rank': 1 + seed % 90000, 'trophies': 5400},
+                'bestSeason': {'id': '2024-12', 'rank': 1 + seed % 40000, 'trophies': 5800}
+            }}).encode()
+        if endpoint == 'clans':
+            return json.dumps({'tag': tag, 'name': 'Bench Clan', 'clanLevel': 20, 'members': 0, 'memberList': []}).encode()
+        if endpoint == 'clan_members':
+            return json.dumps({'items': []}).encode()
+        raise ValueError(endpoint)
+
+
+def route(path):
+    """(endpoint, tag) for an upstream path, or (None, None)"""
+    parts = [unquote(part) for part in path.strip('/').split('/')]
+    if parts[0] == 'assets':
+        return 'assets', None
+    if parts[:2] == ['v1', 'players'] and len(parts) == 3:
+        return 'players', parts[2]
+    if parts[:2] == ['v1', 'clans'] and len(parts) == 3:
+        return 'clans', parts[2]
+    if parts[:2] == ['v1', 'clans'] and len(parts) == 4 and parts[3] == 'members':
+        return 'clan_members', parts[2]
+    if parts[:2] == ['players', 'legend-attacks'] and len(parts) == 3:
+        return 'legend_attacks', parts[2]
+    if parts[:2] == ['ranking', 'legends'] and len(parts) == 3:
+        return 'legends_ranking', parts[2]
+    if parts[0] == 'player' and len(parts) == 3 and parts[2] == 'stats':
+        return 'player_stats', parts[1]
+    return None, None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type='application/json', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/_stats':
+            self._send(200, json.dumps({'calls': self.server.stats(), 'settings': self.server.settings}).encode())
+            return
+
+        endpoint, tag = route(path)
+        if endpoint is None:
+            self._send(404, b'{"reason":"notFound"}')
+            return
+
+        status, delay = self.server.outcome(endpoint, tag)
+        time.sleep(delay)
+        if endpoint == 'assets':
+            self._send(200, self.server.body(endpoint, path), 'image/png')
+        elif status == 429:
+            self._send(429, b'{"reason":"requestThrottled"}', headers={'Retry-After': '1'})
+        elif status != 200:
+            self._send(status, b'{"reason":"unavailable"}')
+        else:
+            self._send(200, self.server.body(endpoint, tag))
+
+    def do_POST(self):
+        if urlsplit(self.path).path != '/_control':
+            self._send(404, b'{"reason":"notFound"}')
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        self.server.configure(**json.loads(self.rfile.read(length) or b'{}'))
+        self._send(200, json.dumps(self.server.settings).encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--jitter-ms', type=float, default=40)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--payloads', help='Recording directory (UPSTREAM_RECORD_DIR) to serve responses from')
+    parser.add_argument('--recorded-latency', action='store_true', help='Answer with the recorded latencies')
+    args = parser.parse_args()
+
+    server = FakeUpstream(args.port, args.payloads, args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate,
+                          args.recorded_latency)
+    for name, value in server.api_environment().items():
+        print(f"{name}={value}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,338 @@
+# benchmarks/load/run.py
+"""
+End-to-end load benchmark for /player, /player/essentials and /chart.
+
+Starts the fake upstream (benchmarks.load.fake_upstream), a Redis (an in-process
+fakeredis TCP server unless --redis-url is given) and the API itself under
+uvicorn in a subprocess, then drives load profiles against it:
+
+    hot     Zipf-skewed traffic over --tags players after a warm-up (steady state)
+    cold    a fresh API process and empty cache, every request for a new player
+    outage  warm cache with short TTLs, then every upstream call fails with 503
+
+Each profile reports throughput, latency percentiles (overall and per
+endpoint), status codes, the X-Cache hit ratio and upstream calls per request
+as JSON. With --baseline, the run fails (exit 1) when a profile regresses by
+more than --max-regression against a previous --output.
+
+Usage:
+    python -m benchmarks.load.run [--profiles hot,cold,outage] [--duration 20] [--concurrency 16]
+                                  [--output results.json] [--baseline baseline.json]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+import httpx
+import redis
+from benchmarks.load.fake_upstream import FakeUpstream
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROFILES = ('hot', 'cold', 'outage')
+ENDPOINTS = {
+    'player': '/clash-of-clans/player',
+    'essentials': '/clash-of-clans/player/essentials',
+    'chart': '/clash-of-clans/chart'
+}
+CACHE_TTL_VARIABLES = ('CACHE_PLAYER_DATA', 'CACHE_PLAYER_ESSENTIALS', 'CACHE_ESSENTIALS_MEMO', 'CACHE_CHART_IMAGE',
+                       'CACHE_LEGEND_ATTACKS', 'CACHE_CLASHKING_DATA', 'CACHE_COMBINED_DATA')
+
+# (metric, True if higher is better) compared against --baseline
+GATED_METRICS = (('throughput_rps', True), ('p95_ms', False), ('p99_ms', False), ('upstream_calls_per_request', False))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_fake_redis():
+    """A fakeredis server speaking the Redis protocol on a local port"""
+    from fakeredis import TcpFakeServer
+
+    port = free_port()
+    server = TcpFakeServer(('127.0.0.1', port))
+    threading.Thread(target=server.serve_forever, name='fake-redis', daemon=True).start()
+    return f'redis://127.0.0.1:{port}/0'
+
+
+class ApiProcess:
+    """The API under uvicorn in a subprocess"""
+
+    def __init__(self, environment, workers, log_path):
+        self.port = free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.log = open(log_path, 'ab')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'app:app', '--host', '127.0.0.1', '--port', str(self.port),
+             '--workers', str(workers), '--log-level', 'warning', '--no-access-log'],
+            cwd=ROOT, env={**os.environ, **environment}, stdout=self.log, stderr=subprocess.STDOUT
+        )
+
+    def wait_ready(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"API exited with code {self.process.returncode}, see {self.log.name}")
+            try:
+                if httpx.get(f'{self.url}/health', timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"API not ready after {timeout}s, see {self.log.name}")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.log.close()
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+
+def latency_summary(latencies_ms):
+    values = sorted(latencies_ms)
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values), 2) if values else None,
+        'p50_ms': round(percentile(values, 50), 2) if values else None,
+        'p95_ms': round(percentile(values, 95), 2) if values else None,
+        'p99_ms': round(percentile(values, 99), 2) if values else None,
+        'max_ms': round(values[-1], 2) if values else None
+    }
+
+
+class TagPicker:
+    """Player tags for a profile: Zipf-skewed over a fixed set, or a new tag every time"""
+
+    def __init__(self, count, skew, unique=False, seed=0):
+        self.rng = random.Random(seed)
+        self.unique = unique
+        self.next_unique = 0
+        self.tags = [f'#B{i:06d}' for i in range(count)]
+        weights = [1 / (rank + 1) ** skew for rank in range(count)]
+        total = sum(weights)
+        self.cumulative = []
+        acc = 0.0
+        for weight in weights:
+            acc += weight / total
+            self.cumulative.append(acc)
+
+    def pick(self):
+        if self.unique:
+            self.next_unique += 1
+            return f'#C{self.next_unique:07d}'
+        roll = self.rng.random()
+        low, high = 0, len(self.cumulative) - 1
+        while low < high:
+            mid = (low + high) // 2
+            if self.cumulative[mid] < roll:
+                low = mid + 1
+            else:
+                high = mid
+        return self.tags[low]
+
+
+async def drive(url, picker, mix, duration, concurrency, record=True):
+    """Send requests from concurrency clients for duration seconds"""
+    results = []
+    endpoints = list(mix)
+    weights = [mix[endpoint] for endpoint in endpoints]
+    rng = random.Random(1)
+    deadline = time.monotonic() + duration
+
+    async def client(http):
+        while time.monotonic() < deadline:
+            endpoint = rng.choices(endpoints, weights)[0]
+            tag = picker.pick()
+            start = time.perf_counter()
+            try:
+                response = await http.get(ENDPOINTS[endpoint], params={'tag': tag})
+                await response.aread()
+                status, cache = response.status_code, response.headers.get('x-cache')
+            except httpx.HTTPError as e:
+                status, cache = type(e).__name__, None
+            if record:
+                results.append((endpoint, (time.perf_counter() - start) * 1000, status, cache))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as http:
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+    return results
+
+
+def summarize(results, duration, upstream_calls):
+    latencies = defaultdict(list)
+    statuses = Counter()
+    cache = Counter()
+    for endpoint, latency_ms, status, cache_status in results:
+        latencies[endpoint].append(latency_ms)
+        statuses[str(status)] += 1
+        if cache_status:
+            cache[cache_status] += 1
+
+    requests = len(results)
+    api_calls = sum(count for endpoint, count in upstream_calls.items() if endpoint != 'assets')
+    ok = sum(count for status, count in statuses.items() if status.isdigit() and int(status) < 400)
+    summary = {
+        'requests': requests,
+        'duration_s': duration,
+        'throughput_rps': round(requests / duration, 2),
+        **latency_summary([latency for values in latencies.values() for latency in values]),
+        'error_rate': round(1 - ok / requests, 4) if requests else None,
+        'statuses': dict(statuses),
+        'cache': dict(cache),
+        'cache_hit_ratio': round(cache['HIT'] / sum(cache.values()), 4) if cache else None,
+        'upstream_calls': upstream_calls,
+        'upstream_calls_per_request': round(api_calls / requests, 3) if requests else None,
+        'endpoints': {endpoint: latency_summary(values) for endpoint, values in latencies.items()}
+    }
+    return summary
+
+
+def run_profile(name, args, upstream, redis_url, log_path):
+    environment = {
+        **upstream.api_environment(),
+        'REDIS_ENABLED': 'true',
+        'REDIS_URL': redis_url,
+        'COC_API_TOKEN': 'bench',
+        'CLASHPERK_API_TOKEN': 'bench',
+        'TROPHY_HISTORY_DB': os.path.join(tempfile.mkdtemp(prefix='bench-history-'), 'history.db')
+    }
+    if name == 'outage':
+        # Entries expire during the outage, exercising stale fallbacks and error paths
+        environment.update({variable: str(args.outage_ttl) for variable in CACHE_TTL_VARIABLES})
+
+    redis.from_url(redis_url).flushall()
+    upstream.configure(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                       rate_limit_rate=args.rate_limit_rate, outage=False)
+
+    api = ApiProcess(environment, args.workers, log_path)
+    try:
+        api.wait_ready()
+        picker = TagPicker(args.tags, args.skew, unique=(name == 'cold'))
+        if name in ('hot', 'outage') and args.warmup > 0:
+            asyncio.run(drive(api.url, picker, args.mix, args.warmup, args.concurrency, record=False))
+        if name == 'outage':
+            upstream.configure(outage=True)
+
+        upstream.stats(reset=True)
+        results = asyncio.run(drive(api.url, picker, args.mix, args.duration, args.concurrency))
+        return summarize(results, args.duration, upstream.stats())
+    finally:
+        api.stop()
+
+
+def compare(results, baseline, max_regression):
+    """Regressions of the gated metrics beyond max_regression, as messages"""
+    failures = []
+    for profile, summary in results['profiles'].items():
+        previous = baseline.get('profiles', {}).get(profile)
+        if not previous:
+            continue
+        for metric, higher_is_better in GATED_METRICS:
+            old, new = previous.get(metric), summary.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > max_regression:
+                failures.append(f"{profile} {metric}: {old} -> {new} ({change:+.1%})")
+    return failures
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        endpoint, weight = part.split('=')
+        if endpoint not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {endpoint}, expected one of {', '.join(ENDPOINTS)}")
+        mix[endpoint] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', default=','.join(PROFILES))
+    parser.add_argument('--duration', type=float, default=20, help='Measured seconds per profile')
+    parser.add_argument('--warmup', type=float, default=10, help='Unmeasured seconds before hot and outage')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=1, help='uvicorn worker processes')
+    parser.add_argument('--tags', type=int, default=200, help='Players in the hot and outage profiles')
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of tag popularity')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('player=0.3,essentials=0.5,chart=0.2'))
+    parser.add_argument('--latency-ms', type=float, default=80, help='Mean upstream latency')
+    parser.add_argument('--jitter-ms', type=float, default=40)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of upstream calls failing with 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of upstream calls answered 429')
+    parser.add_argument('--outage-ttl', type=int, default=5, help='Cache TTLs in the outage profile')
+    parser.add_argument('--payloads', help='Recording directory (UPSTREAM_RECORD_DIR) for the fake upstream to serve')
+    parser.add_argument('--recorded-latency', action='store_true',
+                        help='With --payloads, answer with the recorded latencies instead of --latency-ms')
+    parser.add_argument('--redis-url', help='Use this Redis (it is flushed!) instead of an in-process fakeredis')
+    parser.add_argument('--output', help='Write the JSON results here instead of stdout')
+    parser.add_argument('--baseline', help='Previous --output to gate against')
+    parser.add_argument('--max-regression', type=float, default=0.15)
+    args = parser.parse_args()
+
+    profiles = [name.strip() for name in args.profiles.split(',') if name.strip()]
+    unknown = set(profiles) - set(PROFILES)
+    if unknown:
+        parser.error(f"Unknown profiles: {', '.join(sorted(unknown))}")
+
+    upstream = FakeUpstream(payloads=args.payloads, recorded_latency=args.recorded_latency).start()
+    redis_url = args.redis_url or start_fake_redis()
+    log_path = os.path.join(tempfile.mkdtemp(prefix='bench-api-'), 'api.log')
+
+    results = {
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'profiles': {}
+    }
+    try:
+        for name in profiles:
+            print(f"Running {name} for {args.duration:.0f}s...", file=sys.stderr)
+            summary = run_profile(name, args, upstream, redis_url, log_path)
+            results['profiles'][name] = summary
+            print(f"  {summary['throughput_rps']:8.1f} req/s  p50 {summary['p50_ms']} ms  p95 {summary['p95_ms']} ms  "
+                  f"p99 {summary['p99_ms']} ms  hit ratio {summary['cache_hit_ratio']}  "
+                  f"upstream/req {summary['upstream_calls_per_request']}  errors {summary['error_rate']}",
+                  file=sys.stderr)
+    finally:
+        upstream.stop()
+    print(f"API log: {log_path}", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(results, json.load(f), args.max_regression)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,10 +17,19 @@ CLASHPERK_API_TOKEN = os.getenv('CLASHPERK_API_TOKEN', '')
 # API Endpoints
 COC_API_BASE_URL = os.getenv('COC_API_BASE_URL', 'https://api.clashofclans.com/v1')
 CLASHPERK_BASE_URL = os.getenv('CLASHPERK_BASE_URL', 'https://api.clashperk.com')
+CLASHKING_BASE_URL = os.getenv('CLASHKING_BASE_URL', 'https://api.clashk.ing')
 
 # Redis configuration - OPTIMIZED FOR PERFORMANCE
 REDIS_ENABLED = os.getenv('REDIS_ENABLED', 'True').lower() == 'true'  # Enable by default
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+# Connections per pool and per worker (sync and asyncio each have one); 40 matches the request thread pool
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 40))
+REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', 2.0))  # Seconds to wait for a free pooled connection
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 1.0))  # Seconds per command before giving up
+REDIS_CONNECT_TIMEOUT = float(os.getenv('REDIS_CONNECT_TIMEOUT', 1.0))
+REDIS_HEALTH_CHECK_INTERVAL = float(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', 5))  # Seconds between pings while up
+REDIS_RECONNECT_BACKOFF_MIN = float(os.getenv('REDIS_RECONNECT_BACKOFF_MIN', 1))  # First retry after Redis went down
+REDIS_RECONNECT_BACKOFF_MAX = float(os.getenv('REDIS_RECONNECT_BACKOFF_MAX', 60))  # Backoff doubles up to this
 
 # Cache timeouts (in seconds) - Optimized for speed vs freshness balance
 REDIS_CACHE_TIMEOUT = int(os.getenv('REDIS_CACHE_TIMEOUT', 300))  # 5 minutes default
@@ -29,12 +38,68 @@ REDIS_CACHE_TIMEOUT = int(os.getenv('REDIS_CACHE_TIMEOUT', 300))  # 5 minutes de
 CACHE_TIMEOUTS = {
     'player_data': int(os.getenv('CACHE_PLAYER_DATA', 300)),        # 5 minutes - player data changes slowly
     'player_essentials': int(os.getenv('CACHE_PLAYER_ESSENTIALS', 300)),  # 5 minutes - processed data
+    'essentials_memo': int(os.getenv('CACHE_ESSENTIALS_MEMO', 1800)),  # 30 minutes - formatted essentials by fingerprint
+    'essentials_snapshot': int(os.getenv('CACHE_ESSENTIALS_SNAPSHOT', 86400)),  # 1 day - versioned essentials for since= diffs
     'chart_image': int(os.getenv('CACHE_CHART_IMAGE', 600)),        # 10 minutes - charts are expensive to generate
     'legend_attacks': int(os.getenv('CACHE_LEGEND_ATTACKS', 900)),  # 15 minutes - attack data
     'clashking_data': int(os.getenv('CACHE_CLASHKING_DATA', 600)),  # 10 minutes - ranking data
+    'clan_data': int(os.getenv('CACHE_CLAN_DATA', 600)),            # 10 minutes - clan info
     'combined_player_data': int(os.getenv('CACHE_COMBINED_DATA', 1800))  # 30 minutes - expensive combined data
 }
 
+# Number of previous essentials versions a since= poll can be diffed against
+ESSENTIALS_SNAPSHOT_HISTORY = int(os.getenv('ESSENTIALS_SNAPSHOT_HISTORY', 10))
+
+# Local trophy history (SQLite) used for multi-season charts
+TROPHY_HISTORY_ENABLED = os.getenv('TROPHY_HISTORY_ENABLED', 'True').lower() == 'true'
+TROPHY_HISTORY_DB = os.getenv('TROPHY_HISTORY_DB', 'data/trophy_history.db')
+TROPHY_HISTORY_MAX_SEASONS = int(os.getenv('TROPHY_HISTORY_MAX_SEASONS', 12))
+
+# Batch endpoints and upstream fan-out
+BATCH_MAX_TAGS = int(os.getenv('BATCH_MAX_TAGS', 50))  # A full clan roster
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv('UPSTREAM_MAX_CONCURRENCY', 8))  # Upstream fetches in flight per worker
+UPSTREAM_RATE_LIMIT = float(os.getenv('UPSTREAM_RATE_LIMIT', 20))  # Upstream fetches per second per worker (0 = unlimited)
+UPSTREAM_BURST = int(os.getenv('UPSTREAM_BURST', 20))
+
+# Live trophy feed (/clash-of-clans/live)
+LIVE_POLL_INTERVAL = float(os.getenv('LIVE_POLL_INTERVAL', 30))  # Seconds between upstream polls per tag
+LIVE_HEARTBEAT_INTERVAL = float(os.getenv('LIVE_HEARTBEAT_INTERVAL', 15))  # Keepalive for idle connections
+LIVE_QUEUE_SIZE = int(os.getenv('LIVE_QUEUE_SIZE', 100))  # Buffered events per subscriber
+LIVE_STATE_TTL = int(os.getenv('LIVE_STATE_TTL', 86400))  # Last seen state per tag
+
+# Background cache warmer (worker.py)
+CACHE_WARM_WATCHLIST_SIZE = int(os.getenv('CACHE_WARM_WATCHLIST_SIZE', 200))  # Hottest tags kept warm
+CACHE_WARM_RESET_DELAY = int(os.getenv('CACHE_WARM_RESET_DELAY', 60))  # Seconds after the 5:00 UTC legend reset
+CACHE_WARM_WINDOW = int(os.getenv('CACHE_WARM_WINDOW', 600))  # Seconds the post-reset pass is spread over
+CACHE_WARM_INTERVAL = int(os.getenv('CACHE_WARM_INTERVAL', 300))  # Seconds between regular passes
+CACHE_WARM_DECAY = float(os.getenv('CACHE_WARM_DECAY', 0.5))  # Daily multiplier on request counts
+CACHE_WARM_BACKOFF = float(os.getenv('CACHE_WARM_BACKOFF', 30))  # Pause when upstream throttles
+CACHE_WARM_FLUSH_INTERVAL = float(os.getenv('CACHE_WARM_FLUSH_INTERVAL', 5))  # Seconds API workers batch request counts
+
+# Tracing (/debug/traces)
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'True').lower() == 'true'
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 1.0))  # Fraction of requests traced
+TRACE_BUFFER_SIZE = int(os.getenv('TRACE_BUFFER_SIZE', 200))  # Recent traces kept in memory per worker
+TRACE_EXPORT_FILE = os.getenv('TRACE_EXPORT_FILE', '')  # Also append traces as OTLP/JSON lines ('-' for stdout)
+
+# Admin endpoints (/debug/...), disabled while no token is set
+ADMIN_API_TOKEN = os.getenv('ADMIN_API_TOKEN', '')
+
+# On-demand profiling (/debug/profile)
+PROFILE_MAX_SECONDS = int(os.getenv('PROFILE_MAX_SECONDS', 600))  # Longest a session may run
+PROFILE_RESULT_TTL = int(os.getenv('PROFILE_RESULT_TTL', 3600))  # Seconds results are kept in Redis
+PROFILE_MAX_MEMORY_SNAPSHOTS = int(os.getenv('PROFILE_MAX_MEMORY_SNAPSHOTS', 200))  # Per session
+
+# Upstream fixture capture (benchmarks and offline runs)
+UPSTREAM_RECORD_DIR = os.getenv('UPSTREAM_RECORD_DIR', '')  # Write sanitized upstream responses here
+UPSTREAM_REPLAY_DIR = os.getenv('UPSTREAM_REPLAY_DIR', '')  # Serve recorded responses instead of calling upstream
+UPSTREAM_REPLAY_SPEED = float(os.getenv('UPSTREAM_REPLAY_SPEED', 1.0))  # Recorded latency divided by this (0 = instant)
+
+# Startup: preload the chart renderer (matplotlib) in the background, /ready answers 200 once done
+CHART_WARMUP = os.getenv('CHART_WARMUP', 'True').lower() == 'true'
+# Gunicorn: import the app and run the warmup once in the master, workers share it copy-on-write
+GUNICORN_PRELOAD = os.getenv('GUNICORN_PRELOAD', 'True').lower() == 'true'
+
 # Request timeout settings
 API_REQUEST_TIMEOUT = int(os.getenv('API_REQUEST_TIMEOUT', 10))  # 10 seconds for external APIs
 CHART_GENERATION_TIMEOUT = int(os.getenv('CHART_GENERATION_TIMEOUT', 30))  # 30 seconds for chart generation
@@ -0,0 +1,55 @@
+# gunicorn.conf.py
+"""
+Gunicorn settings (gunicorn -c gunicorn.conf.py 'app:app')
+
+For /metrics to aggregate every worker, set PROMETHEUS_MULTIPROC_DIR to an
+empty, writable directory before gunicorn starts.
+
+With GUNICORN_PRELOAD (the default) the master imports the app and runs the
+startup warmup (matplotlib, fonts, static error images) once, then freezes
+those objects out of the garbage collector before forking, so the workers
+share the memory pages instead of each building and dirtying their own copy.
+Connections (Redis) are still opened per worker, in the app's lifespan.
+"""
+import gc
+import os
+import shutil
+# Not `import config`: gunicorn reads every module-level name here as a setting, and `config` is one
+import config as api_config
+
+bind = f"{api_config.HOST}:{api_config.PORT}"
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = api_config.GUNICORN_PRELOAD
+
+# Cleared here rather than in on_starting: with preload_app the master imports the app, and so creates its
+# metrics files, before any server hook runs. Files left over from a previous run would be counted again.
+_multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+if _multiproc_dir:
+    shutil.rmtree(_multiproc_dir, ignore_errors=True)
+    os.makedirs(_multiproc_dir, exist_ok=True)
+
+if preload_app:
+    # No collections while the app is imported, they would leave freed holes in pages the workers share
+    gc.disable()
+
+
+def when_ready(server):
+    # Runs in the master after the app is preloaded and before the first fork
+    if preload_app:
+        from src.core import warmup
+        from src.core.metrics import mark_process_dead
+        warmup.run()
+        # The master serves no requests: drop the live gauges it created on import (redis_available at 0)
+        # so they don't pin the workers' livemin
+        mark_process_dead(os.getpid())
+        # Move everything allocated so far to the permanent generation: the workers' collections skip it
+        # and so never write to (and copy) those pages
+        gc.freeze()
+        # The master keeps running (and allocating) for the life of the server
+        gc.enable()
+
+
+def child_exit(server, worker):
+    from src.core.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
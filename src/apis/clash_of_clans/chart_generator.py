@@ -5,15 +5,27 @@ matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import numpy as np
-import requests
 from PIL import Image
 from io import BytesIO
 import datetime
+import time
 import matplotlib.ticker as ticker
+from src.apis.clash_of_clans.models.trophy_series import TrophySeries
+from src.core import metrics, timing
+from src.core.upstream import upstream_get
+from src.core.tracing import traced
+from src.core.profiling import memory_profiled
 
 
+@traced()
+@memory_profiled
 def generate_chart(player_info, daily_data, final_trophies, average_offense, average_defense, net_gain):
-    """Creates a PNG chart in memory and returns a BytesIO buffer."""
+    """Creates a PNG chart in memory and returns a BytesIO buffer.
+
+    daily_data is a TrophySeries (a list of {'date', 'trophies', ...} dicts is also accepted).
+    """
+    render_start = time.perf_counter()
+
     # Disable all default locators to prevent the MaxTicks error
     plt.rcParams['axes.formatter.use_locale'] = False
     plt.rcParams['axes.formatter.useoffset'] = False
@@ -137,36 +149,19 @@ def generate_chart(player_info, daily_data, final_trophies, average_offense, ave
 
     # Bottom chart with improved styling
     ax_chart.set_facecolor('#fafafa')  # Light background
-    x_dates = []
-    y_trophies = []
-
-    for d in daily_data:
-        # Skip data points without trophy information
-        if d.get('trophies') is None:
-            continue
-
-        # Convert string date to datetime.date object if needed
-        if isinstance(d.get('date'), str):
-            try:
-                date_obj = datetime.date.fromisoformat(d.get('date'))
-            except ValueError:
-                # If we can't parse the date, skip this data point
-                continue
-        else:
-            # If it's already a date object, use it directly
-            date_obj = d.get('date')
+    # Legacy list-of-dicts callers are converted once; the series is already in date order
+    if not isinstance(daily_data, TrophySeries):
+        daily_data = TrophySeries.from_daily_data(daily_data)
 
-        x_dates.append(date_obj)
-        y_trophies.append(d.get('trophies'))
+    points = daily_data.points()
+    x_dates = [index for index, _ in points]
+    y_trophies = [trophies for _, trophies in points]
 
     # Plot the data only if we have valid points
     if x_dates and y_trophies:
-        # Sort data points by date
-        sorted_data = sorted(zip(x_dates, y_trophies))
-        x_dates, y_trophies = zip(*sorted_data)
-
-        # Convert dates to matplotlib format
-        x_dates_mpl = [mdates.date2num(datetime.datetime.combine(d, datetime.time())) for d in x_dates]
+        # Days are consecutive offsets from the series start, so matplotlib dates are plain additions
+        first_day_mpl = mdates.date2num(datetime.datetime.combine(daily_data.date_at(0), datetime.time()))
+        x_dates_mpl = [first_day_mpl + index for index in x_dates]
 
         # Plot with improved styling
         ax_chart.plot(x_dates_mpl, y_trophies, marker='o', markersize=5, linewidth=2.5,
@@ -255,20 +250,49 @@ def generate_chart(player_info, daily_data, final_trophies, average_offense, ave
         spine.set_linewidth(1)
 
     # fig.tight_layout(pad=0.5)  # Reduced padding for tighter layout
+    encode_start = time.perf_counter()
+    metrics.observe_chart_stage('render', encode_start - render_start)
+    timing.record('render', encode_start - render_start)
+
     buf = BytesIO()
-    plt.savefig(buf, format='png', dpi=120, bbox_inches='tight', facecolor='white', pad_inches=0.1)
+    fig.savefig(buf, format='png', dpi=120, bbox_inches='tight', facecolor='white', pad_inches=0.1)
     buf.seek(0)
     plt.close(fig)
+    metrics.observe_chart_stage('encode', time.perf_counter() - encode_start)
+    timing.record('png', time.perf_counter() - encode_start)
     return buf
 
 
+def warm_up():
+    """Render a small figure with text, loading the font cache, FreeType and the PNG writer"""
+    fig, ax = plt.subplots(figsize=(2, 1))
+    ax.text(0.5, 0.5, "Warmup", fontsize=12, fontweight='bold', ha='center', va='center')
+    ax.plot([0, 1], [0, 1])
+    fig.savefig(BytesIO(), format='png', dpi=50)
+    plt.close(fig)
+
+
+# Resized league icons and clan badges by (url, size). Asset URLs change with the image, so entries never go
+# stale; there are only a few dozen leagues and badges in play, the cap just bounds a misbehaving upstream.
+IMAGE_CACHE_SIZE = 512
+_image_cache = {}
+
+
 def fetch_and_resize_image(url, size):
     """Fetch an image from a URL and resize it. Returns a PIL Image."""
+    img = _image_cache.get((url, size))
+    if img is not None:
+        return img
+
     try:
-        resp = requests.get(url, timeout=10)
+        resp = upstream_get(url, 'image', timing_phase='image', timeout=10)
         resp.raise_for_status()
         img = Image.open(BytesIO(resp.content))
         img = img.resize(size, Image.Resampling.LANCZOS)
-        return img
     except Exception:
+        # Not cached, the next chart tries again
         return Image.new('RGBA', size, (255, 255, 255, 0))
+
+    if len(_image_cache) < IMAGE_CACHE_SIZE:
+        _image_cache[(url, size)] = img
+    return img
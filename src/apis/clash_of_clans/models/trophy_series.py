@@ -0,0 +1,159 @@
+# src/apis/clash_of_clans/models/trophy_series.py
+import datetime
+import struct
+import sys
+from array import array
+from src.core.redis_service import register_cache_type
+
+# The binary layout is little-endian, arrays are native
+NATIVE_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+@register_cache_type
+class TrophySeries:
+    """
+    Compact daily Legend League series: one slot per consecutive day
+
+    Days are stored as an offset from a start day (proleptic Gregorian ordinal)
+    with int32 offense, defense and end-of-day trophies, plus a missing-value
+    mask for days without logs. Serializes to a small fixed binary layout:
+
+        header    '<4sHi'  magic b'TRS1', day count, start day ordinal
+        offense   int32 * count
+        defense   int32 * count
+        trophies  int32 * count
+        missing   uint8 * count (1 = no data for that day)
+    """
+
+    __slots__ = ('start_day', 'offense', 'defense', 'trophies', 'missing')
+
+    MAGIC = b'TRS1'
+    HEADER = struct.Struct('<4sHi')
+
+    def __init__(self, start_day, offense, defense, trophies, missing):
+        self.start_day = start_day
+        self.offense = offense
+        self.defense = defense
+        self.trophies = trophies
+        self.missing = missing
+
+    @classmethod
+    def empty(cls, start_date, n_days):
+        """Series of n_days missing days starting at start_date"""
+        return cls(
+            start_date.toordinal(),
+            array('i', bytes(4 * n_days)),
+            array('i', bytes(4 * n_days)),
+            array('i', bytes(4 * n_days)),
+            bytearray(b'\x01' * n_days)
+        )
+
+    def __len__(self):
+        return len(self.missing)
+
+    def __eq__(self, other):
+        if not isinstance(other, TrophySeries):
+            return NotImplemented
+        return self.to_bytes() == other.to_bytes()
+
+    def set_day(self, index, offense, defense, trophies):
+        """Record data for the day at index"""
+        self.offense[index] = int(round(offense))
+        self.defense[index] = int(round(defense))
+        self.trophies[index] = int(trophies)
+        self.missing[index] = 0
+
+    def truncate(self, n_days):
+        """Drop days from n_days onwards"""
+        del self.offense[n_days:]
+        del self.defense[n_days:]
+        del self.trophies[n_days:]
+        del self.missing[n_days:]
+
+    def date_at(self, index):
+        return datetime.date.fromordinal(self.start_day + index)
+
+    def points(self):
+        """(day index, trophies) for every day with data, in date order"""
+        trophies = self.trophies
+        return [(index, trophies[index]) for index, missing in enumerate(self.missing) if not missing]
+
+    def last_index(self):
+        """Index of the latest day with data, or None"""
+        position = self.missing.rfind(b'\x00')
+        return position if position >= 0 else None
+
+    def to_bytes(self):
+        return b''.join((
+            self.HEADER.pack(self.MAGIC, len(self), self.start_day),
+            self._little_endian(self.offense),
+            self._little_endian(self.defense),
+            self._little_endian(self.trophies),
+            bytes(self.missing)
+        ))
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, count, start_day = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError("Not a TrophySeries payload")
+
+        offset = cls.HEADER.size
+        columns = []
+        for _ in range(3):
+            column = array('i')
+            column.frombytes(data[offset:offset + 4 * count])
+            if not NATIVE_LITTLE_ENDIAN:
+                column.byteswap()
+            columns.append(column)
+            offset += 4 * count
+
+        return cls(start_day, *columns, bytearray(data[offset:offset + count]))
+
+    @staticmethod
+    def _little_endian(column):
+        if NATIVE_LITTLE_ENDIAN:
+            return column.tobytes()
+        swapped = array('i', column)
+        swapped.byteswap()
+        return swapped.tobytes()
+
+    def to_daily_data(self):
+        """Expand into the list-of-dicts form ({'date', 'offense', 'defense', 'trophies'})"""
+        daily_data = []
+        for index, missing in enumerate(self.missing):
+            if missing:
+                daily_data.append({'date': self.date_at(index), 'offense': None, 'defense': None, 'trophies': None})
+            else:
+                daily_data.append({
+                    'date': self.date_at(index),
+                    'offense': self.offense[index],
+                    'defense': self.defense[index],
+                    'trophies': self.trophies[index]
+                })
+        return daily_data
+
+    @classmethod
+    def from_daily_data(cls, daily_data):
+        """Build a series from the list-of-dicts form (dates may be date objects or ISO strings)"""
+        days = {}
+        for day_data in daily_data:
+            date = day_data.get('date')
+            if isinstance(date, str):
+                try:
+                    date = datetime.date.fromisoformat(date)
+                except ValueError:
+                    continue
+            if date is not None:
+                days[date.toordinal()] = day_data
+
+        if not days:
+            return cls.empty(datetime.date.today(), 0)
+
+        start_day = min(days)
+        series = cls.empty(datetime.date.fromordinal(start_day), max(days) - start_day + 1)
+        for ordinal, day_data in days.items():
+            if day_data.get('trophies') is not None:
+                series.set_day(ordinal - start_day, day_data.get('offense') or 0,
+                               day_data.get('defense') or 0, day_data['trophies'])
+        return series
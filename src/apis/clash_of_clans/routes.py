@@ -1,72 +1,114 @@
 # src/apis/clash_of_clans/routes.py
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import JSONResponse, StreamingResponse
-import json
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, Response
+from pydantic import BaseModel
+from typing import List, Optional
+from contextlib import aclosing
 import time
 import config
-from src.apis.clash_of_clans.services.clash_service import ClashApiClient, ServiceUnavailableError, PlayerNotFoundError, AuthenticationError
-from src.apis.clash_of_clans.services.player_essentials_service import PlayerEssentialsService
-from src.apis.clash_of_clans.services.data_fetcher import get_player_data_with_keys
-from src.apis.clash_of_clans.chart_generator import generate_chart
-from src.core.redis_service import cache_get, cache_set
+from src.apis.clash_of_clans.services.clash_service import ClashApiClient, ServiceUnavailableError, PlayerNotFoundError, ClanNotFoundError, AuthenticationError, PLAYER_FIELDS
+from src.apis.clash_of_clans.services.player_essentials_service import ESSENTIALS_FIELDS
+from src.apis.clash_of_clans.services.essentials_snapshots import get_patch, VERSION_HEADER
+from src.apis.clash_of_clans.services.player_responses import (
+    fields_cache_suffix, refresh_player_full, refresh_player_essentials, chart_image_cache_key, render_player_chart,
+    warm_up_chart_renderer
+)
+from src.apis.clash_of_clans.services.live_feed import live_feed
+from src.apis.clash_of_clans.services import watchlist
+from src.core.response_cache import CachedResponse, dumps, response_cache_get_async, response_cache_get_many_async, response_cache_set
+from src.core.concurrency import upstream_governor
+from src.core.encodings import negotiate, get_variant, PACKED_LAYOUT
+from src.core import warmup
 from io import BytesIO
 
 # Create router with prefix for clash of clans API
 clash_router = APIRouter(prefix="/clash-of-clans", tags=["Clash of Clans"])
 
+# The chart modules (matplotlib, numpy, PIL) are not imported at boot, preload them after startup instead
+if config.CHART_WARMUP:
+    warmup.register('chart renderer', warm_up_chart_renderer)
+
+
+def parse_fields(fields, allowed):
+    """
+    Parse and validate a comma separated sparse fieldset
+
+    Returns:
+        tuple: Requested fields in canonical order, or None when no projection was requested
+    """
+    if fields is None:
+        return None
+
+    requested = {field.strip() for field in fields.split(',') if field.strip()}
+    unknown = sorted(requested.difference(allowed))
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid fields: {', '.join(unknown) or '(empty)'}. Allowed fields: {', '.join(allowed)}"
+        )
+
+    # Asking for every field is the full document, share its cache entry
+    if len(requested) == len(allowed):
+        return None
+
+    return tuple(field for field in allowed if field in requested)
+
+
+def parse_layout(layout):
+    """Validate the optional response layout"""
+    if layout is not None and layout != PACKED_LAYOUT:
+        raise HTTPException(status_code=400, detail=f"Invalid layout: {layout}. Allowed layouts: {PACKED_LAYOUT}")
+    return layout
+
 
 @clash_router.get("/player", summary="Get full player information", description="Get complete player data directly from Clash of Clans API")
 async def get_player_info(
-    tag: str = Query(..., description="Player tag (with or without # prefix)")
+    request: Request,
+    tag: str = Query(..., description="Player tag (with or without # prefix)"),
+    fields: str = Query(None, description="Comma separated top-level fields to return, e.g. heroes,heroEquipment"),
+    layout: str = Query(None, description="'packed' turns arrays of objects into columnar objects")
 ):
     """Get full player information directly from Clash of Clans API"""
     start_time = time.time()
+    player_fields = parse_fields(fields, PLAYER_FIELDS)
+    layout = parse_layout(layout)
+    media_type = negotiate(request.headers.get('accept'))
+    player_timeout = config.CACHE_TIMEOUTS['player_data']
 
     try:
         # Standardize the player tag
         if not tag.startswith('#'):
             tag = '#' + tag
         player_tag = tag.upper()
+        watchlist.record_request(player_tag)
 
-        # Check cache first
-        cache_key = f"player_full:{player_tag}"
-        cached_data = cache_get(cache_key)
+        # Check cache first - stored as final response bytes, served without decoding
+        cache_key = f"player_full:{player_tag}{fields_cache_suffix(player_fields)}"
+        cached_response = await response_cache_get_async(cache_key)
 
-        if cached_data is not None:
+        if cached_response is not None:
             response_time = time.time() - start_time
-            print(f"CACHED player data served in {response_time:.3f}s for {player_tag}")
 
             # Add performance headers
             headers = {
                 'X-Cache': 'HIT',
-                'X-Response-Time': f"{response_time:.3f}s"
+                'X-Response-Time': f"{response_time:.3f}s",
+                'Vary': 'Accept'
             }
-            return JSONResponse(content=cached_data, headers=headers)
+            return get_variant(cached_response, media_type, layout, player_timeout).to_response(request, headers)
 
         # Cache miss - fetch from API
-        print(f"Cache MISS for full player data: {player_tag}")
-
-        # Initialize the Clash API client with static API key from config
-        clash_client = ClashApiClient(api_token=config.COC_API_TOKEN)
-
-        # Get player data
-        api_start = time.time()
-        player_data = clash_client.get_player(player_tag)
-        api_time = time.time() - api_start
-
-        # Cache the result for 5 minutes
-        cache_set(cache_key, player_data, timeout=300)
+        player_response = refresh_player_full(player_tag, player_fields)
 
         response_time = time.time() - start_time
-        print(f"FRESH player data served in {response_time:.3f}s (API: {api_time:.3f}s) for {player_tag}")
 
         # Add performance headers
         headers = {
             'X-Cache': 'MISS',
             'X-Response-Time': f"{response_time:.3f}s",
-            'X-API-Time': f"{api_time:.3f}s"
+            'Vary': 'Accept'
         }
-        return JSONResponse(content=player_data, headers=headers)
+        return get_variant(player_response, media_type, layout, player_timeout).to_response(request, headers)
 
     except Exception as e:
         response_time = time.time() - start_time
@@ -76,67 +118,63 @@ async def get_player_info(
 
 @clash_router.get("/player/essentials", summary="Get essential player data", description="Get optimized player data for mobile apps - smaller payload, faster loading")
 async def get_player_essentials(
-    tag: str = Query(..., description="Player tag (with or without # prefix)")
+    request: Request,
+    tag: str = Query(..., description="Player tag (with or without # prefix)"),
+    fields: str = Query(None, description="Comma separated essentials sections to compute, e.g. heroes,heroEquipment"),
+    since: int = Query(None, description="Essentials version the client already has - returns a merge patch or 204 if unchanged"),
+    layout: str = Query(None, description="'packed' turns arrays of objects into columnar objects")
 ):
     """Get essential player information optimized for mobile app"""
     start_time = time.time()
+    essentials_fields = parse_fields(fields, ESSENTIALS_FIELDS)
+    layout = parse_layout(layout)
+    media_type = negotiate(request.headers.get('accept'))
+    if since is not None and essentials_fields:
+        raise HTTPException(status_code=400, detail="since cannot be combined with fields")
 
     try:
         # Standardize the player tag
         if not tag.startswith('#'):
             tag = '#' + tag
         player_tag = tag.upper()
+        watchlist.record_request(player_tag)
 
-        # Check cache for processed essentials data
-        essentials_cache_key = f"player_essentials:{player_tag}"
-        cached_essentials = cache_get(essentials_cache_key)
-
-        if cached_essentials is not None:
-            response_time = time.time() - start_time
-            print(f"CACHED essentials data served in {response_time:.3f}s for {player_tag}")
+        # Check cache for the serialized essentials response
+        essentials_cache_key = f"player_essentials:{player_tag}{fields_cache_suffix(essentials_fields)}"
+        essentials_response = await response_cache_get_async(essentials_cache_key)
 
-            # Use custom JSON serialization to preserve OrderedDict order
-            json_str = json.dumps(cached_essentials, indent=2)
-            headers = {
-                'X-Cache': 'HIT',
-                'X-Response-Time': f"{response_time:.3f}s"
-            }
-            return JSONResponse(content=cached_essentials, headers=headers, media_type='application/json')
+        if essentials_response is not None:
+            cache_status = 'HIT'
+        else:
+            # Cache miss - need to fetch and process data
+            essentials_response, cache_status = refresh_player_essentials(player_tag, essentials_fields)
 
-        # Cache miss - need to fetch and process data
-        print(f"Cache MISS for essentials data: {player_tag}")
+        response_time = time.time() - start_time
 
-        # Initialize services with static API key from config
-        clash_client = ClashApiClient(api_token=config.COC_API_TOKEN)
-        essentials_service = PlayerEssentialsService()
+        headers = {
+            'X-Cache': cache_status,
+            'X-Response-Time': f"{response_time:.3f}s",
+            'Vary': 'Accept'
+        }
 
-        # Get player data (this call itself should be cached)
-        api_start = time.time()
-        player_data = clash_client.get_player(player_tag)
-        api_time = time.time() - api_start
+        if since is not None:
+            current_version = essentials_response.headers.get(VERSION_HEADER)
 
-        # Extract and format essential data
-        processing_start = time.time()
-        essential_data = essentials_service.format_player_essentials(player_data)
-        processing_time = time.time() - processing_start
+            # Nothing changed since the client's copy
+            if current_version == str(since):
+                headers[VERSION_HEADER] = current_version
+                return Response(status_code=204, headers=headers)
 
-        # Cache the processed essentials data for 5 minutes
-        cache_set(essentials_cache_key, essential_data, timeout=300)
+            # Serve the precomputed diff; unknown or expired versions get the full document
+            patch_response = get_patch(player_tag, since, current_version) if current_version else None
+            if patch_response is not None:
+                return patch_response.to_response(request, headers)
 
-        response_time = time.time() - start_time
-        print(
-            f"FRESH essentials data served in {response_time:.3f}s "
-            f"(API: {api_time:.3f}s, Processing: {processing_time:.3f}s) for {player_tag}"
+        # Encoded variants (MessagePack, CBOR, packed layout) are cached next to the JSON
+        essentials_response = get_variant(
+            essentials_response, media_type, layout, config.CACHE_TIMEOUTS['player_essentials']
         )
-
-        # Use custom JSON serialization to preserve OrderedDict order
-        headers = {
-            'X-Cache': 'MISS',
-            'X-Response-Time': f"{response_time:.3f}s",
-            'X-API-Time': f"{api_time:.3f}s",
-            'X-Processing-Time': f"{processing_time:.3f}s"
-        }
-        return JSONResponse(content=essential_data, headers=headers, media_type='application/json')
+        return essentials_response.to_response(request, headers)
 
     except Exception as e:
         response_time = time.time() - start_time
@@ -144,9 +182,268 @@ async def get_player_essentials(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class PlayerBatchRequest(BaseModel):
+    tags: List[str]
+    fields: Optional[str] = None
+
+
+def standardize_tags(tags):
+    """Standardize player tags, dropping duplicates while keeping request order"""
+    player_tags = []
+    for tag in tags:
+        tag = tag.strip().upper()
+        if not tag:
+            continue
+        if not tag.startswith('#'):
+            tag = '#' + tag
+        if tag not in player_tags:
+            player_tags.append(tag)
+
+    if not player_tags:
+        raise HTTPException(status_code=400, detail="No player tags given")
+    if len(player_tags) > config.BATCH_MAX_TAGS:
+        raise HTTPException(status_code=400, detail=f"Too many player tags (max {config.BATCH_MAX_TAGS})")
+    return player_tags
+
+
+def batch_error(error):
+    """Per-tag error entry for a failed fetch"""
+    if isinstance(error, PlayerNotFoundError):
+        return {'status': 404, 'detail': str(error)}
+    if isinstance(error, ServiceUnavailableError):
+        return {'status': 503, 'detail': str(error)}
+    return {'status': 500, 'detail': str(error)}
+
+
+async def resolve_batch(player_tags, cache_key_for, refresh):
+    """
+    Resolve cached responses for many tags at once
+
+    All cache hits come from a single MGET. Misses are refreshed concurrently in
+    worker threads under the upstream governor; a failure only affects its own tag.
+
+    Returns:
+        tuple: ({tag: CachedResponse}, {tag: error dict}, number of misses)
+    """
+    entries = await response_cache_get_many_async([cache_key_for(player_tag) for player_tag in player_tags])
+    results = {player_tag: entry for player_tag, entry in zip(player_tags, entries) if entry is not None}
+    misses = [player_tag for player_tag in player_tags if player_tag not in results]
+
+    errors = {}
+    async for player_tag, outcome in upstream_governor.map_as_completed(refresh, misses):
+        if isinstance(outcome, Exception):
+            print(f"Batch fetch failed for {player_tag}: {str(outcome)}")
+            errors[player_tag] = batch_error(outcome)
+        else:
+            results[player_tag] = outcome
+
+    return results, errors, len(misses)
+
+
+def batch_response(player_tags, results, errors, misses, start_time):
+    """
+    Build {"results": {tag: document}, "errors": {tag: {status, detail}}}
+
+    Cached documents are spliced in as their stored JSON bytes, never re-encoded.
+    """
+    documents = b','.join(
+        dumps(player_tag) + b':' + results[player_tag].body for player_tag in player_tags if player_tag in results
+    )
+    body = b'{"results":{' + documents + b'},"errors":' + dumps(errors) + b'}'
+
+    response_time = time.time() - start_time
+    print(f"Batch of {len(player_tags)} served in {response_time:.3f}s ({misses} misses, {len(errors)} errors)")
+
+    return Response(content=body, media_type='application/json', headers={
+        'X-Cache-Hits': str(len(player_tags) - misses),
+        'X-Cache-Misses': str(misses),
+        'X-Response-Time': f"{response_time:.3f}s"
+    })
+
+
+@clash_router.post("/players:batch", summary="Get full player information for many players", description="Get complete player data for up to BATCH_MAX_TAGS players in one request")
+async def get_players_batch(batch: PlayerBatchRequest):
+    """Get full player data for many players, with per-tag results and errors"""
+    start_time = time.time()
+    player_fields = parse_fields(batch.fields, PLAYER_FIELDS)
+    player_tags = standardize_tags(batch.tags)
+    suffix = fields_cache_suffix(player_fields)
+
+    results, errors, misses = await resolve_batch(
+        player_tags,
+        lambda player_tag: f"player_full:{player_tag}{suffix}",
+        lambda player_tag: refresh_player_full(player_tag, player_fields)
+    )
+    return batch_response(player_tags, results, errors, misses, start_time)
+
+
+@clash_router.post("/players/essentials:batch", summary="Get essential player data for many players", description="Get essentials for up to BATCH_MAX_TAGS players (e.g. a clan roster) in one request")
+async def get_players_essentials_batch(batch: PlayerBatchRequest):
+    """Get essentials for many players, with per-tag results and errors"""
+    start_time = time.time()
+    essentials_fields = parse_fields(batch.fields, ESSENTIALS_FIELDS)
+    player_tags = standardize_tags(batch.tags)
+    suffix = fields_cache_suffix(essentials_fields)
+
+    results, errors, misses = await resolve_batch(
+        player_tags,
+        lambda player_tag: f"player_essentials:{player_tag}{suffix}",
+        lambda player_tag: refresh_player_essentials(player_tag, essentials_fields)[0]
+    )
+    return batch_response(player_tags, results, errors, misses, start_time)
+
+
+def standardize_tag(tag):
+    """Standardize a player or clan tag ('abc' -> '#ABC')"""
+    if not tag.startswith('#'):
+        tag = '#' + tag
+    return tag.upper()
+
+
+def clan_error(error):
+    """Map a failed clan lookup to an HTTPException"""
+    if isinstance(error, ClanNotFoundError):
+        return HTTPException(status_code=404, detail=str(error))
+    if isinstance(error, ServiceUnavailableError):
+        return HTTPException(status_code=503, detail=str(error))
+    return HTTPException(status_code=500, detail=str(error))
+
+
+@clash_router.get("/clan", summary="Get clan information", description="Get clan data directly from Clash of Clans API")
+async def get_clan_info(
+    request: Request,
+    tag: str = Query(..., description="Clan tag (with or without # prefix)")
+):
+    """Get clan information, cached as response bytes"""
+    start_time = time.time()
+    clan_tag = standardize_tag(tag)
+    cache_key = f"clan:{clan_tag}"
+
+    clan_response = await response_cache_get_async(cache_key)
+    cache_status = 'HIT'
+    if clan_response is None:
+        cache_status = 'MISS'
+        try:
+            clan_data = ClashApiClient(api_token=config.COC_API_TOKEN).get_clan(clan_tag)
+        except Exception as e:
+            print(f"Error fetching clan {clan_tag}: {str(e)}")
+            raise clan_error(e)
+
+        clan_response = CachedResponse.from_value(clan_data)
+        response_cache_set(cache_key, clan_response, timeout=config.CACHE_TIMEOUTS['clan_data'])
+
+    response_time = time.time() - start_time
+    return clan_response.to_response(request, {
+        'X-Cache': cache_status,
+        'X-Response-Time': f"{response_time:.3f}s"
+    })
+
+
+@clash_router.get("/clan/members/essentials", summary="Stream essentials for every clan member", description="Stream each clan member's essentials as NDJSON lines as soon as they are ready")
+async def get_clan_members_essentials(
+    tag: str = Query(..., description="Clan tag (with or without # prefix)"),
+    fields: str = Query(None, description="Comma separated essentials sections to compute, e.g. heroes,heroEquipment")
+):
+    """
+    Stream essentials for all members of a clan as NDJSON
+
+    Each line is {"tag": ..., "essentials": {...}} or {"tag": ..., "error": {status, detail}}.
+    Members with cached essentials are written first, straight from one MGET; the rest
+    are fetched with bounded parallelism and written in completion order.
+    """
+    start_time = time.time()
+    essentials_fields = parse_fields(fields, ESSENTIALS_FIELDS)
+    clan_tag = standardize_tag(tag)
+    suffix = fields_cache_suffix(essentials_fields)
+
+    try:
+        members = ClashApiClient(api_token=config.COC_API_TOKEN).get_clan_members(clan_tag)
+    except Exception as e:
+        print(f"Error fetching members of clan {clan_tag}: {str(e)}")
+        raise clan_error(e)
+
+    member_tags = [member['tag'] for member in members.get('items', []) if member.get('tag')]
+    entries = await response_cache_get_many_async([f"player_essentials:{member_tag}{suffix}" for member_tag in member_tags])
+    misses = [member_tag for member_tag, entry in zip(member_tags, entries) if entry is None]
+
+    def essentials_line(member_tag, entry):
+        return b'{"tag":' + dumps(member_tag) + b',"essentials":' + entry.body + b'}\n'
+
+    async def stream():
+        for member_tag, entry in zip(member_tags, entries):
+            if entry is not None:
+                yield essentials_line(member_tag, entry)
+
+        refresh = lambda member_tag: refresh_player_essentials(member_tag, essentials_fields)[0]
+        async for member_tag, outcome in upstream_governor.map_as_completed(refresh, misses):
+            if isinstance(outcome, Exception):
+                print(f"Clan member fetch failed for {member_tag}: {str(outcome)}")
+                yield dumps({'tag': member_tag, 'error': batch_error(outcome)}) + b'\n'
+            else:
+                yield essentials_line(member_tag, outcome)
+
+        print(f"Clan {clan_tag} members streamed in {time.time() - start_time:.3f}s "
+              f"({len(member_tags)} members, {len(misses)} misses)")
+
+    return StreamingResponse(stream(), media_type='application/x-ndjson', headers={
+        'X-Clan-Members': str(len(member_tags)),
+        'X-Cache-Hits': str(len(member_tags) - len(misses)),
+        'X-Cache-Misses': str(len(misses))
+    })
+
+
+@clash_router.get("/live", summary="Live trophy feed (Server-Sent Events)", description="Stream live Legend League trophy updates for a player. Also available as a WebSocket on the same path.")
+async def live_trophies_sse(
+    request: Request,
+    tag: str = Query(..., description="Player tag (with or without # prefix)")
+):
+    """
+    Stream live trophy events as SSE
+
+    The first event is the latest known state ('snapshot'), then one 'update' event
+    per detected change with the new attack/defense logs.
+    """
+    player_tag = standardize_tag(tag)
+
+    async def events():
+        async with aclosing(live_feed.subscribe(player_tag)) as subscription:
+            async for event in subscription:
+                if await request.is_disconnected():
+                    break
+                if event is None:
+                    yield b': keepalive\n\n'
+                else:
+                    yield b'event: ' + event['type'].encode() + b'\ndata: ' + dumps(event) + b'\n\n'
+
+    return StreamingResponse(events(), media_type='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Let nginx pass events through immediately
+    })
+
+
+@clash_router.websocket("/live")
+async def live_trophies_websocket(
+    websocket: WebSocket,
+    tag: str = Query(..., description="Player tag (with or without # prefix)")
+):
+    """Stream live trophy events as WebSocket text messages (same events as the SSE feed)"""
+    player_tag = standardize_tag(tag)
+    await websocket.accept()
+
+    try:
+        async with aclosing(live_feed.subscribe(player_tag)) as subscription:
+            async for event in subscription:
+                await websocket.send_text(dumps(event or {'type': 'heartbeat'}).decode())
+    except WebSocketDisconnect:
+        pass
+
+
 @clash_router.get("/chart", summary="Generate player chart", description="Generate and return a trophy progression chart (for Legend League players only)")
 async def get_player_chart(
-    tag: str = Query(..., description="Player tag (with or without # prefix)")
+    request: Request,
+    tag: str = Query(..., description="Player tag (with or without # prefix)"),
+    seasons: int = Query(None, ge=1, le=config.TROPHY_HISTORY_MAX_SEASONS,
+                         description="Chart the last N seasons from locally stored history instead of the live season")
 ):
     """Generate and return a chart for the player's trophy progress with aggressive caching"""
 
@@ -154,77 +451,36 @@ async def get_player_chart(
     if not tag.startswith('#'):
         tag = '#' + tag
     player_tag = tag.upper()
+    watchlist.record_request(player_tag)
 
     # PERFORMANCE OPTIMIZATION: Check for cached chart image first
-    chart_cache_key = f"chart_image:{player_tag}"
-
-    # Try to get cached chart (cache for 10 minutes for charts)
-    cached_chart = cache_get(chart_cache_key)
-    if cached_chart is not None:
-        print(f"Serving cached chart for {player_tag}")
-        try:
-            import base64
-
-            # Decode the base64 cached image
-            chart_buf = BytesIO(base64.b64decode(cached_chart))
-            return StreamingResponse(chart_buf, media_type='image/png')
-        except Exception as e:
-            print(f"Failed to serve cached chart: {str(e)}")
-            # Continue to generate new chart if cached version fails
+    chart_cache_key = chart_image_cache_key(player_tag, seasons)
 
+    # Try to get cached chart - stored as raw PNG bytes (cache for 10 minutes for charts)
     try:
-        start_time = time.time()
-
-        # Get player data with static API keys from config
-        player_info, daily_data, final_trophies, avg_offense, avg_defense, net_gain = get_player_data_with_keys(
-            player_tag, 
-            config.COC_API_TOKEN, 
-            config.CLASHPERK_API_TOKEN
-        )
-
-        data_fetch_time = time.time() - start_time
-        print(f"Data fetch took {data_fetch_time:.3f}s for {player_tag}")
-
-        # Generate chart
-        chart_start = time.time()
-        chart_buf = generate_chart(
-            player_info=player_info,
-            daily_data=daily_data,
-            final_trophies=final_trophies,
-            average_offense=avg_offense,
-            average_defense=avg_defense,
-            net_gain=net_gain
-        )
-
-        chart_gen_time = time.time() - chart_start
-        print(f"Chart generation took {chart_gen_time:.3f}s for {player_tag}")
+        cached_chart = await response_cache_get_async(chart_cache_key)
+    except Exception as e:
+        print(f"Failed to read cached chart: {str(e)}")
+        # Continue to generate new chart if cached version fails
+        cached_chart = None
 
-        # PERFORMANCE OPTIMIZATION: Cache the generated chart image
-        try:
-            import base64
-            chart_buf.seek(0)
-            chart_data = chart_buf.read()
-            chart_buf.seek(0)  # Reset buffer position
-
-            # Cache as base64 string for 10 minutes (600 seconds)
-            chart_b64 = base64.b64encode(chart_data).decode('utf-8')
-            cache_set(chart_cache_key, chart_b64, timeout=600)
-            print(f"Cached chart for {player_tag}")
-        except Exception as e:
-            print(f"Failed to cache chart: {str(e)}")
+    if cached_chart is not None:
+        return cached_chart.to_response(request)
 
-        total_time = time.time() - start_time
-        print(f"Total chart request took {total_time:.3f}s for {player_tag}")
+    try:
+        chart_response = render_player_chart(player_tag, seasons)
+        if chart_response is None:
+            return generate_error_image(
+                "No Trophy History",
+                f"No stored Legend League history for {player_tag} yet.\nRequest its chart first to start recording.",
+                404
+            )
 
-        return StreamingResponse(chart_buf, media_type='image/png')
+        return chart_response.to_response(request)
 
     except ServiceUnavailableError as e:
         print(f"External API unavailable: {str(e)}")
-        return generate_error_image(
-            "Service Temporarily Unavailable",
-            "The Clash of Clans API is currently down. Please try again later.",
-            503
-        )
+        return generate_error_image(*UNAVAILABLE_ERROR, 503)
 
     except PlayerNotFoundError as e:
         print(f"Player not found: {str(e)}")
@@ -236,25 +492,44 @@ async def get_player_chart(
 
     except AuthenticationError as e:
         print(f"API authentication error: {str(e)}")
-        return generate_error_image(
-            "API Authentication Error",
-            "Failed to authenticate with the Clash of Clans API. Please check API token configuration.",
-            500
-        )
+        return generate_error_image(*AUTHENTICATION_ERROR, 500)
 
     except Exception as e:
         print(f"Error generating chart: {str(e)}")
         import traceback
         print(traceback.format_exc())
-        return generate_error_image(
-            "Error Generating Chart",
-            "An unexpected error occurred. Please try again later.",
-            500
-        )
+        return generate_error_image(*UNEXPECTED_ERROR, 500)
+
+
+# Error images without a player tag in them, rendered once per process (before fork under gunicorn preload)
+UNAVAILABLE_ERROR = ("Service Temporarily Unavailable", "The Clash of Clans API is currently down. Please try again later.")
+AUTHENTICATION_ERROR = ("API Authentication Error",
+                        "Failed to authenticate with the Clash of Clans API. Please check API token configuration.")
+UNEXPECTED_ERROR = ("Error Generating Chart", "An unexpected error occurred. Please try again later.")
+STATIC_ERROR_IMAGES = (UNAVAILABLE_ERROR, AUTHENTICATION_ERROR, UNEXPECTED_ERROR)
+_static_error_pngs = {}
+
+
+def warm_up_error_images():
+    """Render the static error images ahead of time"""
+    for title, message in STATIC_ERROR_IMAGES:
+        _static_error_pngs[(title, message)] = render_error_png(title, message)
+
+
+if config.CHART_WARMUP:
+    warmup.register('error images', warm_up_error_images)
 
 
 def generate_error_image(title, message, status_code):
     """Generate a simple error image with a message"""
+    png = _static_error_pngs.get((title, message))
+    if png is None:
+        png = render_error_png(title, message)
+    return Response(png, media_type='image/png', status_code=status_code)
+
+
+def render_error_png(title, message):
+    """PNG bytes of an error image"""
     import matplotlib
     matplotlib.use('Agg')
     import matplotlib.pyplot as plt
@@ -268,8 +543,6 @@ def generate_error_image(title, message, status_code):
     ax.set_axis_off()
 
     buf = BytesIO()
-    plt.savefig(buf, format='png', dpi=80, facecolor='#f7f7f7', bbox_inches='tight')
-    buf.seek(0)
+    fig.savefig(buf, format='png', dpi=80, facecolor='#f7f7f7', bbox_inches='tight')
     plt.close(fig)
-
-    return StreamingResponse(buf, media_type='image/png', status_code=status_code)
\ No newline at end of file
+    return buf.getvalue()
\ No newline at end of file
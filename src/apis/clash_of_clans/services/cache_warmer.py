@@ -0,0 +1,158 @@
+# src/apis/clash_of_clans/services/cache_warmer.py
+import datetime
+import time
+import uuid
+from datetime import timezone, timedelta
+import redis
+import requests
+import config
+from src.core import redis_service
+from src.core.redis_service import force_refresh
+from src.core.concurrency import upstream_governor
+from src.apis.clash_of_clans.services import watchlist
+from src.apis.clash_of_clans.services.clash_service import (
+    ClashApiClient, ServiceUnavailableError, PlayerNotFoundError, project_player
+)
+from src.apis.clash_of_clans.services.season_calendar import SEASON_RESET_HOUR
+from src.apis.clash_of_clans.services.player_responses import (
+    refresh_player_full, refresh_player_essentials, render_player_chart
+)
+
+# Only one worker runs a warming pass at a time
+LOCK_KEY = 'cache_warmer:lock'
+
+
+def next_legend_reset(now):
+    """The next daily Legend League reset (5:00 AM UTC) strictly after now"""
+    reset = now.replace(hour=SEASON_RESET_HOUR, minute=0, second=0, microsecond=0)
+    return reset if reset > now else reset + timedelta(days=1)
+
+
+def is_rate_limited(error):
+    """Whether an upstream failure means we should slow down"""
+    if isinstance(error, ServiceUnavailableError):
+        return True
+    response = getattr(error, 'response', None)
+    return isinstance(error, requests.exceptions.HTTPError) and response is not None and response.status_code == 429
+
+
+class CacheWarmer:
+    """
+    Keeps the hottest players' caches warm
+
+    Every CACHE_WARM_INTERVAL seconds, and CACHE_WARM_RESET_DELAY seconds after each
+    daily Legend reset (when every chart goes stale at once), the watchlist's top
+    tags get their player data, essentials, legend data and chart refreshed. Work is
+    spread evenly over the pass window and runs under the upstream governor; rate
+    limiting or outages back the pass off instead of hammering upstream.
+    """
+
+    def __init__(self, governor=upstream_governor):
+        self.governor = governor
+        self.last_run = None
+        # Date of the last Legend reset whose pass has run
+        self.last_reset_date = None
+
+    def warm_player(self, player_tag):
+        """
+        Refresh every cached response for one player, bypassing @cached reads
+
+        The player is fetched from upstream once and its summary primed from that
+        payload; essentials and the chart then read those fresh entries, so a warm
+        costs one Clash of Clans and one ClashPerk call, each under its own
+        governor token.
+        """
+        clash_client = ClashApiClient(api_token=config.COC_API_TOKEN)
+        with force_refresh():
+            player_data = self.governor.call(clash_client.get_player, player_tag)
+            ClashApiClient.get_player_summary.prime(project_player(player_data), player_tag)
+
+            refresh_player_full(player_tag)
+            refresh_player_essentials(player_tag)
+            self.governor.call(render_player_chart, player_tag)
+
+    def warm_pass(self, window, reason):
+        """Warm the watchlist, spreading the tags evenly over window seconds"""
+        tags = watchlist.get_hot_tags(config.CACHE_WARM_WATCHLIST_SIZE)
+        if not tags:
+            return
+
+        client = redis_service.get_client()
+        # Unique per pass, so a pass that overran its lock never releases the next holder's
+        lock_token = uuid.uuid4().hex
+        if client is not None and not client.set(LOCK_KEY, lock_token, nx=True, ex=int(window) + 60):
+            print("Cache warming pass already running elsewhere, skipping")
+            return
+
+        start = time.monotonic()
+        spacing = window / len(tags)
+        warmed = failed = 0
+        print(f"Cache warming ({reason}): {len(tags)} players over {window:.0f}s")
+
+        try:
+            for index, player_tag in enumerate(tags):
+                delay = start + index * spacing - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+                try:
+                    self.warm_player(player_tag)
+                    warmed += 1
+                except PlayerNotFoundError:
+                    watchlist.remove(player_tag)
+                    failed += 1
+                except Exception as e:
+                    failed += 1
+                    print(f"Cache warming failed for {player_tag}: {str(e)}")
+                    if is_rate_limited(e):
+                        print(f"Upstream is throttling, backing off {config.CACHE_WARM_BACKOFF}s")
+                        time.sleep(config.CACHE_WARM_BACKOFF)
+                        # The rest of the schedule slides by the backoff
+                        start += config.CACHE_WARM_BACKOFF
+        finally:
+            if client is not None:
+                self._release_lock(client, lock_token)
+
+        print(f"Cache warming ({reason}) done in {time.monotonic() - start:.1f}s: {warmed} warmed, {failed} failed")
+
+    def _release_lock(self, client, lock_token):
+        """Delete the warming lock only if it is still ours"""
+        with client.pipeline() as pipe:
+            try:
+                pipe.watch(LOCK_KEY)
+                owner = pipe.get(LOCK_KEY)
+                if owner is not None and owner.decode() == lock_token:
+                    pipe.multi()
+                    pipe.delete(LOCK_KEY)
+                    pipe.execute()
+            except redis.WatchError:
+                pass
+
+    def run_forever(self):
+        """Warm on a fixed interval and right after every Legend reset"""
+        reset_delay = timedelta(seconds=config.CACHE_WARM_RESET_DELAY)
+        interval = timedelta(seconds=config.CACHE_WARM_INTERVAL)
+        while True:
+            now = datetime.datetime.now(timezone.utc)
+            # The latest reset whose pass is due (reset + delay <= now)
+            latest_reset = next_legend_reset(now - reset_delay) - timedelta(days=1)
+            if self.last_reset_date is None:
+                # Started after that reset: its pass belongs to whoever ran then, start with an interval pass
+                self.last_reset_date = latest_reset.date()
+
+            after_reset = latest_reset.date() != self.last_reset_date
+            if not after_reset and self.last_run is not None and now < self.last_run + interval:
+                next_run = min(latest_reset + timedelta(days=1) + reset_delay, self.last_run + interval)
+                time.sleep(max(0.0, (next_run - now).total_seconds()))
+                continue
+
+            self.last_run = now
+            try:
+                if after_reset:
+                    self.last_reset_date = latest_reset.date()
+                    self.warm_pass(config.CACHE_WARM_WINDOW, 'legend reset')
+                    watchlist.decay(config.CACHE_WARM_DECAY, config.CACHE_WARM_WATCHLIST_SIZE)
+                else:
+                    self.warm_pass(config.CACHE_WARM_INTERVAL / 2, 'interval')
+            except Exception as e:
+                print(f"Cache warming pass failed: {str(e)}")
@@ -3,6 +3,77 @@ import requests
 import config
 from src.core.redis_service import cached
 from src.core.retry_utils import retry_request
+from src.core.upstream import upstream_get
+from src.core.tracing import traced
+
+
+# Top-level keys of a Clash of Clans player payload that /player can project
+PLAYER_FIELDS = ('tag', 'name', 'townHallLevel', 'townHallWeaponLevel', 'expLevel', 'trophies', 'bestTrophies',
+                 'warStars', 'attackWins', 'defenseWins', 'builderHallLevel', 'builderBaseTrophies',
+                 'bestBuilderBaseTrophies', 'role', 'warPreference', 'donations', 'donationsReceived',
+                 'clanCapitalContributions', 'clan', 'league', 'builderBaseLeague', 'legendStatistics',
+                 'achievements', 'playerHouse', 'labels', 'troops', 'heroes', 'heroEquipment', 'spells')
+
+
+# Bump whenever project_player output changes so cached summaries of the old shape are ignored
+PLAYER_SUMMARY_VERSION = 1
+
+# Plain values copied as-is into the player summary
+SUMMARY_SCALAR_FIELDS = ('tag', 'name', 'townHallLevel', 'expLevel', 'trophies', 'warStars', 'defenseWins',
+                         'role', 'warPreference', 'donations', 'donationsReceived', 'clanCapitalContributions',
+                         'legends')
+
+# Members kept for each item of the unit lists
+SUMMARY_UNIT_FIELDS = ('name', 'level', 'maxLevel', 'village')
+
+# The only achievement read downstream (highest trophies)
+SUMMARY_ACHIEVEMENT = 'Sweet Victory!'
+
+
+def project_player(player_data):
+    """
+    Slim a full player payload down to the fields essentials, charts and routes read
+
+    Drops labels, playerHouse, builder base stats, legendStatistics and all but one
+    achievement, and trims units to name/level/maxLevel/village (heroes keep the
+    names of their equipped equipment). The result is a valid input for
+    PlayerEssentialsService and data_fetcher, which produce the same output from it
+    as from the full payload.
+    """
+    summary = {'schemaVersion': PLAYER_SUMMARY_VERSION}
+    for field in SUMMARY_SCALAR_FIELDS:
+        if field in player_data:
+            summary[field] = player_data[field]
+
+    if 'clan' in player_data:
+        clan = player_data['clan']
+        summary['clan'] = {key: clan[key] for key in ('name', 'tag', 'badgeUrls', 'clanLevel') if key in clan}
+
+    if 'league' in player_data:
+        league = player_data['league']
+        summary['league'] = {key: league[key] for key in ('name', 'iconUrls') if key in league}
+
+    summary['achievements'] = [
+        achievement for achievement in player_data.get('achievements', [])
+        if achievement.get('name') == SUMMARY_ACHIEVEMENT
+    ]
+
+    for field in ('troops', 'spells', 'heroEquipment'):
+        if field in player_data:
+            summary[field] = [
+                {key: unit[key] for key in SUMMARY_UNIT_FIELDS if key in unit} for unit in player_data[field]
+            ]
+
+    if 'heroes' in player_data:
+        heroes = []
+        for hero in player_data['heroes']:
+            slim_hero = {key: hero[key] for key in SUMMARY_UNIT_FIELDS if key in hero}
+            if 'equipment' in hero:
+                slim_hero['equipment'] = [{'name': item.get('name')} for item in hero['equipment']]
+            heroes.append(slim_hero)
+        summary['heroes'] = heroes
+
+    return summary
 
 
 class ClashApiClient:
@@ -20,14 +91,28 @@ class ClashApiClient:
         return player_tag.replace('#', '%23')
 
     @cached(timeout=300, use_stale_on_error=True)  # Cache for 5 minutes, use stale data on error
-    @retry_request(max_retries=3)
     def get_player(self, player_tag):
+        """Get the full player payload from Clash of Clans API (only /player needs all of it)"""
+        return self._fetch_player(player_tag)
+
+    @cached(timeout=300, use_stale_on_error=True, version=PLAYER_SUMMARY_VERSION)  # Cache for 5 minutes
+    def get_player_summary(self, player_tag):
+        """Get the slim player projection used by essentials and charts (see project_player)"""
+        return self.fetch_player_summary(player_tag)
+
+    def fetch_player_summary(self, player_tag):
+        """Get the slim player projection, bypassing the cache (live feed polling)"""
+        return project_player(self._fetch_player(player_tag))
+
+    @traced()
+    @retry_request(max_retries=3)
+    def _fetch_player(self, player_tag):
         """Get player information from Clash of Clans API"""
         formatted_tag = self._format_tag(player_tag)
         url = f'{self.base_url}/players/{formatted_tag}'
 
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = upstream_get(url, 'players', headers=self.headers, timeout=10)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.HTTPError as e:
@@ -44,6 +129,7 @@ class ClashApiClient:
                 raise
 
     @cached(timeout=3600, use_stale_on_error=True)  # Cache for 1 hour, use stale data on error
+    @traced()
     @retry_request(max_retries=3)
     def get_clan(self, clan_tag):
         """Get clan information from Clash of Clans API"""
@@ -51,17 +137,21 @@ class ClashApiClient:
         url = f'{self.base_url}/clans/{formatted_tag}'
 
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = upstream_get(url, 'clans', headers=self.headers, timeout=10)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 503:
                 print(f"Clash of Clans API is currently unavailable: {str(e)}")
                 raise ServiceUnavailableError("Clash of Clans API is currently unavailable. Please try again later.")
+            elif e.response.status_code == 404:
+                print(f"Clan not found: {clan_tag}")
+                raise ClanNotFoundError(f"Clan {clan_tag} not found.")
             else:
                 raise
 
     @cached(timeout=300, use_stale_on_error=True)  # Cache for 5 minutes, use stale data on error
+    @traced()
     @retry_request(max_retries=3)
     def get_clan_members(self, clan_tag):
         """Get clan members from Clash of Clans API"""
@@ -69,13 +159,16 @@ class ClashApiClient:
         url = f'{self.base_url}/clans/{formatted_tag}/members'
 
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = upstream_get(url, 'clan_members', headers=self.headers, timeout=10)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 503:
                 print(f"Clash of Clans API is currently unavailable: {str(e)}")
                 raise ServiceUnavailableError("Clash of Clans API is currently unavailable. Please try again later.")
+            elif e.response.status_code == 404:
+                print(f"Clan not found: {clan_tag}")
+                raise ClanNotFoundError(f"Clan {clan_tag} not found.")
             else:
                 raise
 
@@ -93,4 +186,9 @@ class AuthenticationError(Exception):
 
 class PlayerNotFoundError(Exception):
     """Raised when a requested player is not found"""
-    pass
\ No newline at end of file
+    pass
+
+
+class ClanNotFoundError(Exception):
+    """Raised when a requested clan is not found"""
+    pass
@@ -5,13 +5,15 @@ import config
 import logging
 from src.core.redis_service import cached
 from src.core.retry_utils import retry_request
+from src.core.upstream import upstream_get
+from src.core.tracing import traced
 
 
 class ClashKingClient:
     """Client for ClashKing API with combined ranking endpoints"""
 
     def __init__(self):
-        self.base_url = 'https://api.clashk.ing'
+        self.base_url = config.CLASHKING_BASE_URL
 
     def _format_tag(self, player_tag):
         """Format the player tag for API URLs"""
@@ -20,6 +22,7 @@ class ClashKingClient:
         return player_tag.replace('#', '%23')
 
     @cached(timeout=600, use_stale_on_error=True)  # Cache for 10 minutes
+    @traced()
     @retry_request(max_retries=3)
     def get_global_ranking(self, player_tag):
         """
@@ -30,7 +33,7 @@ class ClashKingClient:
         url = f'{self.base_url}/ranking/legends/{formatted_tag}'
 
         try:
-            response = requests.get(url, timeout=15)
+            response = upstream_get(url, 'legends_ranking', timeout=15)
             response.raise_for_status()
 
             data = response.json()
@@ -67,6 +70,7 @@ class ClashKingClient:
             return {}
 
     @cached(timeout=900, use_stale_on_error=True)  # Cache for 15 minutes
+    @traced()
     @retry_request(max_retries=2)
     def get_local_ranking_and_seasons(self, player_tag):
         """
@@ -102,7 +106,7 @@ class ClashKingClient:
         """Parse stats using streaming JSON for memory efficiency"""
         import ijson
 
-        with requests.get(url, stream=True, timeout=45) as response:
+        with upstream_get(url, 'player_stats', stream=True, timeout=45) as response:
             response.raise_for_status()
 
             legends_data = {}
@@ -133,7 +137,7 @@ class ClashKingClient:
 
     def _parse_stats_regular(self, url):
         """Fallback regular JSON parsing"""
-        response = requests.get(url, timeout=30)
+        response = upstream_get(url, 'player_stats', timeout=30)
         response.raise_for_status()
 
         data = response.json()
@@ -148,6 +152,7 @@ class ClashKingClient:
         return {}
 
     @cached(timeout=600, use_stale_on_error=True)  # Cache for 10 minutes
+    @traced()
     def get_combined_legends_data(self, player_tag):
         """
         Get combined legends data from both endpoints
@@ -1,11 +1,21 @@
 import datetime
 from datetime import timezone, timedelta
-import pytz
-from src.core.redis_service import cached
+import numpy as np
+from src.core.redis_service import cached, cache_get_raw, cache_set_raw
+from src.core.response_cache import dumps, loads
+from src.core.tracing import traced
 from src.apis.clash_of_clans.services.clash_service import ClashApiClient
 from src.apis.clash_of_clans.services.clashperk_service import ClashPerkClient
+from src.apis.clash_of_clans.services import season_calendar, trophy_history
+from src.apis.clash_of_clans.models.trophy_series import TrophySeries
 import config
 
+# Legend League days are 24h windows starting at 5:00 AM UTC
+DAY_MS = 24 * 60 * 60 * 1000
+
+# Bump when the persisted season aggregate layout changes
+AGGREGATE_VERSION = 1
+
 
 @cached(timeout=1800, use_stale_on_error=True)  # Cache for 30 minutes, use stale data on error
 def get_player_data(player_tag):
@@ -13,6 +23,7 @@ def get_player_data(player_tag):
     return get_player_data_with_keys(player_tag, config.COC_API_KEY, config.CLASHPERK_API_KEY)
 
 @cached(timeout=1800, use_stale_on_error=True)  # Cache for 30 minutes, use stale data on error
+@traced()
 def get_player_data_with_keys(player_tag, coc_api_key, clashperk_api_key=""):
     """Fetch and compute daily data from CoC & ClashPerk APIs with provided keys."""
     clash_client = ClashApiClient(api_token=coc_api_key)
@@ -20,7 +31,7 @@ def get_player_data_with_keys(player_tag, coc_api_key, clashperk_api_key=""):
 
     try:
         # Get player data from CoC API
-        player_json = clash_client.get_player(player_tag)
+        player_json = clash_client.get_player_summary(player_tag)
 
         player_name = player_json.get('name', 'Unknown')
         player_actual_tag = player_json.get('tag', player_tag)
@@ -56,136 +67,36 @@ def get_player_data_with_keys(player_tag, coc_api_key, clashperk_api_key=""):
                 'seasonId': ''
             }
 
-        # Clash of Clans Legend League resets at 5:00 AM UTC daily
-        utc_tz = pytz.UTC
-        
         logs = perk_json.get('logs', [])
         final_trophies = perk_json.get('trophies', 0)
         initial_trophies = perk_json.get('initial', 0)
         season_id = perk_json.get('seasonId', '')
 
-        # Determine season dates
-        if season_id:
-            try:
-                start_date, end_date = perk_client.get_season_start_end(season_id)
-                # Ensure dates are in UTC
-                if start_date.tzinfo != timezone.utc:
-                    start_date = start_date.astimezone(utc_tz)
-                if end_date.tzinfo != timezone.utc:
-                    end_date = end_date.astimezone(utc_tz)
-                season_str = perk_client.make_season_string(season_id, start_date, end_date)
-            except Exception:
-                # Fallback if season calculation fails
-                current_month = datetime.datetime.now().month
-                current_year = datetime.datetime.now().year
-                start_date = datetime.datetime(current_year, current_month, 1, 5, 0, 0, tzinfo=timezone.utc)
-                end_date = (start_date + timedelta(days=35)).replace(day=1)
-                season_str = f"Current Season"
+        # Determine season dates, falling back to the season in progress
+        try:
+            season = season_calendar.get_season(season_id) if season_id else None
+        except ValueError:
+            season = None
+
+        if season is not None:
+            season_str = season.display
         else:
-            start_date = datetime.datetime(2025, 2, 24, 5, 0, 0, tzinfo=timezone.utc)
-            end_date = datetime.datetime(2025, 3, 31, 5, 0, 0, tzinfo=timezone.utc)
-            season_str = "Unknown Season"
-
-        # Process the daily data
-        # Sort logs by timestamp to ensure correct trophy progression
-        sorted_logs = sorted(logs, key=lambda x: x.get('timestamp', 0))
-
-        # Initialize daily data structures
-        daily_data = []
-        day_data_dict = {}
-
-        # Set starting trophies to initial value
-        current_trophies = initial_trophies
-
-        # Track total offense and defense for averages
-        sum_offense = 0
-        sum_defense = 0
-        day_count = 0
-
-        # Process each day in the season
-        # Each "day" starts at 5:00 AM UTC (Legend League reset time)
-        current_day = start_date
-        while current_day <= end_date:
-            current_date = current_day.date()  # Convert to date object
-            next_day = current_day + timedelta(days=1)
-
-            day_offense = 0
-            day_defense = 0
-            day_has_logs = False
-            day_trophy_end = None
-
-            # Process logs for this day
-            for log_item in sorted_logs:
-                ts = log_item.get('timestamp', 0)
-                action_type = log_item.get('type', '')
-                inc = log_item.get('inc', 0)
-                # Important: Use 'end' value from log for the most accurate trophy count
-                log_end = log_item.get('end', current_trophies)
-
-                log_time = datetime.datetime.utcfromtimestamp(ts / 1000).replace(tzinfo=timezone.utc)
-
-                if current_day <= log_time < next_day:
-                    day_has_logs = True
-                    if action_type == 'attack':
-                        day_offense += inc
-                    elif action_type == 'defense':
-                        day_defense += abs(inc)  # Use absolute value for defense
-
-                    # Update trophy count to the latest value in the logs for this day
-                    day_trophy_end = log_end
-
-            # Store data for this day
-            date_str = current_date.isoformat()
-
-            if day_has_logs:
-                # Use the end trophy value from the last log entry of the day
-                current_trophies = day_trophy_end
-
-                day_data_dict[date_str] = {
-                    'date': current_date,  # Store actual date object
-                    'offense': day_offense,
-                    'defense': day_defense,
-                    'trophies': current_trophies
-                }
-
-                sum_offense += day_offense
-                sum_defense += day_defense
-                day_count += 1
-            else:
-                # Only add empty days if we don't already have data for this day
-                # and if the day is not in the future
-                if date_str not in day_data_dict and current_day <= datetime.datetime.now(timezone.utc):
-                    day_data_dict[date_str] = {
-                        'date': current_date,
-                        'offense': None,
-                        'defense': None,
-                        'trophies': None
-                    }
-
-            current_day = next_day
-
-        # Ensure the final trophy value is accurate
-        # If we have logs, the last value should match the final trophy count from the API
-        if sorted_logs and final_trophies != current_trophies:
-            print(
-                f"Trophy mismatch: calculated={current_trophies}, reported={final_trophies}. Using reported value."
+            season = season_calendar.current_season()
+            season_str = "Current Season"
+        start_date, end_date = season.start, season.end
+
+        # Process the daily data, folding only new logs into the persisted season aggregate
+        if season_id and season.season_id == season_id:
+            aggregate = update_season_aggregate(player_tag, season, logs, initial_trophies)
+            daily_data, average_offense, average_defense = daily_data_from_aggregate(
+                aggregate, start_date, final_trophies
             )
-            # Adjust the last day with trophy data to match the final value
-            for date_str in reversed(sorted(day_data_dict.keys())):
-                if day_data_dict[date_str]['trophies'] is not None:
-                    day_data_dict[date_str]['trophies'] = final_trophies
-                    break
-
-        # Convert the dictionary to a list, sorted by date
-        daily_data = [day_data_dict[date] for date in sorted(day_data_dict.keys())]
-
-        # Calculate averages
-        if day_count > 0:
-            average_offense = sum_offense / day_count
-            average_defense = sum_defense / day_count
+            record_history = True
         else:
-            average_offense = 0
-            average_defense = 0
+            daily_data, average_offense, average_defense = compute_daily_data(
+                logs, start_date, end_date, initial_trophies, final_trophies
+            )
+            record_history = False
 
         net_gain = average_offense - average_defense
 
@@ -199,6 +110,10 @@ def get_player_data_with_keys(player_tag, coc_api_key, clashperk_api_key=""):
             'seasonStr': season_str
         }
 
+        # Keep the season in the local history store for multi-season charts
+        if record_history:
+            trophy_history.record_season(player_tag, season, logs, daily_data, player_info)
+
         return (
             player_info,
             daily_data,
@@ -211,4 +126,236 @@ def get_player_data_with_keys(player_tag, coc_api_key, clashperk_api_key=""):
     except Exception as e:
         # Add more context to the error
         print(f"Error fetching data for player {player_tag}: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+def bucket_legend_logs(logs, start_ms, n_days):
+    """
+    Aggregate legend logs into Legend League days in a single vectorized pass
+
+    Timestamps are converted once into an int64 array, sorted (stably, like the
+    logs themselves) and mapped to a day index relative to the 5:00 UTC season
+    start. Offense/defense totals come from bincount, the last log of each day
+    from searchsorted.
+
+    Args:
+        logs: ClashPerk legend log entries
+        start_ms: Season start (a 5:00 UTC boundary) in epoch milliseconds
+        n_days: Number of season days
+
+    Returns:
+        tuple: (offense, defense, last_logs) per day, where last_logs[d] is the
+        latest log entry of day d or None when the day has no logs
+    """
+    offense = [0] * n_days
+    defense = [0] * n_days
+    last_logs = [None] * n_days
+    if not logs or n_days <= 0:
+        return offense, defense, last_logs
+
+    timestamps = np.fromiter((log.get('timestamp', 0) for log in logs), dtype=np.int64, count=len(logs))
+    order = np.argsort(timestamps, kind='stable')
+    day_index = (timestamps[order] - start_ms) // DAY_MS
+
+    # Keep only logs that fall inside the season days
+    lo, hi = np.searchsorted(day_index, [0, n_days])
+    if lo == hi:
+        return offense, defense, last_logs
+    order = order[lo:hi]
+    day_index = day_index[lo:hi]
+
+    types = [logs[i].get('type', '') for i in order]
+    incs = np.array([logs[i].get('inc', 0) for i in order])
+    is_attack = np.fromiter((t == 'attack' for t in types), dtype=bool, count=len(types))
+    is_defense = np.fromiter((t == 'defense' for t in types), dtype=bool, count=len(types))
+
+    to_number = int if incs.dtype.kind in 'iub' else float
+    offense = [to_number(v) for v in np.bincount(day_index[is_attack], weights=incs[is_attack], minlength=n_days)]
+    defense = [to_number(v) for v in np.bincount(day_index[is_defense], weights=np.abs(incs[is_defense]), minlength=n_days)]
+
+    # Logs are sorted, so the last log of day d sits right before the first log of day d + 1
+    last_positions = np.searchsorted(day_index, np.arange(n_days), side='right') - 1
+    for day, position in enumerate(last_positions.tolist()):
+        if position >= 0 and day_index[position] == day:
+            last_logs[day] = logs[order[position]]
+
+    return offense, defense, last_logs
+
+
+def new_season_aggregate(season_id, start_ms, n_days, initial_trophies):
+    """Create an empty running aggregate for one player's season"""
+    return {
+        'version': AGGREGATE_VERSION,
+        'season': season_id,
+        'start_ms': start_ms,
+        'n_days': n_days,
+        'initial': initial_trophies,
+        'offense': [0] * n_days,
+        'defense': [0] * n_days,
+        'has_logs': [False] * n_days,
+        'end': [None] * n_days,  # 'end' of the day's latest log
+        'end_missing': [False] * n_days,  # latest log had no 'end', use the day-start trophies
+        'watermark': None,  # newest log timestamp folded in so far
+        'watermark_count': 0,  # logs folded in at exactly the watermark timestamp
+        'log_count': 0
+    }
+
+
+def fold_legend_logs(aggregate, logs):
+    """
+    Fold logs newer than the aggregate's watermark into it
+
+    Only new logs are bucketed, so the cost is proportional to the new activity.
+
+    Returns:
+        bool: False (aggregate untouched) when the logs do not extend the logs
+        already folded in, e.g. ClashPerk dropped or rewrote history - rebuild then
+    """
+    if not logs:
+        return aggregate['log_count'] == 0
+
+    timestamps = np.fromiter((log.get('timestamp', 0) for log in logs), dtype=np.int64, count=len(logs))
+    watermark = aggregate['watermark']
+
+    if watermark is None:
+        if aggregate['log_count']:
+            return False
+        new_positions = np.arange(len(logs))
+    else:
+        ties = np.flatnonzero(timestamps == watermark)
+        seen_ties = aggregate['watermark_count']
+        already_folded = int(np.count_nonzero(timestamps < watermark)) + min(len(ties), seen_ties)
+        if len(ties) < seen_ties or already_folded != aggregate['log_count']:
+            return False
+        new_positions = np.sort(np.concatenate([np.flatnonzero(timestamps > watermark), ties[seen_ties:]]))
+
+    if len(new_positions):
+        new_logs = [logs[i] for i in new_positions.tolist()]
+        offense, defense, last_logs = bucket_legend_logs(new_logs, aggregate['start_ms'], aggregate['n_days'])
+
+        for day, last_log in enumerate(last_logs):
+            if last_log is None:
+                continue
+            aggregate['offense'][day] += offense[day]
+            aggregate['defense'][day] += defense[day]
+            aggregate['has_logs'][day] = True
+            aggregate['end_missing'][day] = 'end' not in last_log
+            aggregate['end'][day] = last_log.get('end')
+
+    newest = int(timestamps.max())
+    aggregate['watermark'] = newest
+    aggregate['watermark_count'] = int(np.count_nonzero(timestamps == newest))
+    aggregate['log_count'] = len(logs)
+    return True
+
+
+def update_season_aggregate(player_tag, season, logs, initial_trophies):
+    """
+    Load the player's persisted season aggregate, fold in new logs and store it back
+
+    The aggregate is keyed per tag and season, so a season rollover starts a new
+    one; it is also rebuilt from scratch if the season bounds, initial trophies or
+    already folded logs no longer match.
+
+    Args:
+        season: season_calendar.Season the logs belong to
+    """
+    start_ms = season.start_ms
+    n_days = season.day_count
+    aggregate_key = f"legend_season_agg:{player_tag}:{season.season_id}"
+
+    raw_aggregate = cache_get_raw(aggregate_key)
+    aggregate = loads(raw_aggregate) if raw_aggregate else None
+
+    if (aggregate is None or aggregate.get('version') != AGGREGATE_VERSION
+            or aggregate['start_ms'] != start_ms or aggregate['n_days'] != n_days
+            or aggregate['initial'] != initial_trophies or not fold_legend_logs(aggregate, logs)):
+        aggregate = new_season_aggregate(season.season_id, start_ms, n_days, initial_trophies)
+        fold_legend_logs(aggregate, logs)
+
+    # Keep it until a day after the season ends
+    remaining_ms = season.end_ms - int(datetime.datetime.now(timezone.utc).timestamp() * 1000)
+    cache_set_raw(aggregate_key, dumps(aggregate), timeout=max(3600, remaining_ms // 1000 + 86400))
+    return aggregate
+
+
+def daily_data_from_aggregate(aggregate, start_date, final_trophies, now=None):
+    """
+    Build the chart's daily trophy series from a season aggregate
+
+    Returns:
+        tuple: (TrophySeries, average_offense, average_defense)
+    """
+    now = now or datetime.datetime.now(timezone.utc)
+    offense = aggregate['offense']
+    defense = aggregate['defense']
+    n_days = aggregate['n_days']
+
+    series = TrophySeries.empty(start_date.date(), n_days)
+
+    # Set starting trophies to initial value
+    current_trophies = aggregate['initial']
+
+    # Track total offense and defense for averages
+    sum_offense = 0
+    sum_defense = 0
+    day_count = 0
+    included_days = 0
+
+    for day in range(n_days):
+        if aggregate['has_logs'][day]:
+            # Use the 'end' value from the last log entry of the day for the most accurate trophy count
+            if not aggregate['end_missing'][day]:
+                current_trophies = aggregate['end'][day]
+
+            if current_trophies is not None:
+                series.set_day(day, offense[day], defense[day], current_trophies)
+
+            sum_offense += offense[day]
+            sum_defense += defense[day]
+            day_count += 1
+            included_days = day + 1
+        elif start_date + timedelta(days=day) <= now:
+            # Empty days stay in the series as missing, unless they are in the future
+            included_days = day + 1
+
+    series.truncate(included_days)
+
+    # Ensure the final trophy value is accurate
+    # If we have logs, the last value should match the final trophy count from the API
+    if aggregate['log_count'] and final_trophies != current_trophies:
+        print(
+            f"Trophy mismatch: calculated={current_trophies}, reported={final_trophies}. Using reported value."
+        )
+        # Adjust the last day with trophy data to match the final value
+        last_index = series.last_index()
+        if last_index is not None:
+            series.trophies[last_index] = final_trophies
+
+    # Calculate averages
+    if day_count > 0:
+        average_offense = sum_offense / day_count
+        average_defense = sum_defense / day_count
+    else:
+        average_offense = 0
+        average_defense = 0
+
+    return series, average_offense, average_defense
+
+
+def season_day_count(start_date, end_date):
+    """Number of Legend League days in a season, end date inclusive"""
+    return max(0, (end_date - start_date) // timedelta(days=1) + 1)
+
+
+def compute_daily_data(logs, start_date, end_date, initial_trophies, final_trophies, now=None):
+    """
+    Compute per-day offense, defense and end-of-day trophies for a season from scratch
+
+    Returns:
+        tuple: (TrophySeries, average_offense, average_defense)
+    """
+    start_ms = int(start_date.timestamp() * 1000)
+    aggregate = new_season_aggregate('', start_ms, season_day_count(start_date, end_date), initial_trophies)
+    fold_legend_logs(aggregate, logs)
+    return daily_data_from_aggregate(aggregate, start_date, final_trophies, now)
@@ -0,0 +1,119 @@
+# src/apis/clash_of_clans/services/essentials_snapshots.py
+import config
+from src.core.redis_service import cache_get_raw, cache_get_many_raw, cache_set_many_raw, cache_incr
+from src.core.response_cache import CachedResponse, dumps, loads, response_cache_get
+
+VERSION_HEADER = 'X-Essentials-Version'
+BASE_VERSION_HEADER = 'X-Essentials-Base-Version'
+MERGE_PATCH_MEDIA_TYPE = 'application/merge-patch+json'
+
+
+def make_merge_patch(source, target):
+    """
+    Build an RFC 7396 JSON merge patch that turns source into target
+
+    Arrays are replaced as a whole. Merge patches cannot express an explicit null
+    (null means "remove"), so members whose new value is null are removed instead.
+    """
+    if not isinstance(source, dict) or not isinstance(target, dict):
+        return target
+
+    patch = {}
+    for key in source:
+        if key not in target:
+            patch[key] = None
+
+    for key, value in target.items():
+        if key not in source:
+            patch[key] = value
+        elif source[key] != value:
+            if isinstance(value, dict) and isinstance(source[key], dict):
+                patch[key] = make_merge_patch(source[key], value)
+            else:
+                patch[key] = value
+
+    return patch
+
+
+def _meta_key(player_tag):
+    return f"essentials_versions:{player_tag}"
+
+
+def _snapshot_key(player_tag, version):
+    return f"essentials_snapshot:{player_tag}:{version}"
+
+
+def _patch_key(player_tag, version):
+    return f"essentials_patch:{player_tag}:{version}"
+
+
+def record_snapshot(player_tag, essentials_response):
+    """
+    Record a refreshed full essentials document and return its version number
+
+    Runs once per refresh, not per poll: when the document changed, the new
+    snapshot is stored and merge patches from every retained older version to the
+    new one are computed and cached, so all pollers share them.
+
+    Args:
+        player_tag: Standardized player tag
+        essentials_response: CachedResponse holding the serialized document
+
+    Returns:
+        int: Version of the document, or None when caching is unavailable
+    """
+    timeout = config.CACHE_TIMEOUTS['essentials_snapshot']
+
+    raw_meta = cache_get_raw(_meta_key(player_tag))
+    meta = loads(raw_meta) if raw_meta else None
+
+    # Same content as the latest snapshot - keep its version
+    if meta and meta['etag'] == essentials_response.etag:
+        return meta['version']
+
+    version = cache_incr(f"essentials_version_counter:{player_tag}", timeout=timeout)
+    if version is None:
+        return None
+
+    essential_data = loads(essentials_response.body)
+
+    # Diff each retained older snapshot (read with one MGET) against the new document
+    history = meta['history'][-(config.ESSENTIALS_SNAPSHOT_HISTORY - 1):] if meta else []
+    old_bodies = cache_get_many_raw([_snapshot_key(player_tag, old_version) for old_version in history])
+    retained = []
+    entries = {}
+    for old_version, old_body in zip(history, old_bodies):
+        if old_body is None:
+            continue
+
+        patch = make_merge_patch(loads(old_body), essential_data)
+        patch_response = CachedResponse(dumps(patch), MERGE_PATCH_MEDIA_TYPE, headers={
+            VERSION_HEADER: str(version),
+            BASE_VERSION_HEADER: str(old_version)
+        })
+        entries[_patch_key(player_tag, old_version)] = patch_response.to_bytes()
+        retained.append(old_version)
+
+    # Patches, the new snapshot and the meta in one pipelined round-trip
+    entries[_snapshot_key(player_tag, version)] = essentials_response.body
+    entries[_meta_key(player_tag)] = dumps({
+        'version': version,
+        'etag': essentials_response.etag,
+        'history': retained + [version]
+    })
+    cache_set_many_raw(entries, timeout=timeout)
+
+    return version
+
+
+def get_patch(player_tag, since, current_version):
+    """
+    Get the cached merge patch from version `since` to `current_version`
+
+    Returns:
+        CachedResponse or None if that version is unknown or no longer retained
+    """
+    patch_response = response_cache_get(_patch_key(player_tag, since))
+    if patch_response is None or patch_response.headers.get(VERSION_HEADER) != str(current_version):
+        return None
+    return patch_response
@@ -0,0 +1,322 @@
+# src/apis/clash_of_clans/services/live_feed.py
+import asyncio
+import os
+import socket
+import threading
+import time
+import uuid
+import redis
+import config
+from src.core import redis_service, tracing
+from src.core.concurrency import upstream_governor
+from src.core.response_cache import dumps, loads
+from src.apis.clash_of_clans.services.clash_service import ClashApiClient
+from src.apis.clash_of_clans.services.clashperk_service import ClashPerkClient
+
+CHANNEL_PREFIX = 'live:'
+
+
+def _leader_key(player_tag):
+    return f"live_leader:{player_tag}"
+
+
+def _state_key(player_tag):
+    return f"live_state:{player_tag}"
+
+
+def _last_event_key(player_tag):
+    return f"live_last:{player_tag}"
+
+
+def fetch_live_trophies(player_tag):
+    """
+    Poll upstream for a player's current trophies and legend logs, bypassing caches
+
+    Uses ClashPerk when a token is configured (trophies plus attack/defense logs),
+    otherwise the Clash of Clans player summary (trophies only).
+
+    Returns:
+        tuple: (trophies, logs)
+    """
+    if config.CLASHPERK_API_TOKEN:
+        perk_json = ClashPerkClient(api_token=config.CLASHPERK_API_TOKEN).fetch_legend_attacks(player_tag)
+        return perk_json.get('trophies'), perk_json.get('logs', [])
+
+    summary = ClashApiClient(api_token=config.COC_API_TOKEN).fetch_player_summary(player_tag)
+    return summary.get('trophies'), []
+
+
+def diff_live_state(player_tag, state, trophies, logs, now_ms):
+    """
+    Compare a poll result with the previous state
+
+    Logs are ordered by timestamp; the state keeps the newest timestamp seen and how
+    many logs had it, so logs sharing that timestamp are not reported twice.
+
+    Returns:
+        tuple: (event dict or None, new state)
+    """
+    logs = sorted((log for log in logs if 'timestamp' in log), key=lambda log: log['timestamp'])
+    new_state = dict(state or {}, trophies=trophies)
+    if logs:
+        newest = logs[-1]['timestamp']
+        new_state['watermark'] = newest
+        new_state['watermark_count'] = sum(1 for log in logs if log['timestamp'] == newest)
+
+    # First poll for this tag - nothing to diff against yet
+    if state is None:
+        return {'type': 'snapshot', 'tag': player_tag, 'trophies': trophies, 'at': now_ms}, new_state
+
+    watermark = state.get('watermark')
+    if watermark is None:
+        new_logs = logs
+    else:
+        at_watermark = [log for log in logs if log['timestamp'] == watermark]
+        new_logs = at_watermark[state.get('watermark_count', 0):] + [
+            log for log in logs if log['timestamp'] > watermark
+        ]
+
+    previous = state.get('trophies')
+    if not new_logs and trophies == previous:
+        return None, new_state
+
+    return {
+        'type': 'update',
+        'tag': player_tag,
+        'trophies': trophies,
+        'previousTrophies': previous,
+        'delta': trophies - previous if trophies is not None and previous is not None else None,
+        'logs': new_logs,
+        'at': now_ms
+    }, new_state
+
+
+class LiveFeed:
+    """
+    Per-process hub for live trophy subscribers
+
+    Each tag with at least one local subscriber runs a poll loop, but only the
+    process holding the tag's Redis leader lock (SET NX PX, renewed every poll)
+    actually calls upstream, so a tag is polled once across the deployment however
+    many subscribers it has. Events are published on Redis pub/sub; every process
+    listens on live:* and fans them out to its local subscriber queues. Without
+    Redis the process polls for itself and dispatches locally.
+    """
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._subscribers = {}
+        self._pollers = {}
+        self._local_state = {}
+        self._local_last_event = {}
+        self._loop = None
+        self._listener = None
+
+    def _redis(self):
+        return redis_service.get_client()
+
+    async def subscribe(self, player_tag):
+        """
+        Async generator of events for a player
+
+        Starts with the latest known state (if any), then yields events as they are
+        broadcast. Yields None every LIVE_HEARTBEAT_INTERVAL seconds without events so
+        transports can send keepalives. Close it (aclosing) to unsubscribe.
+        """
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=config.LIVE_QUEUE_SIZE)
+        self._subscribers.setdefault(player_tag, set()).add(queue)
+        self._ensure_listener()
+        poller = self._pollers.get(player_tag)
+        if poller is None or poller.done():
+            self._pollers[player_tag] = asyncio.create_task(self._poll_loop(player_tag))
+
+        try:
+            last_event = self._get_last_event(player_tag)
+            if last_event is not None:
+                yield last_event
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=config.LIVE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    event = None
+                yield event
+        finally:
+            subscribers = self._subscribers.get(player_tag, set())
+            subscribers.discard(queue)
+            if not subscribers:
+                self._subscribers.pop(player_tag, None)
+                poller = self._pollers.pop(player_tag, None)
+                if poller is not None:
+                    poller.cancel()
+
+    def subscriber_count(self, player_tag):
+        return len(self._subscribers.get(player_tag, ()))
+
+    def _dispatch(self, player_tag, event):
+        """Hand an event to every local subscriber of the tag, dropping the oldest for slow ones"""
+        for queue in list(self._subscribers.get(player_tag, ())):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def _ensure_listener(self):
+        """
+        Start the pub/sub listener thread (once per process)
+
+        Also called every poll round, so a listener that could not start while
+        Redis was down is started once it is back, before the poller publishes there.
+        """
+        client = self._redis()
+        if client is None or (self._listener is not None and self._listener.is_alive()):
+            return
+
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+        except redis.RedisError as e:
+            # Until the next try events reach only this process' subscribers
+            print(f"Live feed listener could not subscribe: {str(e)}")
+            pubsub.close()
+            return
+        self._listener = threading.Thread(target=self._listen, args=(pubsub,), name='live-feed-listener', daemon=True)
+        self._listener.start()
+
+    def _listen(self, pubsub):
+        while True:
+            try:
+                message = pubsub.get_message(timeout=1.0)
+            except redis.RedisError as e:
+                print(f"Live feed listener error: {str(e)}")
+                time.sleep(1)
+                continue
+
+            if not message or message.get('type') != 'pmessage':
+                continue
+
+            channel = message['channel']
+            channel = channel.decode() if isinstance(channel, bytes) else channel
+            player_tag = channel[len(CHANNEL_PREFIX):]
+            if player_tag in self._subscribers and self._loop is not None:
+                self._loop.call_soon_threadsafe(self._dispatch, player_tag, loads(message['data']))
+
+    def _is_leader(self, player_tag):
+        """Acquire or renew this process' poller lock for the tag"""
+        client = self._redis()
+        if client is None:
+            return True
+
+        key = _leader_key(player_tag)
+        ttl_ms = int(config.LIVE_POLL_INTERVAL * 3 * 1000)
+        if client.set(key, self.worker_id, nx=True, px=ttl_ms):
+            return True
+
+        # Renew only if the lock is still ours
+        with client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                owner = pipe.get(key)
+                if owner is None or owner.decode() != self.worker_id:
+                    return False
+                pipe.multi()
+                pipe.pexpire(key, ttl_ms)
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                return False
+
+    def _release(self, player_tag):
+        """Give up the tag's lock so another subscribed process can take over right away"""
+        client = self._redis()
+        if client is None:
+            return
+
+        key = _leader_key(player_tag)
+        with client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                owner = pipe.get(key)
+                if owner is not None and owner.decode() == self.worker_id:
+                    pipe.multi()
+                    pipe.delete(key)
+                    pipe.execute()
+            except redis.WatchError:
+                pass
+
+    def _get_state(self, player_tag):
+        client = self._redis()
+        if client is None:
+            return self._local_state.get(player_tag)
+        raw = client.get(_state_key(player_tag))
+        return loads(raw) if raw else None
+
+    def _get_last_event(self, player_tag):
+        client = self._redis()
+        if client is not None:
+            try:
+                raw = client.get(_last_event_key(player_tag))
+                return loads(raw) if raw else None
+            except redis.RedisError as e:
+                print(f"Live feed could not read the last event for {player_tag}: {str(e)}")
+        return self._local_last_event.get(player_tag)
+
+    def _publish(self, player_tag, event, state):
+        """Store the new state and broadcast the event to subscribers in every process"""
+        snapshot = {'type': 'snapshot', 'tag': player_tag, 'trophies': state.get('trophies'), 'at': event['at']}
+
+        # Kept locally as well, so a Redis outage carries on from the latest state
+        self._local_state[player_tag] = state
+        self._local_last_event[player_tag] = snapshot
+
+        client = self._redis()
+        if client is None:
+            self._dispatch(player_tag, event)
+            return
+
+        pipe = client.pipeline(transaction=False)
+        pipe.setex(_state_key(player_tag), config.LIVE_STATE_TTL, dumps(state))
+        pipe.setex(_last_event_key(player_tag), config.LIVE_STATE_TTL, dumps(snapshot))
+        pipe.publish(f"{CHANNEL_PREFIX}{player_tag}", dumps(event))
+        pipe.execute()
+
+    def _save_state(self, player_tag, state):
+        self._local_state[player_tag] = state
+        client = self._redis()
+        if client is not None:
+            client.setex(_state_key(player_tag), config.LIVE_STATE_TTL, dumps(state))
+
+    async def poll_once(self, player_tag):
+        """Poll upstream once and broadcast an event if anything changed"""
+        trophies, logs = await upstream_governor.run(fetch_live_trophies, player_tag)
+        state = self._get_state(player_tag)
+        event, new_state = diff_live_state(player_tag, state, trophies, logs, int(time.time() * 1000))
+
+        if event is not None:
+            self._publish(player_tag, event, new_state)
+        else:
+            self._save_state(player_tag, new_state)
+
+    async def _poll_loop(self, player_tag):
+        # Outlives the request that started it, keep its polls out of that trace
+        tracing.detach()
+        try:
+            while True:
+                try:
+                    self._ensure_listener()
+                    if self._is_leader(player_tag):
+                        await self.poll_once(player_tag)
+                except redis.RedisError as e:
+                    # Lost the leader check or the state store: try again next round
+                    print(f"Live poll Redis error for {player_tag}: {str(e)}")
+                except Exception as e:
+                    print(f"Live poll failed for {player_tag}: {str(e)}")
+                await asyncio.sleep(config.LIVE_POLL_INTERVAL)
+        finally:
+            try:
+                self._release(player_tag)
+            except redis.RedisError as e:
+                print(f"Failed to release live poller lock for {player_tag}: {str(e)}")
+
+
+live_feed = LiveFeed()
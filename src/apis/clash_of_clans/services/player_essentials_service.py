@@ -1,10 +1,30 @@
 from collections import OrderedDict
+import hashlib
+import json
 import logging
-from src.core.redis_service import cached
 from src.apis.clash_of_clans.services.clashking_service import ClashKingClient
+from src.core.tracing import traced
+from src.core.profiling import memory_profiled
 import config
 
 
+# Bump whenever format_player_essentials output changes so memoized documents are not reused
+ESSENTIALS_FORMAT_VERSION = 1
+
+# Upstream player fields that format_player_essentials reads
+FINGERPRINT_FIELDS = ('tag', 'name', 'clan', 'clanCapitalContributions', 'defenseWins', 'donations',
+                      'donationsReceived', 'expLevel', 'league', 'role', 'legends', 'trophies',
+                      'warPreference', 'warStars', 'townHallLevel', 'heroes', 'heroEquipment',
+                      'troops', 'spells')
+
+# Top-level keys of the essentials document, in output order
+ESSENTIALS_FIELDS = ('clan', 'clanCapitalContributions', 'defenseWins', 'donations', 'donationsReceived',
+                     'expLevel', 'league', 'role', 'achievements', 'legends', 'trophies', 'warPreference',
+                     'warStars', 'townHallLevel', 'heroes', 'heroEquipment', 'pets', 'elixirTroops',
+                     'darkElixirTroops', 'siegeMachines', 'elixirSpells', 'darkElixirSpells',
+                     'playerName', 'playerTag')
+
+
 class PlayerEssentialsService:
     """Service for processing essential player data for mobile app"""
 
@@ -55,73 +75,105 @@ class PlayerEssentialsService:
             'Electro Boots', 'Rocket Spear'  # Royal Champion
         }
 
-    @cached(timeout=300)  # Cache for 5 minutes
-    def format_player_essentials(self, player_data):
+    def fingerprint(self, player_data, legends=None):
+        """
+        Build a cheap content fingerprint of the upstream fields used for essentials
+
+        Two payloads with the same fingerprint produce the same essentials document,
+        so the formatted output can be reused instead of recomputed.
+
+        Args:
+            player_data: Raw player data from Clash of Clans API
+            legends: The legends section the document gets (see legends_ranking). It
+                comes from ClashKing, not player_data, so it is hashed as well.
+
+        Returns:
+            str: Hex digest identifying the relevant player state
+        """
+        relevant = [player_data.get(field) for field in FINGERPRINT_FIELDS]
+        # Only one achievement is used, skip hashing the rest of the list
+        relevant.append(self._get_highest_trophy(player_data.get('achievements', [])))
+        relevant.append(legends)
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(ESSENTIALS_FORMAT_VERSION).encode())
+        digest.update(json.dumps(relevant, separators=(',', ':'), default=str).encode())
+        return digest.hexdigest()
+
+    @traced()
+    @memory_profiled
+    def format_player_essentials(self, player_data, fields=None, legends=None):
         """
         Extract and format essential player data for mobile app
 
         Args:
             player_data: Raw player data from Clash of Clans API
+            fields: Optional iterable of ESSENTIALS_FIELDS keys to compute (default: all).
+                Sections that are not requested are never built, so leaving out
+                'legends' skips the ClashKing calls entirely.
+            legends: The legends section if already fetched (see legends_ranking)
 
         Returns:
             OrderedDict: Formatted essential player data
         """
-        # Extract basic player info
-        player_name = player_data.get('name', 'Unknown')
         player_tag = player_data.get('tag', '')
 
-        # Extract clan info
-        clan_info = {}
-        if 'clan' in player_data:
-            clan_info = {
-                'name': player_data['clan'].get('name', ''),
-                'tag': player_data['clan'].get('tag', ''),
-                'badgeUrls': player_data['clan'].get('badgeUrls', {}),
-                'clanLevel': player_data['clan'].get('clanLevel', 0)
-            }
+        # Build each section lazily, in the specified output order
+        builders = OrderedDict([
+            ('clan', lambda: self._format_clan(player_data)),
+            ('clanCapitalContributions', lambda: player_data.get('clanCapitalContributions', 0)),
+            ('defenseWins', lambda: player_data.get('defenseWins', 0)),
+            ('donations', lambda: player_data.get('donations', 0)),
+            ('donationsReceived', lambda: player_data.get('donationsReceived', 0)),
+            ('expLevel', lambda: player_data.get('expLevel', 0)),
+            ('league', lambda: self._format_league(player_data)),
+            ('role', lambda: player_data.get('role', '')),
+            ('achievements', lambda: self._get_highest_trophy(player_data.get('achievements', []))),
+            ('legends', lambda: self._get_legends_ranking(player_tag, player_data) if legends is None else legends),
+            ('trophies', lambda: player_data.get('trophies', 0)),
+            ('warPreference', lambda: player_data.get('warPreference', '')),
+            ('warStars', lambda: player_data.get('warStars', 0)),
+            ('townHallLevel', lambda: player_data.get('townHallLevel', 0)),
+            ('heroes', lambda: self._format_heroes(player_data.get('heroes', []))),
+            ('heroEquipment', lambda: self._format_hero_equipment(player_data)),
+            ('pets', lambda: self._format_pets(player_data.get('troops', []))),
+            ('elixirTroops', lambda: self._format_elixir_troops(player_data.get('troops', []))),
+            ('darkElixirTroops', lambda: self._format_dark_elixir_troops(player_data.get('troops', []))),
+            ('siegeMachines', lambda: self._format_siege_machines(player_data.get('troops', []))),
+            ('elixirSpells', lambda: self._format_elixir_spells(player_data.get('spells', []))),
+            ('darkElixirSpells', lambda: self._format_dark_elixir_spells(player_data.get('spells', []))),
+            ('playerName', lambda: player_data.get('name', 'Unknown')),
+            ('playerTag', lambda: player_tag)
+        ])
 
-        # Extract league info
-        league_info = {}
-        if 'league' in player_data:
-            league_info = {
-                'name': player_data['league'].get('name', '')
-            }
+        requested = ESSENTIALS_FIELDS if fields is None else set(fields)
+
+        return OrderedDict(
+            (key, build()) for key, build in builders.items() if key in requested
+        )
+
+    def _format_clan(self, player_data):
+        """Extract clan info"""
+        if 'clan' not in player_data:
+            return {}
+        return {
+            'name': player_data['clan'].get('name', ''),
+            'tag': player_data['clan'].get('tag', ''),
+            'badgeUrls': player_data['clan'].get('badgeUrls', {}),
+            'clanLevel': player_data['clan'].get('clanLevel', 0)
+        }
 
-        # Extract legends ranking from ClashKing API
-        legends_info = self._get_legends_ranking(player_tag, player_data)
-
-        # Get highest trophy from achievements
-        highest_trophy = self._get_highest_trophy(player_data.get('achievements', []))
-
-        # Build result in specified order
-        result = OrderedDict([
-            ('clan', clan_info),
-            ('clanCapitalContributions', player_data.get('clanCapitalContributions', 0)),
-            ('defenseWins', player_data.get('defenseWins', 0)),
-            ('donations', player_data.get('donations', 0)),
-            ('donationsReceived', player_data.get('donationsReceived', 0)),
-            ('expLevel', player_data.get('expLevel', 0)),
-            ('league', league_info),
-            ('role', player_data.get('role', '')),
-            ('achievements', highest_trophy),
-            ('legends', legends_info),  # Add legends ranking here
-            ('trophies', player_data.get('trophies', 0)),
-            ('warPreference', player_data.get('warPreference', '')),
-            ('warStars', player_data.get('warStars', 0)),
-            ('townHallLevel', player_data.get('townHallLevel', 0)),
-            ('heroes', self._format_heroes(player_data.get('heroes', []))),
-            ('heroEquipment', self._format_hero_equipment(player_data)),
-            ('pets', self._format_pets(player_data.get('troops', []))),
-            ('elixirTroops', self._format_elixir_troops(player_data.get('troops', []))),
-            ('darkElixirTroops', self._format_dark_elixir_troops(player_data.get('troops', []))),
-            ('siegeMachines', self._format_siege_machines(player_data.get('troops', []))),
-            ('elixirSpells', self._format_elixir_spells(player_data.get('spells', []))),
-            ('darkElixirSpells', self._format_dark_elixir_spells(player_data.get('spells', []))),
-            ('playerName', player_name),
-            ('playerTag', player_tag)
-        ])
+    def _format_league(self, player_data):
+        """Extract league info"""
+        if 'league' not in player_data:
+            return {}
+        return {
+            'name': player_data['league'].get('name', '')
+        }
 
-        return result
+    def legends_ranking(self, player_data):
+        """The legends section for a player: ClashKing rankings, falling back to the CoC payload"""
+        return self._get_legends_ranking(player_data.get('tag', ''), player_data)
 
     def _get_legends_ranking(self, player_tag, player_data):
         """Get legends ranking from ClashKing API with fallback to COC API"""
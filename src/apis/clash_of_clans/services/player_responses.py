@@ -0,0 +1,165 @@
+# src/apis/clash_of_clans/services/player_responses.py
+import time
+import config
+from src.apis.clash_of_clans.services.clash_service import ClashApiClient
+from src.apis.clash_of_clans.services.player_essentials_service import PlayerEssentialsService
+from src.apis.clash_of_clans.services.essentials_snapshots import record_snapshot, VERSION_HEADER
+from src.apis.clash_of_clans.services.trophy_history import get_history_chart_data
+from src.core.response_cache import CachedResponse, response_cache_get, response_cache_set
+from src.core import metrics, timing
+
+
+def fields_cache_suffix(fields):
+    """Cache key suffix identifying a projection (empty for the full document)"""
+    return f":{','.join(fields)}" if fields else ''
+
+
+def refresh_player_full(player_tag, player_fields=None):
+    """
+    Fetch the full player payload (optionally projected) and cache it as response bytes
+
+    Returns:
+        CachedResponse: The serialized player data
+    """
+    # Initialize the Clash API client with static API key from config
+    clash_client = ClashApiClient(api_token=config.COC_API_TOKEN)
+
+    # Get player data
+    player_data = clash_client.get_player(player_tag)
+
+    if player_fields:
+        player_data = {key: player_data[key] for key in player_fields if key in player_data}
+
+    # Serialize once and cache the bytes for 5 minutes
+    player_response = CachedResponse.from_value(player_data)
+    response_cache_set(
+        f"player_full:{player_tag}{fields_cache_suffix(player_fields)}",
+        player_response,
+        timeout=config.CACHE_TIMEOUTS['player_data']
+    )
+    return player_response
+
+
+def refresh_player_essentials(player_tag, essentials_fields=None):
+    """
+    Fetch, format and cache essentials for a player
+
+    Returns:
+        tuple: (CachedResponse, cache status)
+    """
+    projection = fields_cache_suffix(essentials_fields)
+    essentials_cache_key = f"player_essentials:{player_tag}{projection}"
+
+    # Initialize services with static API key from config
+    clash_client = ClashApiClient(api_token=config.COC_API_TOKEN)
+    essentials_service = PlayerEssentialsService()
+
+    # Get the slim player projection (this call itself should be cached)
+    player_data = clash_client.get_player_summary(player_tag)
+
+    essentials_timeout = config.CACHE_TIMEOUTS['player_essentials']
+    memo_timeout = config.CACHE_TIMEOUTS['essentials_memo']
+
+    # Legend rankings come from ClashKing (cached there) and change without the player payload changing,
+    # so they are fetched on every refresh and are part of the fingerprint: a reused document never has
+    # older rankings than a freshly formatted one would
+    legends = None
+    if not essentials_fields or 'legends' in essentials_fields:
+        legends = essentials_service.legends_ranking(player_data)
+
+    # Reuse the formatted document if the relevant player fields have not changed
+    fingerprint = essentials_service.fingerprint(player_data, legends)
+    memo_key = f"player_essentials_doc:{fingerprint}{projection}"
+    essentials_response = response_cache_get(memo_key)
+
+    if essentials_response is not None:
+        # Serve the stored bytes, only the route cache TTL gets extended below
+        cache_status = 'REUSED'
+    else:
+        # Extract and format essential data, serializing it exactly once
+        with timing.timed('format'):
+            essential_data = essentials_service.format_player_essentials(
+                player_data, essentials_fields, legends=legends
+            )
+        essentials_response = CachedResponse.from_value(essential_data)
+
+        # Cache under its fingerprint for reuse by later refreshes
+        response_cache_set(memo_key, essentials_response, timeout=memo_timeout)
+        cache_status = 'MISS'
+
+    # Version the full document so pollers can ask for changes since their copy
+    if not essentials_fields:
+        version = record_snapshot(player_tag, essentials_response)
+        if version is not None:
+            essentials_response = CachedResponse(
+                essentials_response.body, essentials_response.media_type, essentials_response.etag,
+                {**essentials_response.headers, VERSION_HEADER: str(version)}
+            )
+
+    # Cache the serialized response for the route
+    response_cache_set(essentials_cache_key, essentials_response, timeout=essentials_timeout)
+    return essentials_response, cache_status
+
+
+def chart_image_cache_key(player_tag, seasons=None):
+    """Cache key of a rendered chart (multi-season charts are cached separately)"""
+    return f"chart_image:{player_tag}:seasons={seasons}" if seasons else f"chart_image:{player_tag}"
+
+
+def warm_up_chart_renderer():
+    """Load the chart modules and render once, so the first real chart does not pay for it"""
+    from src.apis.clash_of_clans.services import data_fetcher  # noqa: F401 (numpy)
+    from src.apis.clash_of_clans import chart_generator
+    chart_generator.warm_up()
+
+
+def render_player_chart(player_tag, seasons=None):
+    """
+    Fetch chart data, render the PNG and cache it
+
+    Returns:
+        CachedResponse: The PNG, or None when a multi-season chart has no stored history
+    """
+    # matplotlib, numpy and PIL load with the first chart (or the startup warmup), not at boot
+    from src.apis.clash_of_clans.services.data_fetcher import get_player_data_with_keys
+    from src.apis.clash_of_clans.chart_generator import generate_chart
+
+    start_time = time.time()
+
+    if seasons:
+        # Multi-season charts come purely from the local history store, no upstream calls
+        history = get_history_chart_data(player_tag, seasons)
+        if history is None:
+            return None
+        player_info, daily_data, final_trophies, avg_offense, avg_defense, net_gain = history
+    else:
+        # Get player data with static API keys from config
+        player_info, daily_data, final_trophies, avg_offense, avg_defense, net_gain = get_player_data_with_keys(
+            player_tag,
+            config.COC_API_TOKEN,
+            config.CLASHPERK_API_TOKEN
+        )
+
+    metrics.observe_chart_stage('fetch', time.time() - start_time)
+
+    # Generate chart (render and encode times are recorded by generate_chart)
+    chart_buf = generate_chart(
+        player_info=player_info,
+        daily_data=daily_data,
+        final_trophies=final_trophies,
+        average_offense=avg_offense,
+        average_defense=avg_defense,
+        net_gain=net_gain
+    )
+
+    chart_response = CachedResponse(chart_buf.getvalue(), 'image/png')
+
+    # PERFORMANCE OPTIMIZATION: Cache the generated chart image bytes for 10 minutes
+    try:
+        response_cache_set(
+            chart_image_cache_key(player_tag, seasons), chart_response, timeout=config.CACHE_TIMEOUTS['chart_image']
+        )
+    except Exception as e:
+        print(f"Failed to cache chart: {str(e)}")
+
+    return chart_response
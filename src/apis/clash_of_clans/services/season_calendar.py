@@ -0,0 +1,115 @@
+# src/apis/clash_of_clans/services/season_calendar.py
+import calendar
+import datetime
+from collections import namedtuple
+from datetime import timezone, timedelta
+
+# Legend League seasons end on the last Monday of the month at 5:00 AM UTC
+SEASON_RESET_HOUR = 5
+
+# Range of years precomputed at import, seasons outside it are computed on first use
+FIRST_SEASON_YEAR = 2014
+FUTURE_SEASON_YEARS = 10
+
+Season = namedtuple('Season', ['season_id', 'year', 'month', 'start', 'end', 'start_ms', 'end_ms', 'day_count', 'display'])
+Season.__doc__ = """
+A Legend League season: 'YYYY-MM' runs from the previous month's reset to this month's reset
+
+start/end are aware UTC datetimes (start_ms/end_ms the same as epoch milliseconds),
+day_count is the number of Legend days with the end day counted inclusively, as the
+chart shows it, and display is e.g. 'March 2025 Season (24 Feb - 31 Mar)'.
+"""
+
+# (year, month) -> Season
+_SEASONS = {}
+
+
+def last_monday_of_month(year, month):
+    """Return a naive datetime (midnight) for the last Monday of the given year/month"""
+    last_day = datetime.datetime(year, month, calendar.monthrange(year, month)[1])
+    return last_day - timedelta(days=last_day.weekday())
+
+
+def _season_reset(year, month):
+    return last_monday_of_month(year, month).replace(hour=SEASON_RESET_HOUR, tzinfo=timezone.utc)
+
+
+def format_season_string(season_id, start_dt, end_dt):
+    """Build a string like 'March 2025 Season (24 Feb - 31 Mar)'"""
+    year, month = parse_season_id(season_id)
+    start_str = f"{start_dt.day} {start_dt.strftime('%b')}"
+    end_str = f"{end_dt.day} {end_dt.strftime('%b')}"
+    return f"{calendar.month_name[month]} {year} Season ({start_str} - {end_str})"
+
+
+def _build_season(year, month):
+    season_id = f"{year:04d}-{month:02d}"
+    start = _season_reset(year - 1, 12) if month == 1 else _season_reset(year, month - 1)
+    end = _season_reset(year, month)
+    return Season(
+        season_id=season_id,
+        year=year,
+        month=month,
+        start=start,
+        end=end,
+        start_ms=int(start.timestamp() * 1000),
+        end_ms=int(end.timestamp() * 1000),
+        day_count=(end - start).days + 1,
+        display=format_season_string(season_id, start, end)
+    )
+
+
+def _season(year, month):
+    season = _SEASONS.get((year, month))
+    if season is None:
+        season = _SEASONS[(year, month)] = _build_season(year, month)
+    return season
+
+
+def parse_season_id(season_id):
+    """Split a season id like '2025-03' into (year, month), raising ValueError if malformed"""
+    year_str, _, month_str = str(season_id).partition('-')
+    year, month = int(year_str), int(month_str)
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid season id: {season_id}")
+    return year, month
+
+
+def get_season(season_id):
+    """Look up a season by id like '2025-03' (ValueError if malformed)"""
+    return _season(*parse_season_id(season_id))
+
+
+def season_for_timestamp(timestamp_ms):
+    """
+    Return the season containing an epoch-millisecond timestamp
+
+    A season 'YYYY-MM' always covers everything from the 1st of its month up to its
+    end, so the answer is either the calendar month's season or the next one.
+    """
+    moment = datetime.datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+    season = _season(moment.year, moment.month)
+    if timestamp_ms < season.end_ms:
+        return season
+    if season.month == 12:
+        return _season(season.year + 1, 1)
+    return _season(season.year, season.month + 1)
+
+
+def season_for_datetime(moment):
+    """Return the season containing an aware datetime"""
+    return season_for_timestamp(int(moment.timestamp() * 1000))
+
+
+def current_season(now=None):
+    """Return the season in progress (at `now` if given)"""
+    return season_for_datetime(now or datetime.datetime.now(timezone.utc))
+
+
+def _precompute():
+    for year in range(FIRST_SEASON_YEAR, datetime.datetime.now(timezone.utc).year + FUTURE_SEASON_YEARS + 1):
+        for month in range(1, 13):
+            _season(year, month)
+
+
+_precompute()
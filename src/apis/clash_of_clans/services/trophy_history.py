@@ -0,0 +1,194 @@
+# src/apis/clash_of_clans/services/trophy_history.py
+import calendar
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import timezone
+import config
+from src.apis.clash_of_clans.models.trophy_series import TrophySeries
+from src.apis.clash_of_clans.services import season_calendar
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+# legend_logs keeps every attack/defense ever seen (end_trophies is -1 when the log
+# had no end value), day_aggregates one row per player and Legend day. Both are keyed
+# by (player_tag, timestamp) so range queries are index scans.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS legend_logs (
+    player_tag TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    inc INTEGER NOT NULL,
+    end_trophies INTEGER NOT NULL,
+    season_id TEXT NOT NULL,
+    PRIMARY KEY (player_tag, timestamp, type, inc, end_trophies)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS day_aggregates (
+    player_tag TEXT NOT NULL,
+    day_start INTEGER NOT NULL,
+    season_id TEXT NOT NULL,
+    offense INTEGER NOT NULL,
+    defense INTEGER NOT NULL,
+    trophies INTEGER NOT NULL,
+    PRIMARY KEY (player_tag, day_start)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS players (
+    player_tag TEXT PRIMARY KEY,
+    info TEXT NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+"""
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+
+def get_connection():
+    """Get this thread's connection to the history database (created on first use)"""
+    connection = getattr(_local, 'connection', None)
+    if connection is not None and _local.path == config.TROPHY_HISTORY_DB:
+        return connection
+
+    path = config.TROPHY_HISTORY_DB
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+
+    with _schema_lock:
+        if path not in _schema_ready:
+            connection.executescript(SCHEMA)
+            _schema_ready.add(path)
+
+    _local.connection = connection
+    _local.path = path
+    return connection
+
+
+def record_season(player_tag, season, logs, series, player_info):
+    """
+    Append a season's new legend logs and day aggregates for a player
+
+    Logs older than the newest one already stored are skipped before touching the
+    database; duplicates at the boundary are ignored by the primary key. Day rows are
+    replaced, since the current day keeps growing until the reset.
+
+    Failures are logged and swallowed - history must never break a chart request.
+    """
+    if not config.TROPHY_HISTORY_ENABLED:
+        return
+
+    try:
+        connection = get_connection()
+        newest = connection.execute(
+            "SELECT MAX(timestamp) FROM legend_logs WHERE player_tag = ? AND timestamp >= ?",
+            (player_tag, season.start_ms)
+        ).fetchone()[0]
+
+        new_logs = [
+            (player_tag, log['timestamp'], log.get('type', ''), log.get('inc', 0),
+             -1 if log.get('end') is None else log['end'], season.season_id)
+            for log in logs
+            if 'timestamp' in log and (newest is None or log['timestamp'] >= newest)
+        ]
+
+        day_rows = [
+            (player_tag, season.start_ms + index * DAY_MS, season.season_id,
+             series.offense[index], series.defense[index], trophies)
+            for index, trophies in series.points()
+        ]
+
+        info = {key: value for key, value in player_info.items() if key != 'seasonStr'}
+
+        with connection:
+            connection.execute("BEGIN")
+            connection.executemany("INSERT OR IGNORE INTO legend_logs VALUES (?, ?, ?, ?, ?, ?)", new_logs)
+            connection.executemany("INSERT OR REPLACE INTO day_aggregates VALUES (?, ?, ?, ?, ?, ?)", day_rows)
+            connection.execute(
+                "INSERT OR REPLACE INTO players VALUES (?, ?, ?)",
+                (player_tag, json.dumps(info), int(time.time()))
+            )
+    except sqlite3.Error as e:
+        print(f"Failed to record trophy history for {player_tag}: {str(e)}")
+
+
+def get_logs(player_tag, start_ms, end_ms):
+    """Stored legend logs for a player with start_ms <= timestamp < end_ms, oldest first"""
+    rows = get_connection().execute(
+        "SELECT timestamp, type, inc, end_trophies FROM legend_logs "
+        "WHERE player_tag = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp",
+        (player_tag, start_ms, end_ms)
+    ).fetchall()
+    return [
+        {'timestamp': timestamp, 'type': log_type, 'inc': inc, 'end': None if end == -1 else end}
+        for timestamp, log_type, inc, end in rows
+    ]
+
+
+def get_history_chart_data(player_tag, seasons, now=None):
+    """
+    Build chart data for the last `seasons` seasons from stored day aggregates only
+
+    Returns:
+        tuple: Same shape as data_fetcher.get_player_data_with_keys
+        (player_info, TrophySeries, final_trophies, average_offense, average_defense, net_gain),
+        or None when nothing is stored for the player in that range
+    """
+    first_season = season_calendar.current_season(now)
+    for _ in range(seasons - 1):
+        first_season = season_calendar.season_for_timestamp(first_season.start_ms - 1)
+
+    connection = get_connection()
+    player_row = connection.execute(
+        "SELECT info FROM players WHERE player_tag = ?", (player_tag,)
+    ).fetchone()
+    rows = connection.execute(
+        "SELECT day_start, season_id, offense, defense, trophies FROM day_aggregates "
+        "WHERE player_tag = ? AND day_start >= ? ORDER BY day_start",
+        (player_tag, first_season.start_ms)
+    ).fetchall()
+
+    if player_row is None or not rows:
+        return None
+
+    # Days start at 5:00 AM UTC, so the UTC date of a day's start is that day's date
+    start_ms = rows[0][0]
+    series = TrophySeries.empty(
+        datetime.datetime.fromtimestamp(start_ms / 1000, tz=timezone.utc).date(),
+        (rows[-1][0] - start_ms) // DAY_MS + 1
+    )
+    for day_start, _, offense, defense, trophies in rows:
+        series.set_day((day_start - start_ms) // DAY_MS, offense, defense, trophies)
+
+    average_offense = sum(row[2] for row in rows) / len(rows)
+    average_defense = sum(row[3] for row in rows) / len(rows)
+
+    first = season_calendar.get_season(rows[0][1])
+    last = season_calendar.get_season(rows[-1][1])
+    first_name = f"{calendar.month_name[first.month]} {first.year}"
+    last_name = f"{calendar.month_name[last.month]} {last.year}"
+    season_count = len({row[1] for row in rows})
+
+    player_info = json.loads(player_row[0])
+    if first == last:
+        player_info['seasonStr'] = first.display
+    else:
+        player_info['seasonStr'] = f"Last {season_count} Seasons ({first_name} - {last_name})"
+
+    return (
+        player_info,
+        series,
+        rows[-1][4],
+        average_offense,
+        average_defense,
+        average_offense - average_defense
+    )
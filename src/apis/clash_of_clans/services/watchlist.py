@@ -0,0 +1,86 @@
+# src/apis/clash_of_clans/services/watchlist.py
+import asyncio
+import threading
+from collections import Counter
+import redis
+import config
+from src.core import redis_service
+
+# Sorted set of player tags scored by how often they are requested
+WATCHLIST_KEY = 'watchlist:players'
+
+# Requests counted since the last flush. Counted in memory so a request never waits on Redis for it.
+_pending = Counter()
+_pending_lock = threading.Lock()
+
+
+def _client():
+    return redis_service.get_client()
+
+
+def record_request(player_tag):
+    """Count a request for a player so hot tags get pre-warmed (in memory until the next flush)"""
+    with _pending_lock:
+        _pending[player_tag] += 1
+
+
+async def flush():
+    """Add the counted requests to the watchlist, one pipelined round-trip on the asyncio client"""
+    with _pending_lock:
+        counts = dict(_pending)
+        _pending.clear()
+
+    client = redis_service.async_redis_client
+    if not counts or client is None or not redis_service.redis_available():
+        # Scores are only a ranking: counts from while Redis is down are dropped
+        return
+
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            for player_tag, count in counts.items():
+                pipe.zincrby(WATCHLIST_KEY, count, player_tag)
+            await pipe.execute()
+    except redis.RedisError as e:
+        print(f"Failed to record watchlist requests for {len(counts)} players: {str(e)}")
+
+
+async def run_flusher():
+    """Flush every CACHE_WARM_FLUSH_INTERVAL seconds until cancelled, then once more (app lifespan)"""
+    try:
+        while True:
+            await asyncio.sleep(config.CACHE_WARM_FLUSH_INTERVAL)
+            await flush()
+    finally:
+        await flush()
+
+
+def get_hot_tags(limit):
+    """The most requested player tags, hottest first"""
+    client = _client()
+    if client is None:
+        return []
+    return [tag.decode() if isinstance(tag, bytes) else tag for tag in client.zrevrange(WATCHLIST_KEY, 0, limit - 1)]
+
+
+def remove(player_tag):
+    """Stop warming a tag (e.g. the player no longer exists)"""
+    client = _client()
+    if client is not None:
+        client.zrem(WATCHLIST_KEY, player_tag)
+
+
+def decay(factor, max_size):
+    """
+    Age the request counts and trim the watchlist
+
+    Scores are multiplied by factor so tags nobody asks for anymore sink, then
+    only the max_size hottest tags are kept.
+    """
+    client = _client()
+    if client is None:
+        return
+
+    pipe = client.pipeline()
+    pipe.zunionstore(WATCHLIST_KEY, {WATCHLIST_KEY: factor})
+    pipe.zremrangebyrank(WATCHLIST_KEY, 0, -(max_size + 1))
+    pipe.execute()
@@ -0,0 +1,134 @@
+# src/apis/debug/routes.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+from typing import Optional
+import datetime
+import re
+from datetime import timezone
+from src.core.auth import require_admin
+from src.core.profiling import profiler, top_functions, collapsed_text
+from src.core.tracing import memory_exporter, to_otlp
+
+# Admin-only diagnostics (traces are kept per worker process, profiles are shared through Redis)
+debug_router = APIRouter(prefix="/debug", tags=["Debug"], dependencies=[Depends(require_admin)])
+
+
+def _root(spans):
+    return next((span for span in spans if span.parent_id is None), min(spans, key=lambda span: span.start_ns))
+
+
+def trace_summary(spans):
+    """One line per trace for the listing"""
+    root = _root(spans)
+    return {
+        'trace_id': root.trace_id,
+        'name': root.name,
+        'start': datetime.datetime.fromtimestamp(root.start_ns / 1e9, timezone.utc).isoformat(),
+        'duration_ms': round(root.duration_ms, 3),
+        'status_code': root.attributes.get('http.status_code'),
+        'spans': len(spans),
+        'errors': sum(1 for span in spans if span.error)
+    }
+
+
+def trace_matches(spans, route, tag, min_duration_ms, errors_only):
+    root = _root(spans)
+    if route and route not in root.name:
+        return False
+    if min_duration_ms is not None and root.duration_ms < min_duration_ms:
+        return False
+    if tag and not any(span.attributes.get('tag') == tag for span in spans):
+        return False
+    if errors_only and not any(span.error for span in spans):
+        return False
+    return True
+
+
+@debug_router.get("/traces", summary="Recent request traces", description="Traces buffered in this worker, newest first")
+async def list_traces(
+    limit: int = Query(20, ge=1, le=200),
+    route: str = Query(None, description="Only traces whose root span name contains this, e.g. /player/essentials"),
+    tag: str = Query(None, description="Only traces touching this player or clan tag, e.g. #2PP"),
+    min_duration_ms: float = Query(None, description="Only traces at least this slow"),
+    errors: bool = Query(False, description="Only traces with a failed span"),
+    format: str = Query('summary', description="'summary', or 'otlp' for OTLP/JSON with every span")
+):
+    traces = [
+        spans for spans in memory_exporter.traces()
+        if trace_matches(spans, route, tag, min_duration_ms, errors)
+    ][:limit]
+
+    if format == 'otlp':
+        return to_otlp([span for spans in traces for span in spans])
+    return {'traces': [trace_summary(spans) for spans in traces]}
+
+
+@debug_router.get("/traces/{trace_id}", summary="One trace with all of its spans")
+async def get_trace(trace_id: str, format: str = Query('tree', description="'tree', or 'otlp' for OTLP/JSON")):
+    spans = memory_exporter.get(trace_id)
+    if spans is None:
+        raise HTTPException(status_code=404, detail="Trace not found in this worker (it may have been evicted)")
+
+    if format == 'otlp':
+        return to_otlp(spans)
+
+    root = _root(spans)
+    return {
+        **trace_summary(spans),
+        'spans': [span.to_dict(root.start_ns) for span in sorted(spans, key=lambda span: span.start_ns)]
+    }
+
+
+class ProfileRequest(BaseModel):
+    route: str = Field('.*', description="Regex searched in the request path, e.g. ^/clash-of-clans/chart/")
+    requests: Optional[int] = Field(None, ge=1, description="Profile the next N matching requests")
+    seconds: Optional[float] = Field(None, gt=0, description="Profile for T seconds (capped by PROFILE_MAX_SECONDS)")
+    interval_ms: float = Field(5, ge=1, le=1000, description="Stack sampling interval")
+    memory: bool = Field(False, description="Also snapshot allocations in generate_chart and format_player_essentials")
+
+
+@debug_router.post("/profile", summary="Start a profiling session",
+                   description="Sample the stacks of the next N requests matching a route, or of all matching requests for T seconds, in every worker")
+async def start_profile(request: ProfileRequest):
+    try:
+        re.compile(request.route)
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid route pattern: {str(e)}")
+
+    return profiler.start(request.route, request.requests, request.seconds, request.interval_ms, request.memory)
+
+
+@debug_router.delete("/profile", summary="Stop the running profiling session")
+async def stop_profile():
+    profiler.stop()
+    return {'stopped': True}
+
+
+def _profile_results(session_id):
+    results = profiler.results(session_id)
+    if results is None:
+        raise HTTPException(status_code=404, detail="No profiling session found (results expire after PROFILE_RESULT_TTL)")
+    return results
+
+
+@debug_router.get("/profile", summary="Results of a profiling session",
+                  description="Top functions by sampled self and total time, and allocation snapshots for memory sessions")
+async def get_profile(
+    session_id: str = Query(None, description="Defaults to the latest session"),
+    limit: int = Query(30, ge=1, le=500)
+):
+    results = _profile_results(session_id)
+    return {
+        'session': results['session'],
+        'requests': results['requests'],
+        'samples': sum(results['stacks'].values()),
+        'top': top_functions(results['stacks'], limit),
+        'memory': results['memory']
+    }
+
+
+@debug_router.get("/profile/collapsed", response_class=PlainTextResponse, summary="Collapsed stacks of a profiling session",
+                  description="One 'frame;frame;... count' line per stack, for flamegraph.pl or speedscope")
+async def get_profile_collapsed(session_id: str = Query(None, description="Defaults to the latest session")):
+    return collapsed_text(_profile_results(session_id)['stacks'])
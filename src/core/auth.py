@@ -1,7 +1,9 @@
 # src/auth.py
+import hmac
 from fastapi import HTTPException, Depends, Security
 from fastapi.security import APIKeyHeader
 from typing import Dict, Optional
+import config
 
 # Separate security schemes for each API key
 coc_security = APIKeyHeader(
@@ -18,6 +20,13 @@ clashperk_security = APIKeyHeader(
     auto_error=False
 )
 
+admin_security = APIKeyHeader(
+    name="X-Admin-Token",
+    scheme_name="Admin Token",
+    description="ADMIN_API_TOKEN of the server, for /debug endpoints",
+    auto_error=False
+)
+
 def get_api_keys(
     coc_key: Optional[str] = Security(coc_security),
     clashperk_key: Optional[str] = Security(clashperk_security)
@@ -37,4 +46,16 @@ def get_api_keys(
     return {
         "coc_api_key": coc_key,
         "clashperk_api_key": clashperk_key or ""
-    }
\ No newline at end of file
+    }
+
+
+def require_admin(admin_token: Optional[str] = Security(admin_security)):
+    """
+    Allow only requests carrying the configured admin token.
+    Admin endpoints do not exist (404) while ADMIN_API_TOKEN is unset.
+    """
+    if not config.ADMIN_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    if not admin_token or not hmac.compare_digest(admin_token.encode(), config.ADMIN_API_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
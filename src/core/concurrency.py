@@ -0,0 +1,86 @@
+# src/core/concurrency.py
+import asyncio
+import threading
+import time
+import config
+
+
+class UpstreamGovernor:
+    """
+    Bounds the concurrency and request rate of upstream API work
+
+    Combines a semaphore (at most max_concurrency calls in flight) with a token
+    bucket (rate calls per second on average, bursts up to burst). Callers that
+    exceed the rate reserve a token and sleep until it is due, so work is spread
+    out instead of rejected. Thread-safe - the upstream clients are synchronous and
+    run in worker threads.
+    """
+
+    def __init__(self, max_concurrency, rate, burst=None):
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def _reserve_token(self):
+        """Take a token, returning how long to wait before it may be used"""
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def __enter__(self):
+        self._slots.acquire()
+        wait = self._reserve_token()
+        if wait > 0:
+            time.sleep(wait)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._slots.release()
+        return False
+
+    def call(self, func, *args, **kwargs):
+        """Run func under the governor in the current thread"""
+        with self:
+            return func(*args, **kwargs)
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking func under the governor in a worker thread"""
+        return await asyncio.to_thread(self.call, func, *args, **kwargs)
+
+    async def map_as_completed(self, func, items):
+        """
+        Yield (item, result) for func(item) over all items, in completion order
+
+        At most max_concurrency calls are handed to worker threads at a time, so a
+        large fan-out does not tie up the thread pool waiting on the governor. A
+        raised exception is yielded as the result instead of aborting the rest.
+        """
+        limiter = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_one(item):
+            async with limiter:
+                try:
+                    return item, await self.run(func, item)
+                except Exception as e:
+                    return item, e
+
+        for next_done in asyncio.as_completed([run_one(item) for item in items]):
+            yield await next_done
+
+
+# Shared by every route that fans out to the Clash of Clans / ClashPerk / ClashKing APIs
+upstream_governor = UpstreamGovernor(
+    config.UPSTREAM_MAX_CONCURRENCY,
+    config.UPSTREAM_RATE_LIMIT,
+    config.UPSTREAM_BURST
+)
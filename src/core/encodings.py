@@ -0,0 +1,125 @@
+# src/core/encodings.py
+from src.core.response_cache import CachedResponse, dumps, loads, response_cache_get, response_cache_set
+from src.core import timing
+
+# Binary encoders are optional - without them clients simply get JSON
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+CBOR = 'application/cbor'
+
+PACKED_LAYOUT = 'packed'
+
+# Alternative names clients commonly send for the same encodings
+MEDIA_TYPE_ALIASES = {
+    'application/x-msgpack': MSGPACK,
+    'application/vnd.msgpack': MSGPACK,
+}
+
+ENCODERS = {JSON: dumps}
+if msgpack is not None:
+    ENCODERS[MSGPACK] = lambda value: msgpack.packb(value, use_bin_type=True)
+if cbor2 is not None:
+    ENCODERS[CBOR] = cbor2.dumps
+
+
+def negotiate(accept_header):
+    """
+    Pick the best supported media type from an Accept header
+
+    JSON is the default for missing, wildcard or unsupported Accept values.
+    """
+    if not accept_header:
+        return JSON
+
+    best_type, best_quality = JSON, 0.0
+    for position, part in enumerate(accept_header.split(',')):
+        media_type, *params = [item.strip() for item in part.split(';')]
+        media_type = MEDIA_TYPE_ALIASES.get(media_type.lower(), media_type.lower())
+        if media_type not in ENCODERS:
+            continue
+
+        quality = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+
+        if quality > best_quality:
+            best_type, best_quality = media_type, quality
+
+    return best_type
+
+
+def pack_columns(value):
+    """
+    Convert arrays of objects into a columnar layout
+
+    Every list whose items are all objects becomes a single object mapping each
+    member name to a column array, e.g. [{"name": "A", "level": 1}, {"name": "B",
+    "level": 2}] -> {"name": ["A", "B"], "level": [1, 2]}. Members missing from some
+    items are null in those rows. Nested values are packed recursively.
+    """
+    if isinstance(value, dict):
+        return {key: pack_columns(item) for key, item in value.items()}
+
+    if isinstance(value, list):
+        if value and all(isinstance(item, dict) for item in value):
+            columns = {}
+            for item in value:
+                for key in item:
+                    if key not in columns:
+                        columns[key] = []
+            for key, column in columns.items():
+                column.extend(pack_columns(item.get(key)) for item in value)
+            return columns
+        return [pack_columns(item) for item in value]
+
+    return value
+
+
+def variant_name(media_type, layout=None):
+    """Short name identifying an encoded variant in cache keys"""
+    name = media_type.split('/')[-1]
+    return f"{name}.{layout}" if layout else name
+
+
+def get_variant(entry, media_type, layout=None, timeout=None):
+    """
+    Get a JSON CachedResponse re-encoded as another media type and/or layout
+
+    Variants are cached alongside the JSON, keyed by the JSON body's ETag so they
+    can never go stale relative to it and identical documents share an entry.
+    """
+    if media_type == JSON and not layout:
+        return entry
+
+    variant_key = f"response_variant:{entry.etag.strip(chr(34))}:{variant_name(media_type, layout)}"
+    variant = response_cache_get(variant_key)
+    if variant is not None:
+        return variant
+
+    with timing.timed('encode'):
+        value = loads(entry.body)
+        if layout == PACKED_LAYOUT:
+            value = pack_columns(value)
+        body = ENCODERS[media_type](value)
+
+    headers = dict(entry.headers)
+    if layout:
+        headers['X-Layout'] = layout
+
+    variant = CachedResponse(body, media_type, headers=headers)
+    response_cache_set(variant_key, variant, timeout=timeout)
+    return variant
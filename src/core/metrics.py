@@ -0,0 +1,138 @@
+# src/core/metrics.py
+import os
+import time
+from fastapi.responses import Response
+
+# Metrics are optional - without prometheus_client every helper is a no-op
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+
+# Latency buckets in seconds: sub-millisecond cache hits up to slow upstream calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = prometheus_client.Histogram(
+        'http_request_duration_seconds', 'HTTP request latency until the response is fully sent',
+        ['route', 'method', 'status'], buckets=LATENCY_BUCKETS
+    )
+    UPSTREAM_LATENCY = prometheus_client.Histogram(
+        'upstream_request_duration_seconds', 'Upstream API latency until response headers',
+        ['host', 'endpoint'], buckets=LATENCY_BUCKETS
+    )
+    UPSTREAM_ERRORS = prometheus_client.Counter(
+        'upstream_errors_total', 'Upstream API calls that failed or returned an error status',
+        ['host', 'endpoint', 'error']
+    )
+    UPSTREAM_RETRIES = prometheus_client.Counter(
+        'upstream_retries_total', 'Upstream API calls retried by retry_request',
+        ['operation', 'reason']
+    )
+    CACHE_REQUESTS = prometheus_client.Counter(
+        'cache_requests_total', 'Cache lookups by namespace and result (hit, miss, stale)',
+        ['namespace', 'result']
+    )
+    CHART_STAGE_LATENCY = prometheus_client.Histogram(
+        'chart_stage_duration_seconds', 'Chart generation time by stage (fetch, render, encode)',
+        ['stage'], buckets=LATENCY_BUCKETS
+    )
+    REDIS_AVAILABLE = prometheus_client.Gauge(
+        'redis_available', '1 while Redis answers health checks, 0 while caching is off because it does not',
+        multiprocess_mode='livemin'
+    )
+
+
+def cache_namespace(key):
+    """The metrics namespace of a cache key, e.g. chart_image for chart_image:#TAG"""
+    return key.split(':', 1)[0]
+
+
+def record_cache(namespace, result):
+    if prometheus_client is not None:
+        CACHE_REQUESTS.labels(namespace, result).inc()
+
+
+def observe_upstream(host, endpoint, seconds, error=None):
+    if prometheus_client is None:
+        return
+    UPSTREAM_LATENCY.labels(host, endpoint).observe(seconds)
+    if error is not None:
+        UPSTREAM_ERRORS.labels(host, endpoint, error).inc()
+
+
+def record_retry(operation, reason):
+    if prometheus_client is not None:
+        UPSTREAM_RETRIES.labels(operation, reason).inc()
+
+
+def observe_chart_stage(stage, seconds):
+    if prometheus_client is not None:
+        CHART_STAGE_LATENCY.labels(stage).observe(seconds)
+
+
+def set_redis_available(up):
+    if prometheus_client is not None:
+        REDIS_AVAILABLE.set(1 if up else 0)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route request latency
+
+    Routes are labelled by their path template (/clash-of-clans/player, not the
+    tag), so label cardinality stays bounded. Latency runs until the last body
+    chunk is sent, which for streaming endpoints is the length of the stream.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if prometheus_client is None or scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            REQUEST_LATENCY.labels(
+                route.path if route is not None else 'unmatched', scope['method'], str(status)
+            ).observe(time.perf_counter() - start)
+
+
+def metrics_response():
+    """
+    Render all metrics in the Prometheus text format
+
+    Under gunicorn with PROMETHEUS_MULTIPROC_DIR set, every worker writes its
+    metrics to that directory and this aggregates all of them, so any worker
+    can answer a scrape.
+    """
+    if prometheus_client is None:
+        return Response("prometheus_client is not installed\n", status_code=503, media_type='text/plain')
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+
+    return Response(prometheus_client.generate_latest(registry), media_type=prometheus_client.CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead(pid):
+    """Drop a dead worker's live metrics files (gunicorn child_exit hook)"""
+    if prometheus_client is not None and os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,430 @@
+# src/core/profiling.py
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+import redis
+import config
+from src.core import redis_service
+
+SESSION_KEY = 'profile:session'
+LAST_SESSION_KEY = 'profile:last'
+
+# Deepest stack recorded per sample
+MAX_STACK_DEPTH = 64
+
+# A thread whose innermost Python frame is in one of these modules is waiting, not working
+IDLE_MODULES = ('selectors', 'threading', 'queue', 'concurrent.futures.thread', 'asyncio.runners',
+                'asyncio.base_events', 'uvicorn.server', 'uvicorn.main', 'gunicorn.arbiter')
+
+# Allocation sites kept per memory snapshot
+MEMORY_TOP_N = 15
+
+# Session of the request being handled, if it is profiled
+_profiled_session = ContextVar('profiled_session', default=None)
+
+
+def _results_key(session_id, part):
+    return f"profile:{session_id}:{part}"
+
+
+class ProfileSession:
+    """What to profile: requests whose path matches route, for at most max_requests and/or seconds"""
+
+    def __init__(self, config_dict):
+        self.config = config_dict
+        self.id = config_dict['id']
+        self.route = re.compile(config_dict['route'])
+        self.max_requests = config_dict.get('requests')
+        self.expires = config_dict['expires']
+        self.interval = config_dict['interval_ms'] / 1000
+        self.memory = config_dict['memory']
+
+    def matches(self, path):
+        return time.time() < self.expires and self.route.search(path) is not None
+
+
+class Profiler:
+    """
+    On-demand statistical profiler for sampled requests
+
+    While a profiled request is in flight, a background thread snapshots every
+    thread's Python stack (sys._current_frames) each interval and counts the
+    collapsed stacks - the input format of flamegraph.pl and speedscope. Work
+    offloaded to worker threads is included; so is other concurrent work in
+    the same process, which only matters on a busy worker.
+
+    With Redis, sessions are shared by all workers: the session config lives
+    in Redis (read at most once a second per worker), the request budget is
+    an INCR, and stack counts and memory snapshots are merged into Redis, so
+    the results cover whichever worker served the requests.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = None
+        self._session_checked = 0.0
+        self._in_flight = 0
+        self._sampler = None
+        self._stacks = Counter()
+        self._started_tracemalloc = False
+        self._local_session_config = None
+        self._local_results = {}
+
+    def _redis(self):
+        return redis_service.get_client()
+
+    # Sessions
+
+    def start(self, route='.*', requests=None, seconds=None, interval_ms=5, memory=False):
+        """Start a session (replacing any running one) and return its config"""
+        seconds = min(seconds or config.PROFILE_MAX_SECONDS, config.PROFILE_MAX_SECONDS)
+        now = time.time()
+        session_config = {
+            'id': uuid.uuid4().hex[:12],
+            'route': route,
+            'requests': requests,
+            'seconds': seconds,
+            'interval_ms': interval_ms,
+            'memory': memory,
+            'started': now,
+            'expires': now + seconds
+        }
+        ProfileSession(session_config)  # Validates the route pattern
+
+        client = self._redis()
+        if client is not None:
+            pipe = client.pipeline()
+            pipe.set(SESSION_KEY, json.dumps(session_config), ex=int(seconds) + 1)
+            pipe.set(_results_key(session_config['id'], 'meta'), json.dumps(session_config), ex=config.PROFILE_RESULT_TTL)
+            pipe.set(LAST_SESSION_KEY, session_config['id'], ex=config.PROFILE_RESULT_TTL)
+            pipe.execute()
+        else:
+            self._local_results = {'meta': session_config, 'count': 0, 'stacks': Counter(), 'memory': []}
+            self._local_session_config = session_config
+
+        self._set_session(ProfileSession(session_config))
+        return session_config
+
+    def stop(self):
+        client = self._redis()
+        if client is not None:
+            client.delete(SESSION_KEY)
+        else:
+            self._local_session_config = None
+        self._set_session(None)
+
+    def _set_session(self, session):
+        self._session = session
+        self._session_checked = time.monotonic()
+
+        # tracemalloc slows every allocation down, only run it for memory sessions
+        if session is not None and session.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(1)  # Allocation sites by line need only the innermost frame
+            self._started_tracemalloc = True
+
+    def _stop_tracemalloc_if_idle(self):
+        session = self._session
+        with self._lock:
+            idle = self._in_flight == 0
+        if idle and self._started_tracemalloc and (session is None or not session.memory):
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def active_session(self):
+        """The running session, re-read from Redis at most once a second"""
+        if time.monotonic() - self._session_checked >= 1.0:
+            session_config = None
+            client = self._redis()
+            try:
+                if client is not None:
+                    raw = client.get(SESSION_KEY)
+                    session_config = json.loads(raw) if raw else None
+                else:
+                    session_config = self._local_session_config
+            except redis.RedisError as e:
+                print(f"Failed to read profiling session: {str(e)}")
+                session_config = self._session.config if self._session is not None else None
+
+            current = self._session
+            if session_config is None:
+                self._set_session(None)
+            elif current is None or current.id != session_config['id']:
+                self._set_session(ProfileSession(session_config))
+            else:
+                self._session_checked = time.monotonic()
+            self._stop_tracemalloc_if_idle()
+
+        session = self._session
+        return session if session is not None and time.time() < session.expires else None
+
+    def claim(self, session):
+        """Count a request towards the session, False once its request budget is used up"""
+        client = self._redis()
+        if client is not None:
+            key = _results_key(session.id, 'count')
+            try:
+                pipe = client.pipeline()
+                pipe.incr(key)
+                pipe.expire(key, config.PROFILE_RESULT_TTL)
+                count = pipe.execute()[0]
+            except redis.RedisError as e:
+                print(f"Failed to count profiled request: {str(e)}")
+                return False
+        else:
+            self._local_results['count'] += 1
+            count = self._local_results['count']
+
+        if session.max_requests is not None and count >= session.max_requests:
+            # Budget used up - end the session everywhere, this request is still profiled
+            if count > session.max_requests:
+                return False
+            self.stop()
+        return True
+
+    # Sampling
+
+    def begin_request(self, session):
+        with self._lock:
+            self._in_flight += 1
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._sample_loop, args=(session,), name='profile-sampler',
+                                                 daemon=True)
+                self._sampler.start()
+
+    def end_request(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._stop_tracemalloc_if_idle()
+
+    def _sample_loop(self, session):
+        own_id = threading.get_ident()
+        last_flush = time.monotonic()
+        while True:
+            with self._lock:
+                if self._in_flight <= 0:
+                    break
+
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = collapse_stack(frame)
+                if stack is not None:
+                    self._stacks[stack] += 1
+
+            if time.monotonic() - last_flush >= 2.0:
+                self._flush(session)
+                last_flush = time.monotonic()
+            time.sleep(session.interval)
+
+        self._flush(session)
+
+    def _flush(self, session):
+        stacks, self._stacks = self._stacks, Counter()
+        if not stacks:
+            return
+
+        client = self._redis()
+        if client is None:
+            self._local_results['stacks'].update(stacks)
+            return
+
+        key = _results_key(session.id, 'stacks')
+        try:
+            pipe = client.pipeline(transaction=False)
+            for stack, count in stacks.items():
+                pipe.hincrby(key, stack, count)
+            pipe.expire(key, config.PROFILE_RESULT_TTL)
+            pipe.execute()
+        except redis.RedisError as e:
+            print(f"Failed to store profile samples: {str(e)}")
+
+    def add_memory_snapshot(self, session, record):
+        client = self._redis()
+        if client is None:
+            self._local_results['memory'] = (self._local_results['memory'] + [record])[-config.PROFILE_MAX_MEMORY_SNAPSHOTS:]
+            return
+
+        key = _results_key(session.id, 'memory')
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.rpush(key, json.dumps(record))
+            pipe.ltrim(key, -config.PROFILE_MAX_MEMORY_SNAPSHOTS, -1)
+            pipe.expire(key, config.PROFILE_RESULT_TTL)
+            pipe.execute()
+        except redis.RedisError as e:
+            print(f"Failed to store memory snapshot: {str(e)}")
+
+    # Results
+
+    def results(self, session_id=None):
+        """
+        Results of a session (the latest one by default)
+
+        Returns:
+            dict: {'session', 'requests', 'stacks' (Counter), 'memory' (list)}, or None
+        """
+        client = self._redis()
+        if client is None:
+            if not self._local_results or (session_id and self._local_results['meta']['id'] != session_id):
+                return None
+            return {
+                'session': self._local_results['meta'],
+                'requests': _profiled_requests(self._local_results['meta'], self._local_results['count']),
+                'stacks': Counter(self._local_results['stacks']),
+                'memory': list(self._local_results['memory'])
+            }
+
+        if session_id is None:
+            session_id = client.get(LAST_SESSION_KEY)
+            if session_id is None:
+                return None
+            session_id = session_id.decode()
+
+        meta = client.get(_results_key(session_id, 'meta'))
+        if meta is None:
+            return None
+
+        pipe = client.pipeline(transaction=False)
+        pipe.get(_results_key(session_id, 'count'))
+        pipe.hgetall(_results_key(session_id, 'stacks'))
+        pipe.lrange(_results_key(session_id, 'memory'), 0, -1)
+        count, stacks, memory = pipe.execute()
+        meta = json.loads(meta)
+        return {
+            'session': meta,
+            'requests': _profiled_requests(meta, int(count or 0)),
+            'stacks': Counter({stack.decode(): int(n) for stack, n in stacks.items()}),
+            'memory': [json.loads(record) for record in memory]
+        }
+
+
+def _profiled_requests(session_config, claimed):
+    # Requests arriving after the budget ran out are counted too, but not profiled
+    if session_config.get('requests') is not None:
+        return min(claimed, session_config['requests'])
+    return claimed
+
+
+def collapse_stack(frame):
+    """'module:function;module:function...' from outermost to innermost, None for idle threads"""
+    if frame.f_globals.get('__name__', '') in IDLE_MODULES:
+        return None
+
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+
+def top_functions(stacks, limit=30):
+    """
+    Functions by samples - self (innermost frame) and total (anywhere on the stack)
+
+    Returns:
+        list: [{'function', 'self', 'total', 'self_pct', 'total_pct'}], most self time first
+    """
+    total_samples = sum(stacks.values())
+    if not total_samples:
+        return []
+
+    self_counts = Counter()
+    total_counts = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        self_counts[frames[-1]] += count
+        for frame in set(frames):
+            total_counts[frame] += count
+
+    return [{
+        'function': function,
+        'self': self_counts[function],
+        'total': total_counts[function],
+        'self_pct': round(100 * self_counts[function] / total_samples, 1),
+        'total_pct': round(100 * total_counts[function] / total_samples, 1)
+    } for function in sorted(total_counts, key=lambda f: (self_counts[f], total_counts[f]), reverse=True)[:limit]]
+
+
+def collapsed_text(stacks):
+    """Collapsed stacks, one 'stack count' line each, for flamegraph.pl or speedscope"""
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def memory_profiled(func):
+    """
+    Decorator recording an allocation snapshot of each call in profiled requests
+
+    Only active in requests of a session started with memory=True. Records the
+    peak traced memory during the call and the allocation sites that grew most.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        session = _profiled_session.get()
+        if session is None or not session.memory or not tracemalloc.is_tracing():
+            return func(*args, **kwargs)
+
+        ignore_tracemalloc = (tracemalloc.Filter(False, tracemalloc.__file__),)
+        before = tracemalloc.take_snapshot().filter_traces(ignore_tracemalloc)
+        tracemalloc.reset_peak()
+        start_current, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot().filter_traces(ignore_tracemalloc)
+            top = after.compare_to(before, 'lineno')[:MEMORY_TOP_N]
+            profiler.add_memory_snapshot(session, {
+                'function': func.__qualname__,
+                'pid': os.getpid(),
+                'at': time.time(),
+                'duration_ms': round(duration_ms, 3),
+                'peak_kb': round((peak - start_current) / 1024, 1),
+                'retained_kb': round((current - start_current) / 1024, 1),
+                'top': [{
+                    'location': str(stat.traceback[0]),
+                    'size_diff_kb': round(stat.size_diff / 1024, 1),
+                    'count_diff': stat.count_diff
+                } for stat in top]
+            })
+
+    return wrapper
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling the requests selected by the active session"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'].startswith('/debug'):
+            await self.app(scope, receive, send)
+            return
+
+        session = profiler.active_session()
+        if session is None or not session.matches(scope['path']) or not profiler.claim(session):
+            await self.app(scope, receive, send)
+            return
+
+        token = _profiled_session.set(session)
+        profiler.begin_request(session)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.end_request()
+            _profiled_session.reset(token)
+
+
+profiler = Profiler()
@@ -1,13 +1,51 @@
 # src/services/redis_service.py - FIXED VERSION
 import redis
+import redis.asyncio
+import base64
 import json
+import threading
 import time
 import functools
+import hashlib
 import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+from redis.asyncio.retry import Retry as AsyncRetry
+from redis.backoff import NoBackoff
+from redis.retry import Retry
 import config
+from src.core import metrics, timing, tracing
 
-# Global redis client
+# Global redis clients: sync for code running in worker threads, asyncio for async routes
 redis_client = None
+async_redis_client = None
+
+# Whether Redis answered the last health check. While it is down every cache helper is a no-op
+# (reads miss, writes are dropped) and the health monitor pings it with backoff until it is back.
+_redis_up = True
+_state_lock = threading.Lock()
+_check_now = threading.Event()
+_stop_monitor = threading.Event()
+_monitor_client = None
+_monitor_thread = None
+
+# Errors meaning Redis could not be reached, as opposed to a failed command
+UNAVAILABLE_ERRORS = (redis.ConnectionError, redis.TimeoutError)
+# Retried once on a fresh connection (one dropped by a Redis restart); timeouts are not
+RETRIED_ERRORS = (redis.ConnectionError,)
+
+# When set, @cached functions skip the cache read and call through (the result is still stored), once per
+# key: the set holds the keys already refreshed in this context
+_force_refresh = ContextVar('force_refresh', default=None)
+
+# Types with a compact binary form (to_bytes/from_bytes), cached as {"__cache_type__": name, "data": base64}
+CACHE_TYPES = {}
+
+
+def register_cache_type(cls):
+    """Class decorator letting cached functions return instances of cls"""
+    CACHE_TYPES[cls.__name__] = cls
+    return cls
 
 
 # Custom JSON encoder to handle datetime objects
@@ -15,11 +53,17 @@ class DateTimeEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, (datetime.datetime, datetime.date)):
             return obj.isoformat()
+        if type(obj).__name__ in CACHE_TYPES:
+            return {'__cache_type__': type(obj).__name__, 'data': base64.b64encode(obj.to_bytes()).decode('ascii')}
         return super().default(obj)
 
 
 def date_deserializer(dct):
     """Convert ISO date strings back to datetime.date objects"""
+    cache_type = dct.get('__cache_type__')
+    if cache_type in CACHE_TYPES:
+        return CACHE_TYPES[cache_type].from_bytes(base64.b64decode(dct['data']))
+
     for key, value in dct.items():
         if isinstance(value, str) and len(value) == 10 and value[4] == '-' and value[7] == '-':
             try:
@@ -29,56 +73,291 @@ def date_deserializer(dct):
     return dct
 
 
+def _connection_options():
+    """
+    Pool and socket settings shared by both clients
+
+    The pools are blocking: once REDIS_MAX_CONNECTIONS are in use, callers wait
+    up to REDIS_POOL_TIMEOUT for one instead of opening more. A command whose
+    connection was dropped (Redis restarted) is retried once on a new one right
+    away; timeouts are not retried, so a hung Redis costs one REDIS_SOCKET_TIMEOUT.
+    """
+    return {
+        'max_connections': config.REDIS_MAX_CONNECTIONS,
+        'timeout': config.REDIS_POOL_TIMEOUT,
+        'socket_timeout': config.REDIS_SOCKET_TIMEOUT,
+        'socket_connect_timeout': config.REDIS_CONNECT_TIMEOUT
+    }
+
+
 def init_redis(app):
-    """Initialize Redis connection"""
-    global redis_client
-    redis_client = redis.from_url(config.REDIS_URL)
+    """Initialize the Redis clients and start the health monitor (once per process, after fork)"""
+    global redis_client, async_redis_client, _monitor_client, _monitor_thread
+    redis_client = redis.Redis(connection_pool=redis.BlockingConnectionPool.from_url(
+        config.REDIS_URL, retry=Retry(NoBackoff(), 1, supported_errors=RETRIED_ERRORS), **_connection_options()
+    ))
+    async_redis_client = redis.asyncio.Redis(connection_pool=redis.asyncio.BlockingConnectionPool.from_url(
+        config.REDIS_URL, retry=AsyncRetry(NoBackoff(), 1, supported_errors=RETRIED_ERRORS), **_connection_options()
+    ))
+    # The monitor has its own connection, so a busy pool never looks like an outage
+    _monitor_client = redis.Redis.from_url(
+        config.REDIS_URL, socket_timeout=config.REDIS_SOCKET_TIMEOUT, socket_connect_timeout=config.REDIS_CONNECT_TIMEOUT,
+        retry=Retry(NoBackoff(), 1, supported_errors=RETRIED_ERRORS)
+    )
 
     # Test connection
     try:
-        redis_client.ping()
+        _monitor_client.ping()
         print("Redis connection established")
-    except redis.ConnectionError:
-        print("Redis connection failed - caching disabled")
-        config.REDIS_ENABLED = False
+        _set_redis_up(True)
+    except redis.RedisError as e:
+        _set_redis_up(False, e)
+
+    _stop_monitor.clear()
+    _monitor_thread = threading.Thread(target=_monitor_redis, name='redis-health', daemon=True)
+    _monitor_thread.start()
+
+
+async def close_redis():
+    """Stop the health monitor and close the connection pools (worker shutdown)"""
+    global redis_client, async_redis_client, _monitor_client, _monitor_thread
+    _stop_monitor.set()
+    _check_now.set()
+    if _monitor_thread is not None:
+        # At most a ping in flight
+        _monitor_thread.join(timeout=config.REDIS_SOCKET_TIMEOUT + config.REDIS_CONNECT_TIMEOUT)
+        _monitor_thread = None
+    if async_redis_client is not None:
+        await async_redis_client.aclose()
+        async_redis_client = None
+    for client in (redis_client, _monitor_client):
+        if client is not None:
+            client.close()
+    redis_client = None
+    _monitor_client = None
+
+
+def redis_available():
+    """Whether Redis is enabled, initialized and answered its last health check"""
+    return config.REDIS_ENABLED and redis_client is not None and _redis_up
+
+
+def get_client():
+    """The sync client while Redis is available, else None"""
+    return redis_client if redis_available() else None
+
+
+def _set_redis_up(up, error=None):
+    global _redis_up
+    with _state_lock:
+        changed = up != _redis_up
+        _redis_up = up
+    metrics.set_redis_available(up)
+    if changed and up:
+        print("Redis is reachable again - caching re-enabled")
+    elif changed:
+        print(f"Redis is unreachable - caching disabled until it is back: {str(error)}")
+
+
+def _monitor_redis():
+    """
+    Ping Redis every REDIS_HEALTH_CHECK_INTERVAL seconds while it is up, and right
+    away when a cache call failed to reach it. While it is down, retry after
+    REDIS_RECONNECT_BACKOFF_MIN seconds, doubling up to REDIS_RECONNECT_BACKOFF_MAX.
+    """
+    backoff = config.REDIS_RECONNECT_BACKOFF_MIN
+    while True:
+        _check_now.wait(config.REDIS_HEALTH_CHECK_INTERVAL if _redis_up else backoff)
+        _check_now.clear()
+        client = _monitor_client
+        if _stop_monitor.is_set() or client is None:
+            return
+
+        try:
+            client.ping()
+        except redis.RedisError as e:
+            if not _redis_up:
+                backoff = min(backoff * 2, config.REDIS_RECONNECT_BACKOFF_MAX)
+            _set_redis_up(False, e)
+            continue
+
+        backoff = config.REDIS_RECONNECT_BACKOFF_MIN
+        _set_redis_up(True)
+
+
+def _report_failure(operation, error):
+    """A cache call could not reach Redis: it counts as a miss, and the monitor checks Redis now"""
+    print(f"Redis {operation} failed: {str(error)}")
+    _check_now.set()
+
+
+def _fail_open(default=None):
+    """
+    Run a cache helper only while Redis is available, returning default instead
+    when it is not or when the call cannot reach it. Caching is an optimization:
+    a Redis outage makes requests slower but never fails them.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not redis_available():
+                return default
+            try:
+                return func(*args, **kwargs)
+            except UNAVAILABLE_ERRORS as e:
+                _report_failure(func.__name__, e)
+                return default
+
+        return wrapper
+
+    return decorator
+
+
+def _fail_open_async(sync_func, default=None):
+    """_fail_open for asyncio helpers. Without an asyncio client (scripts), sync_func runs instead."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if async_redis_client is None:
+                return sync_func(*args, **kwargs)
+            if not redis_available():
+                return default
+            try:
+                return await func(*args, **kwargs)
+            except UNAVAILABLE_ERRORS as e:
+                _report_failure(func.__name__, e)
+                return default
+
+        return wrapper
+
+    return decorator
 
 
+@_fail_open()
 def cache_get(key):
     """Get data from cache"""
-    if not config.REDIS_ENABLED or redis_client is None:
-        return None
-
-    data = redis_client.get(key)
+    with timing.timed('cache'):
+        data = redis_client.get(key)
     if data:
         return json.loads(data, object_hook=date_deserializer)
     return None
 
 
+@_fail_open(default=(None, None))
 def cache_get_with_timestamp(key):
     """Get data and timestamp from cache"""
-    if not config.REDIS_ENABLED or redis_client is None:
-        return None, None
-
-    # Get both the data and its timestamp
-    data = redis_client.get(key)
-    timestamp = redis_client.get(f"{key}:timestamp")
+    # Get both the data and its timestamp in one round-trip
+    with timing.timed('cache'):
+        data, timestamp = redis_client.mget((key, f"{key}:timestamp"))
 
     if data and timestamp:
         return json.loads(data, object_hook=date_deserializer), float(timestamp)
     return None, None
 
 
+@_fail_open()
 def cache_set(key, value, timeout=None):
     """Set data in cache"""
-    if not config.REDIS_ENABLED or redis_client is None:
+    timeout = timeout or config.REDIS_CACHE_TIMEOUT
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.setex(key, timeout, json.dumps(value, cls=DateTimeEncoder))
+        pipe.setex(f"{key}:timestamp", timeout, time.time())
+        pipe.execute()
+
+
+@_fail_open()
+def cache_get_raw(key):
+    """Get raw (already serialized) bytes from cache without decoding"""
+    with timing.timed('cache'):
+        return redis_client.get(key)
+
+
+def cache_get_many_raw(keys):
+    """Get raw bytes for several keys in one round-trip (MGET). Missing keys are None."""
+    if not keys:
+        return []
+    return _mget(keys) or [None] * len(keys)
+
+
+@_fail_open()
+def _mget(keys):
+    with timing.timed('cache'):
+        return redis_client.mget(keys)
+
+
+@_fail_open()
+def cache_set_raw(key, data, timeout=None):
+    """Store already serialized bytes/str in cache as-is"""
+    timeout = timeout or config.REDIS_CACHE_TIMEOUT
+    redis_client.setex(key, timeout, data)
+
+
+@_fail_open()
+def cache_set_many_raw(items, timeout=None):
+    """Store several {key: bytes} entries with the same TTL in one pipelined round-trip"""
+    if not items:
         return
+    timeout = timeout or config.REDIS_CACHE_TIMEOUT
+    with redis_client.pipeline(transaction=False) as pipe:
+        for key, data in items.items():
+            pipe.setex(key, timeout, data)
+        pipe.execute()
+
 
+@_fail_open()
+def cache_incr(key, timeout=None):
+    """Atomically increment a counter and refresh its TTL. Returns the new value or None."""
     timeout = timeout or config.REDIS_CACHE_TIMEOUT
-    redis_client.setex(key, timeout, json.dumps(value, cls=DateTimeEncoder))
-    redis_client.setex(f"{key}:timestamp", timeout, time.time())
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.incr(key)
+        pipe.expire(key, timeout)
+        value, _ = pipe.execute()
+    return value
+
+
+@_fail_open_async(cache_get_raw)
+async def cache_get_raw_async(key):
+    """cache_get_raw on the asyncio client, for async routes (no worker thread, no blocked event loop)"""
+    with timing.timed('cache'):
+        return await async_redis_client.get(key)
+
 
+async def cache_get_many_raw_async(keys):
+    """cache_get_many_raw on the asyncio client"""
+    if not keys:
+        return []
+    return await _mget_async(keys) or [None] * len(keys)
 
-def cached(timeout=None, use_stale_on_error=False):
+
+@_fail_open_async(_mget)
+async def _mget_async(keys):
+    with timing.timed('cache'):
+        return await async_redis_client.mget(keys)
+
+
+@contextmanager
+def force_refresh():
+    """
+    Make @cached calls in this context fetch fresh data and overwrite their entries (cache warming)
+
+    Each entry is refreshed once per context: later calls with the same arguments,
+    e.g. the player summary that both essentials and the chart read, get the fresh
+    cached value instead of calling upstream again.
+    """
+    token = _force_refresh.set(set())
+    try:
+        yield
+    finally:
+        _force_refresh.reset(token)
+
+
+def make_cache_key(key_prefix, args, kwargs):
+    """Cache key for a call. hashlib, unlike hash(), gives the same key in every worker process."""
+    key_digest = hashlib.blake2b(repr((args, sorted(kwargs.items()))).encode('utf-8'), digest_size=16).hexdigest()
+    return f"{key_prefix}:{key_digest}"
+
+
+def cached(timeout=None, use_stale_on_error=False, version=None):
     """
     Decorator to cache function results based on arguments.
     FIXED VERSION - Actually uses cached data instead of always calling function!
@@ -86,60 +365,85 @@ def cached(timeout=None, use_stale_on_error=False):
     Args:
         timeout: Cache expiration time in seconds
         use_stale_on_error: Whether to use stale cached data when function fails
+        version: Optional schema version, part of the cache key so entries cached
+            by an older layout of the result are never served
     """
 
     def decorator(func):
+        key_prefix = func.__qualname__ if version is None else f"{func.__qualname__}:v{version}"
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            if not config.REDIS_ENABLED or redis_client is None:
+            if not redis_available():
                 return func(*args, **kwargs)
 
-            # Create a cache key from function name and arguments
-            cache_key = f"{func.__name__}:{hash(str(args) + str(sorted(kwargs.items())))}"
-
-            # Try to get from cache first
-            cached_data, timestamp = cache_get_with_timestamp(cache_key)
-            cache_timeout = timeout or config.REDIS_CACHE_TIMEOUT
-
-            try:
-                # FIXED: Check if we have valid cached data first
-                if cached_data is not None and timestamp is not None:
-                    # Check if cache is still valid
-                    cache_age = time.time() - timestamp
-                    if cache_age < cache_timeout:
-                        # Cache hit - return cached data immediately
-                        print(f"Cache HIT for {func.__name__} (age: {cache_age:.1f}s)")
+            # For methods the instance (self) is left out - API clients are created
+            # per request and their repr would make every key unique
+            key_args = args[1:] if args and getattr(type(args[0]), func.__name__, None) is wrapper else args
+            cache_key = make_cache_key(key_prefix, key_args, kwargs)
+
+            with tracing.span(f"cache {key_prefix}") as span:
+                # Try to get from cache first (still read when refreshing, as the stale fallback)
+                cached_data, timestamp = cache_get_with_timestamp(cache_key)
+                cache_timeout = timeout or config.REDIS_CACHE_TIMEOUT
+                refreshed = _force_refresh.get()
+                read_cache = refreshed is None or cache_key in refreshed
+
+                try:
+                    # FIXED: Check if we have valid cached data first
+                    if cached_data is not None and timestamp is not None and read_cache:
+                        # Check if cache is still valid
+                        if time.time() - timestamp < cache_timeout:
+                            # Cache hit - return cached data immediately
+                            _record_outcome(span, key_prefix, 'hit')
+                            return cached_data
+
+                    # Cache miss or expired - call function and cache result
+                    _record_outcome(span, key_prefix, 'miss')
+                    result = func(*args, **kwargs)
+                    cache_set(cache_key, result, cache_timeout)
+                    if refreshed is not None:
+                        refreshed.add(cache_key)
+                    return result
+
+                except Exception as e:
+                    # If we should use stale data on error and we have cached data
+                    if use_stale_on_error and cached_data is not None:
+                        _record_outcome(span, key_prefix, 'stale')
+                        print(
+                            f"Error calling {func.__name__}, using stale cached data from "
+                            f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}: {str(e)}"
+                        )
                         return cached_data
-                    else:
-                        print(f"Cache EXPIRED for {func.__name__} (age: {cache_age:.1f}s)")
-
-                # Cache miss or expired - call function and cache result
-                print(f"Cache MISS for {func.__name__} - calling function")
-                result = func(*args, **kwargs)
-                cache_set(cache_key, result, cache_timeout)
-                return result
-
-            except Exception as e:
-                # If we should use stale data on error and we have cached data
-                if use_stale_on_error and cached_data is not None:
-                    print(
-                        f"Error calling {func.__name__}, using stale cached data from "
-                        f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}: {str(e)}"
-                    )
-                    return cached_data
-                # Otherwise, re-raise the exception
-                raise
-
+                    # Otherwise, re-raise the exception
+                    raise
+
+        def prime(value, *args, **kwargs):
+            """Store value as the cached result for these arguments (without self for methods)"""
+            if not redis_available():
+                return
+            cache_key = make_cache_key(key_prefix, args, kwargs)
+            cache_set(cache_key, value, timeout or config.REDIS_CACHE_TIMEOUT)
+            refreshed = _force_refresh.get()
+            if refreshed is not None:
+                refreshed.add(cache_key)
+
+        wrapper.prime = prime
         return wrapper
 
     return decorator
 
 
+def _record_outcome(span, key_prefix, outcome):
+    """Count a @cached lookup and tag its span with the outcome"""
+    metrics.record_cache(key_prefix, outcome)
+    if span is not None:
+        span.attributes['cache.outcome'] = outcome
+
+
+@_fail_open()
 def cache_invalidate(pattern=None):
     """Invalidate cache entries matching a pattern"""
-    if not config.REDIS_ENABLED or redis_client is None:
-        return
-
     if pattern:
         keys = redis_client.keys(pattern)
         if keys:
@@ -152,7 +456,7 @@ def cache_invalidate(pattern=None):
 
 def get_cache_stats():
     """Get cache statistics"""
-    if not config.REDIS_ENABLED or redis_client is None:
+    if not redis_available():
         return {"enabled": False}
 
     info = redis_client.info()
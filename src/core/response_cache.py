@@ -0,0 +1,120 @@
+# src/core/response_cache.py
+import hashlib
+import json
+from fastapi.responses import Response
+from src.core.redis_service import (
+    cache_get_raw, cache_get_many_raw, cache_get_raw_async, cache_get_many_raw_async, cache_set_raw, DateTimeEncoder
+)
+from src.core import metrics, timing
+from src.core.metrics import cache_namespace
+
+# orjson is much faster than the stdlib encoder, fall back if it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(value):
+    """Serialize a value to compact JSON bytes (OrderedDict order and dates preserved)"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, cls=DateTimeEncoder, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    """Parse JSON bytes produced by dumps()"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def make_etag(body):
+    """Build a strong ETag from the response body"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+class CachedResponse:
+    """A final, serialized response body together with its content type and ETag"""
+
+    __slots__ = ('body', 'media_type', 'etag', 'headers')
+
+    def __init__(self, body, media_type='application/json', etag=None, headers=None):
+        self.body = body
+        self.media_type = media_type
+        self.etag = etag or make_etag(body)
+        self.headers = headers or {}
+
+    @classmethod
+    def from_value(cls, value, headers=None):
+        """Serialize a JSON-compatible value once and wrap it"""
+        with timing.timed('encode'):
+            body = dumps(value)
+        return cls(body, 'application/json', headers=headers)
+
+    def to_bytes(self):
+        """Frame as a one-line metadata header followed by the raw body"""
+        meta = dumps({'t': self.media_type, 'e': self.etag, 'h': self.headers})
+        return meta + b'\n' + self.body
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Parse a frame written by to_bytes() without touching the body"""
+        meta, _, body = data.partition(b'\n')
+        meta = loads(meta)
+        return cls(body, meta['t'], meta['e'], meta['h'])
+
+    def matches(self, if_none_match):
+        """Check an If-None-Match request header against this response's ETag"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        candidates = [tag.strip() for tag in if_none_match.split(',')]
+        return any(tag.removeprefix('W/') == self.etag for tag in candidates)
+
+    def to_response(self, request=None, headers=None, status_code=200):
+        """Build a Response serving the stored bytes as-is (304 when the client copy is current)"""
+        all_headers = dict(self.headers)
+        all_headers['ETag'] = self.etag
+        if headers:
+            all_headers.update(headers)
+
+        if request is not None and self.matches(request.headers.get('if-none-match')):
+            return Response(status_code=304, headers=all_headers)
+
+        return Response(content=self.body, status_code=status_code, headers=all_headers, media_type=self.media_type)
+
+
+def response_cache_get(key):
+    """Get a cached response without decoding its body"""
+    return _cached_entry(key, cache_get_raw(key))
+
+
+async def response_cache_get_async(key):
+    """response_cache_get for async routes, read with the asyncio Redis client"""
+    return _cached_entry(key, await cache_get_raw_async(key))
+
+
+def response_cache_get_many(keys):
+    """Get several cached responses with a single MGET (None for misses)"""
+    return [_cached_entry(key, data) for key, data in zip(keys, cache_get_many_raw(keys))]
+
+
+async def response_cache_get_many_async(keys):
+    """response_cache_get_many for async routes, read with the asyncio Redis client"""
+    return [_cached_entry(key, data) for key, data in zip(keys, await cache_get_many_raw_async(keys))]
+
+
+def _cached_entry(key, data):
+    """Count a lookup and parse the stored frame (None for a miss)"""
+    if data is None:
+        metrics.record_cache(cache_namespace(key), 'miss')
+        return None
+    metrics.record_cache(cache_namespace(key), 'hit')
+    return CachedResponse.from_bytes(data)
+
+
+def response_cache_set(key, entry, timeout=None):
+    """Store a cached response"""
+    cache_set_raw(key, entry.to_bytes(), timeout=timeout)
@@ -2,6 +2,7 @@
 import time
 import requests
 from functools import wraps
+from src.core import metrics, tracing
 
 
 def retry_request(max_retries=3, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504)):
@@ -20,6 +21,8 @@ def retry_request(max_retries=3, backoff_factor=0.5, status_forcelist=(500, 502,
             retries = 0
             while retries <= max_retries:
                 try:
+                    if retries:
+                        tracing.set_attribute('retry.attempt', retries)
                     return func(*args, **kwargs)
                 except requests.exceptions.HTTPError as e:
                     status_code = e.response.status_code
@@ -27,25 +30,29 @@ def retry_request(max_retries=3, backoff_factor=0.5, status_forcelist=(500, 502,
                         # If not in our list or we've exhausted retries, re-raise
                         raise
 
+                    metrics.record_retry(func.__qualname__, str(status_code))
                     wait_time = backoff_factor * (2 ** retries)
                     print(
                         f"Request failed with status {status_code}. "
                         f"Retrying in {wait_time:.2f} seconds... "
                         f"(Attempt {retries + 1}/{max_retries})"
                     )
-                    time.sleep(wait_time)
+                    with tracing.span('retry backoff', {'retry.attempt': retries + 1, 'retry.wait_s': wait_time}):
+                        time.sleep(wait_time)
                     retries += 1
                 except requests.exceptions.ConnectionError as e:
                     if retries == max_retries:
                         raise
 
+                    metrics.record_retry(func.__qualname__, 'connection')
                     wait_time = backoff_factor * (2 ** retries)
                     print(
                         f"Connection error: {str(e)}. "
                         f"Retrying in {wait_time:.2f} seconds... "
                         f"(Attempt {retries + 1}/{max_retries})"
                     )
-                    time.sleep(wait_time)
+                    with tracing.span('retry backoff', {'retry.attempt': retries + 1, 'retry.wait_s': wait_time}):
+                        time.sleep(wait_time)
                     retries += 1
 
         return wrapper
@@ -0,0 +1,91 @@
+# src/core/timing.py
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Timings of the request being handled (None outside of a request)
+_request_timings = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """
+    Time spent per phase during one request
+
+    Worker threads started for the request (asyncio.to_thread, the threadpool)
+    copy the context and so add to the same instance, hence the lock. Phases that
+    run concurrently (batch fetches) can add up to more than the total.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds):
+        with self._lock:
+            total, count = self.phases.get(phase, (0.0, 0))
+            self.phases[phase] = (total + seconds, count + 1)
+
+    def header_value(self):
+        """Server-Timing value, e.g. cache;dur=0.4, upstream;dur=212.7;desc="2 calls", total;dur=215.3"""
+        with self._lock:
+            phases = list(self.phases.items())
+
+        parts = []
+        for phase, (seconds, count) in phases:
+            part = f"{phase};dur={seconds * 1000:.1f}"
+            if count > 1:
+                part += f';desc="{count} calls"'
+            parts.append(part)
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ', '.join(parts)
+
+
+def record(phase, seconds):
+    """Add time to a phase of the current request (no-op outside of a request)"""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(phase, seconds)
+
+
+@contextmanager
+def timed(phase):
+    """Time the block as part of a phase of the current request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - start)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware adding a Server-Timing header to every HTTP response
+
+    The header is written when the response starts, so streaming responses
+    report what happened before their first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing', timings.header_value().encode('latin-1')))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_timings.reset(token)
@@ -0,0 +1,322 @@
+# src/core/tracing.py
+import functools
+import inspect
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+import config
+
+SERVICE_NAME = 'cheftoan-api'
+
+# Parameters whose value is recorded as the span's tag attribute
+TAG_PARAMS = ('player_tag', 'clan_tag')
+
+# Requests that are never traced (they would push real traffic out of the buffer)
+UNTRACED_PATHS = ('/debug', '/metrics')
+
+# Span the current code runs in (None when not tracing, NOT_SAMPLED for dropped traces)
+_current_span = ContextVar('current_span', default=None)
+NOT_SAMPLED = object()
+
+
+def _new_id(bits):
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Span:
+    """One timed operation of a trace"""
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'kind', 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(self, name, parent=None, kind='internal', attributes=None):
+        self.trace_id = parent.trace_id if parent is not None else _new_id(128)
+        self.span_id = _new_id(64)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self, trace_start_ns=None):
+        return {
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'offset_ms': round((self.start_ns - (trace_start_ns or self.start_ns)) / 1e6, 3),
+            'duration_ms': round(self.duration_ms, 3),
+            'attributes': self.attributes,
+            'error': self.error
+        }
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def to_otlp(spans):
+    """Spans as an OTLP/JSON ExportTraceServiceRequest"""
+    otlp_spans = []
+    for span in spans:
+        otlp_span = {
+            'traceId': span.trace_id,
+            'spanId': span.span_id,
+            'name': span.name,
+            'kind': 2 if span.kind == 'server' else 1,
+            'startTimeUnixNano': str(span.start_ns),
+            'endTimeUnixNano': str(span.end_ns or span.start_ns),
+            'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in span.attributes.items()],
+            'status': {'code': 2, 'message': span.error} if span.error else {'code': 1}
+        }
+        if span.parent_id:
+            otlp_span['parentSpanId'] = span.parent_id
+        otlp_spans.append(otlp_span)
+
+    return {'resourceSpans': [{
+        'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+        'scopeSpans': [{'scope': {'name': __name__}, 'spans': otlp_spans}]
+    }]}
+
+
+class RingBufferExporter:
+    """Keeps the most recent traces of this process in memory for /debug/traces"""
+
+    def __init__(self, max_traces):
+        self.max_traces = max_traces
+        self._traces = OrderedDict()
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        trace_id = spans[0].trace_id
+        with self._lock:
+            self._traces.setdefault(trace_id, []).extend(spans)
+            self._traces.move_to_end(trace_id)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+
+    def get(self, trace_id):
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            return list(spans) if spans else None
+
+    def traces(self):
+        """Buffered traces, newest first, each as a list of spans"""
+        with self._lock:
+            return [list(spans) for spans in reversed(self._traces.values())]
+
+
+class OtlpJsonExporter:
+    """Appends each finished trace as one line of OTLP/JSON to a file (or stdout with '-')"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != '-':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def export(self, spans):
+        line = json.dumps(to_otlp(spans), separators=(',', ':')).encode('utf-8') + b'\n'
+        with self._lock:
+            if self.path == '-':
+                sys.stdout.buffer.write(line)
+                sys.stdout.flush()
+            else:
+                with open(self.path, 'ab') as f:
+                    f.write(line)
+
+
+class Tracer:
+    """
+    Collects finished spans per trace and hands complete traces to the exporters
+
+    A trace is exported when its root span ends. Spans still running at that
+    point (work that outlives the request) are exported on their own when they end.
+    """
+
+    def __init__(self, sample_rate=1.0):
+        self.sample_rate = sample_rate
+        self.exporters = []
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+
+    def _finish(self, span):
+        with self._lock:
+            if span.parent_id is not None:
+                if span.trace_id in self._pending:
+                    self._pending[span.trace_id].append(span)
+                    return
+                spans = [span]
+            else:
+                spans = self._pending.pop(span.trace_id, []) + [span]
+
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception as e:
+                print(f"Trace export failed: {str(e)}")
+
+    @contextmanager
+    def span(self, name, kind='internal', attributes=None, root=False):
+        """
+        Time the block as a span, child of the current one
+
+        Outside of a trace (no current span) nothing is recorded unless root=True,
+        which starts a new trace, subject to sampling.
+        """
+        parent = _current_span.get()
+        if parent is NOT_SAMPLED or (parent is None and not root) or not self.exporters:
+            yield None
+            return
+
+        if parent is None and random.random() >= self.sample_rate:
+            token = _current_span.set(NOT_SAMPLED)
+            try:
+                yield None
+            finally:
+                _current_span.reset(token)
+            return
+
+        span = Span(name, parent, kind, attributes)
+        if parent is None:
+            with self._lock:
+                self._pending[span.trace_id] = []
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {str(e)}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self._finish(span)
+
+
+def current_span():
+    """The span the caller runs in, or None"""
+    span = _current_span.get()
+    return None if span is NOT_SAMPLED else span
+
+
+def set_attribute(key, value):
+    """Set an attribute on the current span (no-op when not tracing)"""
+    span = current_span()
+    if span is not None:
+        span.attributes[key] = value
+
+
+def detach():
+    """Stop tracing in the current context (background tasks spawned by a request)"""
+    _current_span.set(None)
+
+
+def span(name, attributes=None):
+    """Time the block as a child span of the current one"""
+    return tracer.span(name, attributes=attributes)
+
+
+def traced(name=None):
+    """
+    Decorator running the function in a span
+
+    The span is named after the function's qualified name; a player_tag or
+    clan_tag argument is recorded as the tag attribute.
+    """
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+        parameters = list(inspect.signature(func).parameters)
+        tag_index = next((parameters.index(param) for param in TAG_PARAMS if param in parameters), None)
+        tag_param = parameters[tag_index] if tag_index is not None else None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+
+            attributes = None
+            if tag_param is not None:
+                tag = args[tag_index] if tag_index < len(args) else kwargs.get(tag_param)
+                if tag is not None:
+                    attributes = {'tag': tag}
+
+            with tracer.span(span_name, attributes=attributes):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware starting a trace for every HTTP request
+
+    The root span is named after the route template once routing is done, and
+    its trace id is returned in the X-Trace-Id header so a slow request can be
+    looked up on /debug/traces.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not config.TRACING_ENABLED or scope['path'].startswith(UNTRACED_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        with tracer.span(f"{scope['method']} {scope['path']}", kind='server', root=True, attributes={
+            'http.method': scope['method'],
+            'http.target': scope['path']
+        }) as root:
+            if root is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_wrapper(message):
+                if message['type'] == 'http.response.start':
+                    root.attributes['http.status_code'] = message['status']
+                    headers = list(message.get('headers', []))
+                    headers.append((b'x-trace-id', root.trace_id.encode('latin-1')))
+                    message = {**message, 'headers': headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get('route')
+                if route is not None:
+                    root.name = f"{scope['method']} {route.path}"
+                    root.attributes['http.route'] = route.path
+
+
+tracer = Tracer(config.TRACE_SAMPLE_RATE)
+memory_exporter = RingBufferExporter(config.TRACE_BUFFER_SIZE)
+if config.TRACING_ENABLED:
+    tracer.add_exporter(memory_exporter)
+    if config.TRACE_EXPORT_FILE:
+        tracer.add_exporter(OtlpJsonExporter(config.TRACE_EXPORT_FILE))
@@ -0,0 +1,46 @@
+# src/core/upstream.py
+import time
+from urllib.parse import urlsplit
+import requests
+from src.core import metrics, timing, tracing
+from src.core.upstream_capture import recorder, replayer
+
+
+def upstream_get(url, endpoint, timing_phase='upstream', **kwargs):
+    """
+    GET an upstream API, recording latency and errors
+
+    Every call to the Clash of Clans, ClashPerk and ClashKing APIs goes through
+    here. endpoint is a fixed label for the kind of call (e.g. 'players'), never
+    the URL itself, which contains tags. The time is added to timing_phase of the
+    request's Server-Timing. Other keyword arguments go to requests.get.
+
+    With UPSTREAM_RECORD_DIR set, responses are also written there as fixtures;
+    with UPSTREAM_REPLAY_DIR set, recorded responses are served instead of
+    calling upstream at all (see upstream_capture).
+
+    Returns:
+        requests.Response: The response, error statuses included
+    """
+    host = urlsplit(url).hostname or 'unknown'
+    with tracing.span(f"GET {host} {endpoint}", {'http.host': host, 'upstream.endpoint': endpoint}) as span:
+        start = time.perf_counter()
+        try:
+            response = replayer.replay(endpoint, url) if replayer is not None else requests.get(url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            elapsed = time.perf_counter() - start
+            timing.record(timing_phase, elapsed)
+            metrics.observe_upstream(host, endpoint, elapsed, type(e).__name__)
+            raise
+
+        elapsed = time.perf_counter() - start
+        timing.record(timing_phase, elapsed)
+        metrics.observe_upstream(host, endpoint, elapsed, str(response.status_code) if response.status_code >= 400 else None)
+        if recorder is not None and replayer is None:
+            try:
+                recorder.record(endpoint, url, response, elapsed)
+            except OSError as e:
+                print(f"Failed to record {endpoint} response: {str(e)}")
+        if span is not None:
+            span.attributes['http.status_code'] = response.status_code
+        return response
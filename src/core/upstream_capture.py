@@ -0,0 +1,178 @@
+# src/core/upstream_capture.py
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import timezone
+from io import BytesIO
+from urllib.parse import unquote, urlsplit
+import requests
+from requests.structures import CaseInsensitiveDict
+import config
+
+# Response headers never written to a recording
+SENSITIVE_HEADER_PATTERN = re.compile(r'cookie|auth|token|key|secret', re.IGNORECASE)
+# Query parameters dropped from recorded URLs
+SENSITIVE_PARAM_PATTERN = re.compile(r'token|key|secret|password', re.IGNORECASE)
+
+_BODY_EXTENSIONS = {'application/json': '.json', 'image/png': '.png', 'image/jpeg': '.jpg'}
+
+
+def fixture_name(url):
+    """Stable, readable file name for an upstream URL, e.g. players_2PP-3f9c1a2b"""
+    parts = urlsplit(url)
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', unquote(parts.path)).strip('_')[-48:]
+    digest = hashlib.blake2b(url.encode('utf-8'), digest_size=4).hexdigest()
+    return f"{slug}-{digest}"
+
+
+def sanitize_url(url):
+    parts = urlsplit(url)
+    if not parts.query:
+        return url
+    params = [param for param in parts.query.split('&') if not SENSITIVE_PARAM_PATTERN.search(param.split('=')[0])]
+    return parts._replace(query='&'.join(params)).geturl()
+
+
+class UpstreamRecorder:
+    """
+    Writes every upstream response to a fixture directory
+
+    Each response becomes two files under DIR/<endpoint>/: the body exactly
+    as received (<name>.json, .png, ...) and <name>.meta.json with the URL,
+    status, headers and how long the call took. Request headers (the API
+    tokens) are never written, nor are cookie/auth/token response headers or
+    token-like query parameters. A URL recorded again overwrites the older files.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, url, response, elapsed):
+        """Write a response; elapsed is the seconds until its headers arrived"""
+        if response.raw is not None and not getattr(response, '_content_consumed', True):
+            # Streamed responses are parsed from .raw, hand the caller a fresh copy of the body.
+            # Downloading the body is part of the call's recorded time.
+            start = time.perf_counter()
+            body = response.content
+            elapsed += time.perf_counter() - start
+            response.raw = BytesIO(body)
+        else:
+            body = response.content
+
+        url = sanitize_url(url)
+        media_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+        name = fixture_name(url)
+        body_file = name + _BODY_EXTENSIONS.get(media_type, '.bin')
+        meta = {
+            'endpoint': endpoint,
+            'url': url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {key: value for key, value in response.headers.items()
+                        if not SENSITIVE_HEADER_PATTERN.search(key)},
+            'elapsed_ms': round(elapsed * 1000, 3),
+            'size': len(body),
+            'recorded_at': datetime.datetime.now(timezone.utc).isoformat(),
+            'body_file': body_file
+        }
+
+        directory = os.path.join(self.directory, endpoint)
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, body_file), 'wb') as f:
+                f.write(body)
+            with open(os.path.join(directory, name + '.meta.json'), 'w') as f:
+                json.dump(meta, f, indent=2)
+
+
+class UpstreamReplayer:
+    """
+    Serves recorded responses instead of calling upstream
+
+    A URL is answered by its own recording when there is one, otherwise by a
+    recording of the same endpoint picked by a hash of the URL, so any player
+    tag gets a production-shaped response and the same tag always gets the
+    same one. Each reply waits the recorded time divided by speed (0 replies at
+    once). A call with no recording for its endpoint fails like an unreachable host.
+    """
+
+    def __init__(self, directory, speed=1.0):
+        self.directory = directory
+        self.speed = speed
+        self._by_url = {}
+        self._by_endpoint = {}
+        self._bodies = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.isdir(self.directory):
+            return
+        for endpoint in sorted(os.listdir(self.directory)):
+            directory = os.path.join(self.directory, endpoint)
+            if not os.path.isdir(directory):
+                continue
+            recordings = []
+            for file_name in sorted(os.listdir(directory)):
+                if not file_name.endswith('.meta.json'):
+                    continue
+                with open(os.path.join(directory, file_name)) as f:
+                    meta = json.load(f)
+                meta['path'] = os.path.join(directory, meta['body_file'])
+                recordings.append(meta)
+                self._by_url[meta['url']] = meta
+            if recordings:
+                self._by_endpoint[endpoint] = recordings
+
+    def endpoints(self):
+        """Number of recordings per endpoint"""
+        return {endpoint: len(recordings) for endpoint, recordings in self._by_endpoint.items()}
+
+    def find(self, endpoint, url):
+        meta = self._by_url.get(sanitize_url(url))
+        if meta is not None:
+            return meta
+        recordings = self._by_endpoint.get(endpoint)
+        if not recordings:
+            return None
+        index = int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=4).digest(), 'big')
+        return recordings[index % len(recordings)]
+
+    def body(self, meta):
+        """Body of a recording (read once, then kept in memory)"""
+        body = self._bodies.get(meta['path'])
+        if body is None:
+            with open(meta['path'], 'rb') as f:
+                body = f.read()
+            with self._lock:
+                self._bodies[meta['path']] = body
+        return body
+
+    def replay(self, endpoint, url):
+        meta = self.find(endpoint, url)
+        if meta is None:
+            raise requests.exceptions.ConnectionError(f"No recorded {endpoint} response to replay for {url}")
+
+        if self.speed > 0:
+            time.sleep(meta['elapsed_ms'] / 1000 / self.speed)
+
+        body = self.body(meta)
+        response = requests.Response()
+        response.status_code = meta['status']
+        response.reason = meta.get('reason')
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.url = url
+        response.raw = BytesIO(body)
+        response._content = body
+        response.encoding = 'utf-8'
+        response.elapsed = datetime.timedelta(milliseconds=meta['elapsed_ms'])
+        return response
+
+
+recorder = UpstreamRecorder(config.UPSTREAM_RECORD_DIR) if config.UPSTREAM_RECORD_DIR else None
+replayer = UpstreamReplayer(config.UPSTREAM_REPLAY_DIR, config.UPSTREAM_REPLAY_SPEED) if config.UPSTREAM_REPLAY_DIR else None
@@ -0,0 +1,47 @@
+# src/core/warmup.py
+import threading
+import time
+
+# (name, function) steps run once per process after startup
+_steps = []
+_durations = {}
+_ready = threading.Event()
+
+
+def register(name, func):
+    """Add a step to run in the background after startup"""
+    _steps.append((name, func))
+
+
+def run():
+    """Run the registered steps in order, then mark the process ready"""
+    start = time.perf_counter()
+    for name, func in _steps:
+        step_start = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            # Not fatal: whatever the step loads is loaded again on first use
+            print(f"Warmup step '{name}' failed: {str(e)}")
+        _durations[name] = round((time.perf_counter() - step_start) * 1000, 1)
+
+    _ready.set()
+    if _steps:
+        print(f"Warmup done in {(time.perf_counter() - start) * 1000:.0f}ms: {_durations}")
+
+
+def start():
+    """Run the warmup in a background thread so the server accepts connections meanwhile"""
+    if _ready.is_set():
+        # Already warmed up before fork (gunicorn preload_app), the worker inherited the result
+        return
+    threading.Thread(target=run, name='warmup', daemon=True).start()
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def durations():
+    """Milliseconds per finished step"""
+    return dict(_durations)
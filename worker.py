@@ -0,0 +1,19 @@
+# worker.py
+"""
+Background cache warmer
+
+Run next to the API (python worker.py). Keeps the most requested players' data,
+essentials and charts cached, with an extra pass right after the daily 5:00 UTC
+Legend reset so the first request of the day is a cache hit.
+"""
+import config
+from src.core.redis_service import init_redis
+from src.apis.clash_of_clans.services.cache_warmer import CacheWarmer
+
+if __name__ == '__main__':
+    if not config.REDIS_ENABLED:
+        raise SystemExit("The cache warmer needs Redis (REDIS_ENABLED=true)")
+
+    init_redis(None)
+    print("Cache warmer started")
+    CacheWarmer().run_forever()